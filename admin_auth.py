@@ -0,0 +1,23 @@
+# Shared-secret check for operator-only HTTP endpoints (bulk exports, internals)
+import hmac
+from functools import wraps
+from flask import current_app, jsonify, request
+
+ADMIN_HEADER = 'X-Admin-Token'
+
+
+def is_admin(given, token):
+    return bool(token) and bool(given) and hmac.compare_digest(given.encode(), token.encode())
+
+
+def admin_required(view):
+    """403 unless the request sends ADMIN_TOKEN in the X-Admin-Token header; always 403 while ADMIN_TOKEN is unset.
+    
+    Header only: query strings end up in access and proxy logs.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if not is_admin(request.headers.get(ADMIN_HEADER, ''), current_app.config.get('ADMIN_TOKEN', '')):
+            return jsonify({'error': f"Admin only: send ADMIN_TOKEN in the {ADMIN_HEADER} header"}), 403
+        return view(*args, **kwargs)
+    return wrapper
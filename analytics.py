@@ -0,0 +1,253 @@
+# Time-bucketed sales aggregation helpers shared by the analytics endpoints
+from collections import namedtuple
+from datetime import datetime, timedelta
+from sqlalchemy import func, distinct, cast, Date
+from extensions import db
+from models import Product, Order, OrderItem
+
+GRANULARITIES = ('hour', 'day', 'week', 'month')
+MAX_BUCKETS = 2000
+
+MonthlySales = namedtuple('MonthlySales', 'year month total_sales order_count')
+
+
+def parse_date_arg(value, end_of_day=False):
+    """Parse a YYYY-MM-DD or ISO datetime query argument; date-only end bounds are inclusive"""
+    if not value:
+        return None
+    parsed = datetime.fromisoformat(value)
+    if end_of_day and len(value) == 10:
+        parsed += timedelta(days=1)
+    return parsed
+
+
+def bucket_expression(column, granularity):
+    """Database-side bucket key for `column`: 'YYYY-MM-DD HH:00:00' for hours, 'YYYY-MM-DD' otherwise.
+    
+    Weeks start on Monday and months on the 1st, on both SQLite and PostgreSQL.
+    """
+    if granularity not in GRANULARITIES:
+        raise ValueError(f"Invalid granularity: {granularity!r}")
+    
+    if db.engine.dialect.name == 'sqlite':
+        if granularity == 'hour':
+            return func.strftime('%Y-%m-%d %H:00:00', column)
+        if granularity == 'day':
+            return func.strftime('%Y-%m-%d', column)
+        if granularity == 'week':
+            return func.date(column, 'weekday 0', '-6 days')
+        return func.strftime('%Y-%m-01', column)
+    
+    pattern = 'YYYY-MM-DD HH24:00:00' if granularity == 'hour' else 'YYYY-MM-DD'
+    return func.to_char(func.date_trunc(granularity, column), pattern)
+
+
+def day_expression(column):
+    """Database-side calendar date of a datetime column, usable as a Date value"""
+    if db.engine.dialect.name == 'sqlite':
+        return func.date(column)
+    return cast(column, Date)
+
+
+def bucket_start(moment, granularity):
+    """Python mirror of bucket_expression: truncate a datetime to its bucket start"""
+    if granularity == 'hour':
+        return moment.replace(minute=0, second=0, microsecond=0)
+    day = moment.replace(hour=0, minute=0, second=0, microsecond=0)
+    if granularity == 'day':
+        return day
+    if granularity == 'week':
+        return day - timedelta(days=day.weekday())
+    return day.replace(day=1)
+
+
+def next_bucket(moment, granularity):
+    if granularity == 'hour':
+        return moment + timedelta(hours=1)
+    if granularity == 'day':
+        return moment + timedelta(days=1)
+    if granularity == 'week':
+        return moment + timedelta(weeks=1)
+    return (moment.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+def bucket_key(moment, granularity):
+    return moment.strftime('%Y-%m-%d %H:00:00' if granularity == 'hour' else '%Y-%m-%d')
+
+
+def bucket_keys(start, end, granularity):
+    """Every bucket key covering the half-open range [start, end)"""
+    keys = []
+    current = bucket_start(start, granularity)
+    while current < end:
+        keys.append(bucket_key(current, granularity))
+        if len(keys) > MAX_BUCKETS:
+            raise ValueError(f"Range too large for {granularity} buckets (max {MAX_BUCKETS})")
+        current = next_bucket(current, granularity)
+    return keys
+
+
+def sales_series(start, end, granularity='day', order_type='sales', status=None, category=None, product_id=None):
+    """Sales totals per bucket over [start, end) in one GROUP BY, with empty buckets filled.
+    
+    Without product filters the series sums Order.total_amount. With a
+    category or product filter it sums the matching OrderItem lines.
+    """
+    keys = bucket_keys(start, end, granularity)
+    query = sales_series_query(start, end, granularity, order_type, status, category, product_id)
+    totals = {row.bucket: row for row in query}
+    
+    series = []
+    for key in keys:
+        row = totals.get(key)
+        point = {
+            'bucket': key,
+            'sales': float(row.sales or 0) if row else 0.0,
+            'orders': int(row.orders or 0) if row else 0
+        }
+        if category or product_id:
+            point['units'] = int(row.units or 0) if row else 0
+        series.append(point)
+    return series
+
+
+def sales_series_query(start, end, granularity='day', order_type='sales', status=None, category=None, product_id=None):
+    """The grouped query behind sales_series, one row per non-empty bucket"""
+    bucket = bucket_expression(Order.created_at, granularity).label('bucket')
+    
+    if category or product_id:
+        query = db.session.query(
+            bucket,
+            func.sum(OrderItem.total_price).label('sales'),
+            func.count(distinct(Order.id)).label('orders'),
+            func.sum(OrderItem.quantity).label('units')
+        ).select_from(Order).join(OrderItem, OrderItem.order_id == Order.id)
+        if category:
+            query = query.join(Product, Product.id == OrderItem.product_id).filter(Product.category == category)
+        if product_id:
+            query = query.filter(OrderItem.product_id == product_id)
+    else:
+        query = db.session.query(
+            bucket,
+            func.sum(Order.total_amount).label('sales'),
+            func.count(Order.id).label('orders')
+        )
+    
+    query = query.filter(
+        Order.order_type == order_type,
+        Order.created_at >= start,
+        Order.created_at < end
+    )
+    if status:
+        query = query.filter(Order.status == status)
+    
+    return query.group_by(bucket)
+
+
+def live_monthly_sales(start, end=None):
+    """Completed-sales totals per month from the Order table (months without sales omitted).
+    
+    Filters on a half-open created_at range so the composite order index
+    is used, instead of EXTRACT(year/month) predicates.
+    """
+    end = end or datetime.now() + timedelta(days=1)
+    return [
+        MonthlySales(int(point['bucket'][:4]), int(point['bucket'][5:7]), point['sales'], point['orders'])
+        for point in sales_series(start, end, 'month', status='completed')
+        if point['orders']
+    ]
+
+
+PROFIT_GROUPS = ('product', 'category', 'month')
+PROFIT_SORTS = ('units_sold', 'revenue', 'profit', 'cost')
+
+
+def _completed_sales_lines(start=None, end=None):
+    """Completed sales order lines joined to their products, optionally within [start, end)"""
+    revenue = func.sum(OrderItem.total_price)
+    cost = func.sum(func.coalesce(Product.purchase_price, 0) * OrderItem.quantity)
+    columns = (
+        func.coalesce(revenue, 0).label('revenue'),
+        func.coalesce(cost, 0).label('cost'),
+        func.coalesce(revenue - cost, 0).label('profit'),
+        func.coalesce(func.sum(OrderItem.quantity), 0).label('units_sold')
+    )
+    
+    def query(*group_columns):
+        q = db.session.query(*group_columns, *columns).select_from(OrderItem).join(
+            Order, Order.id == OrderItem.order_id
+        ).join(
+            Product, Product.id == OrderItem.product_id
+        ).filter(
+            Order.order_type == 'sales',
+            Order.status == 'completed'
+        )
+        if start:
+            q = q.filter(Order.created_at >= start)
+        if end:
+            q = q.filter(Order.created_at < end)
+        return q
+    
+    return query
+
+
+def profit_analytics_summary(start=None, end=None, group_by='product', limit=10, sort='units_sold'):
+    """Revenue, cost (purchase_price * quantity), profit and units, aggregated in SQL.
+    
+    One query for the totals and one grouped query for the top `limit`
+    groups, ordered and limited by the database. Month groups are the
+    latest `limit` months, oldest first. limit=None returns every group.
+    """
+    if group_by not in PROFIT_GROUPS:
+        raise ValueError(f"group_by must be one of {', '.join(PROFIT_GROUPS)}")
+    if sort not in PROFIT_SORTS:
+        raise ValueError(f"sort must be one of {', '.join(PROFIT_SORTS)}")
+    if limit is not None and limit < 1:
+        raise ValueError("limit must be at least 1")
+    
+    lines = _completed_sales_lines(start, end)
+    totals = lines().one()
+    
+    if group_by == 'product':
+        group_columns = (Product.id.label('product_id'), Product.name.label('name'))
+    elif group_by == 'category':
+        group_columns = (Product.category.label('name'),)
+    else:
+        group_columns = (bucket_expression(Order.created_at, 'month').label('name'),)
+    
+    grouped = lines(*group_columns).group_by(*group_columns)
+    if group_by == 'month':
+        grouped = grouped.order_by(db.desc(group_columns[0]))
+    else:
+        grouped = grouped.order_by(db.desc(sort), group_columns[-1])
+    if limit:
+        grouped = grouped.limit(limit)
+    
+    rows = grouped.all()
+    if group_by == 'month':
+        rows.reverse()
+    
+    groups = []
+    for row in rows:
+        group = {
+            'name': row.name,
+            'revenue': float(row.revenue),
+            'cost': float(row.cost),
+            'profit': float(row.profit),
+            'units_sold': int(row.units_sold)
+        }
+        if group_by == 'product':
+            group['product_id'] = row.product_id
+        groups.append(group)
+    
+    total_revenue = float(totals.revenue)
+    total_cost = float(totals.cost)
+    return {
+        'total_revenue': total_revenue,
+        'total_cost': total_cost,
+        'gross_profit': total_revenue - total_cost,
+        'profit_margin': ((total_revenue - total_cost) / total_revenue * 100) if total_revenue > 0 else 0,
+        'units_sold': int(totals.units_sold),
+        'group_by': group_by,
+        'groups': groups
+    }
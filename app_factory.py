@@ -3,54 +3,97 @@ import logging
 from flask import Flask
 from werkzeug.middleware.proxy_fix import ProxyFix
 from extensions import db
+from db_pool import pool_config_from_env, engine_options, init_pool
+from sqlite_profile import sqlite_config_from_env, init_sqlite
+from metrics import init_metrics
+from query_budget import init_query_checks
+from profiler import profiler_config_from_env, init_profiler
+from startup import StartupTimer
 
-def create_app():
-    """Application factory pattern to prevent import issues"""
-    app = Flask(__name__)
-    
-    # Configure logging
-    logging.basicConfig(level=logging.DEBUG)
+# routes.py registers its views on the app being created when it is first
+# imported, so a process can only hold one fully wired app
+_app = None
+
+
+def create_app(config=None):
+    """Create the application (the one supported factory; main:app calls it).
     
-    # App configuration
-    app.secret_key = os.environ.get("SESSION_SECRET", "inventory-management-secret-key")
-    app.wsgi_app = ProxyFix(app.wsgi_app, x_proto=1, x_host=1)
+    Only configures the app and registers routes; the schema and seed data
+    are set up once per deploy with `flask --app main init-db`. Nothing
+    connects to the database here, so the app can be preloaded in the
+    gunicorn master (`--preload`); pools are reset in every forked worker.
+    `config` overrides settings read from the environment. Later calls
+    return the app created by the first one.
+    """
+    global _app
+    if _app is not None:
+        return _app
     
-    # Database configuration
-    app.config["SQLALCHEMY_DATABASE_URI"] = os.environ.get("DATABASE_URL", "sqlite:///inventory.db")
-    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
-        "pool_recycle": 300,
-        "pool_pre_ping": True,
-    }
+    timer = StartupTimer()
+    with timer.phase('config'):
+        app = Flask(__name__)
+        
+        # Configure logging; DEBUG logs every SQLAlchemy pool event, so it is opt-in
+        logging.basicConfig(level=os.environ.get("LOG_LEVEL", "INFO").upper())
+        
+        # App configuration
+        app.secret_key = os.environ.get("SESSION_SECRET", "inventory-management-secret-key")
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_proto=1, x_host=1)
+        
+        # Database configuration; pool sizing via DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT, DB_POOL_RECYCLE
+        # and the SQLite profile (WAL, busy timeout, ...) via SQLITE_*
+        app.config["SQLALCHEMY_DATABASE_URI"] = os.environ.get("DATABASE_URL", "sqlite:///inventory.db")
+        app.config.update(pool_config_from_env())
+        app.config.update(sqlite_config_from_env())
+        app.config.update(profiler_config_from_env())
+        # Seller details for invoices; BUSINESS_STATE_CODE (or the BUSINESS_GSTIN prefix) drives the IGST vs CGST/SGST split
+        for key in ('BUSINESS_NAME', 'BUSINESS_ADDRESS', 'BUSINESS_GSTIN', 'BUSINESS_STATE_CODE'):
+            if os.environ.get(key):
+                app.config[key] = os.environ[key]
+        # Secret for operator-only endpoints (X-Admin-Token header); they refuse every request while it is unset
+        app.config["ADMIN_TOKEN"] = os.environ.get("ADMIN_TOKEN", "")
+        if os.environ.get("INVOICE_WORKERS"):
+            app.config["INVOICE_WORKERS"] = int(os.environ["INVOICE_WORKERS"])
+        # Seconds before a read of the sales rollups queues a background refresh
+        if os.environ.get("SALES_ROLLUP_MAX_AGE"):
+            app.config["SALES_ROLLUP_MAX_AGE"] = int(os.environ["SALES_ROLLUP_MAX_AGE"])
+        app.config.update(config or {})
+        app.config.setdefault("SQLALCHEMY_ENGINE_OPTIONS", engine_options(app.config))
     
-    # Initialize extensions
-    db.init_app(app)
+    with timer.phase('extensions'):
+        # Initialize extensions
+        db.init_app(app)
+        with app.app_context():
+            init_pool(db.engines.values())
+            init_sqlite(db.engines.values(), app.config)
+            init_metrics(app, db.engines.values())
+            init_query_checks(app, db.engines.values())
+            init_profiler(app)
     
     # Register blueprints and routes within app context
     with app.app_context():
         # Import all models to ensure they are registered
-        import all_models
-        
-        # Create database tables
-        db.create_all()
-        
-        # Initialize GST states
-        try:
-            from models import GSTState
-            GSTState.initialize_states()
-            db.session.commit()
-            print("Database initialized with GST states")
-        except Exception as e:
-            print(f"GST initialization: {e}")
+        with timer.phase('models'):
+            import all_models
         
         # Register routes
-        import routes
+        with timer.phase('routes'):
+            import routes
+        
+        # Register CLI commands
+        with timer.phase('commands'):
+            from commands import register_commands
+            register_commands(app)
         
         # Register enhanced features
-        try:
-            from enhanced_features import enhanced_bp
-            app.register_blueprint(enhanced_bp)
-            print("Enhanced features loaded successfully")
-        except ImportError as e:
-            print(f"Enhanced features not loaded: {e}")
+        with timer.phase('blueprints'):
+            try:
+                from enhanced_features import enhanced_bp
+                app.register_blueprint(enhanced_bp)
+                print("Enhanced features loaded successfully")
+            except ImportError as e:
+                print(f"Enhanced features not loaded: {e}")
     
-    return app
\ No newline at end of file
+    timer.finish(app)
+    _app = app
+    return app
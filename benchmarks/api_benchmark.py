@@ -0,0 +1,450 @@
+"""
+End-to-end benchmark of the /api endpoints, with a JSON baseline to catch regressions.
+
+Builds (or reuses) a synthetic dataset, counts the SQL statements each
+workload runs, then starts gunicorn on it and drives every workload with
+--concurrency keep-alive clients. Latency p50/p95/p99, throughput, errors
+and statement counts are printed, optionally saved as a baseline, and
+compared with a previous baseline: a p50/p95 slower by more than
+--tolerance (and --min-delta-ms), lower throughput, more statements or
+new errors are flagged.
+
+Reads run before writes, so write workloads do not change the data the
+reads see. Heavy workloads (full listings, exports, invoice zips) get
+--heavy-requests requests instead of --requests. The client shares the
+machine with the server; on small machines compare runs with each other,
+not with production.
+
+Usage:
+    python benchmarks/api_benchmark.py --save-baseline benchmarks/baseline.json
+    python benchmarks/api_benchmark.py --baseline benchmarks/baseline.json
+    python benchmarks/api_benchmark.py --products 100000 --orders 1000000 --database /tmp/bench.db
+    python benchmarks/api_benchmark.py --database /tmp/bench.db --reuse --only 'orders|products'
+    DATABASE_URL=postgresql://... python benchmarks/api_benchmark.py --reuse
+
+Exits with status 1 if a regression is flagged.
+"""
+import argparse
+import http.client
+import itertools
+import json
+import os
+import platform
+import random
+import re
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import date, timedelta
+from urllib.parse import quote
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from synthetic_data import SELLER_STATE_CODE, add_arguments, generate
+from admin_auth import ADMIN_HEADER
+
+# name -> (method, path, body builder, heavy). Paths are formatted with the sampled data.
+WORKLOADS = {
+    'products_page': ('GET', '/api/products?limit=50', None, False),
+    'products_page_filtered': ('GET', '/api/products?limit=50&category={category}&low_stock=1', None, False),
+    'products_all': ('GET', '/api/products', None, True),
+    'products_export_csv': ('GET', '/api/products/export', None, True),
+    'search': ('GET', '/api/search?q={search_query}', None, False),
+    'search_autocomplete': ('GET', '/api/search?q={typed_prefix}&autocomplete=1', None, False),
+    'orders_page': ('GET', '/api/orders?limit=50', None, False),
+    'orders_page_purchases': ('GET', '/api/orders?type=purchase&limit=50&status=completed', None, False),
+    'orders_all': ('GET', '/api/orders', None, True),
+    'dashboard_stats': ('GET', '/api/dashboard-stats', None, False),
+    'sales_chart': ('GET', '/api/sales-chart', None, False),
+    'category_chart': ('GET', '/api/category-chart', None, False),
+    'sales_forecast': ('GET', '/api/analytics/sales-forecast', None, False),
+    'product_forecasts': ('GET', '/api/analytics/product-forecasts', None, False),
+    'sales_series': ('GET', '/api/analytics/sales-series?granularity=day', None, False),
+    'abc_analysis': ('GET', '/api/analytics/abc-analysis', None, False),
+    'seasonal_trends': ('GET', '/api/analytics/seasonal-trends', None, False),
+    'inventory_optimization': ('GET', '/api/analytics/inventory-optimization?limit=50', None, False),
+    'gst_hsn_summary': ('GET', '/api/reports/gst/hsn', None, False),
+    'gst_state_summary': ('GET', '/api/reports/gst/state', None, False),
+    'low_stock_alerts': ('GET', '/api/enhanced/low-stock-alerts', None, False),
+    'profit_analytics': ('GET', '/api/enhanced/profit-analytics', None, False),
+    'profit_by_category': ('GET', '/api/enhanced/profit-analytics?group_by=category', None, False),
+    'upi_qr': ('GET', '/api/enhanced/upi-qr/{order_id}', None, False),
+    'invoices_bulk_day': ('GET', '/api/invoices/bulk?start={yesterday}&end={yesterday}', None, True),
+    'db_pool': ('GET', '/api/system/db-pool', None, False),
+    'create_order': ('POST', '/api/orders', 'order', False),
+    'create_orders_batch': ('POST', '/api/orders/batch', 'order_batch', False),
+    'create_product': ('POST', '/api/products', 'new_product', False),
+    'update_product': ('PUT', '/api/products/{product_id}', 'product_update', False),
+    'import_products_csv': ('POST', '/api/products/import?format=csv', 'product_csv', False),
+}
+COMPARED_LATENCIES = ('p50_ms', 'p95_ms')
+MIN_REQUESTS_FOR_TAIL = 20
+STALE_CONNECTION_ERRORS = (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError)
+# The benchmarked app gets a throwaway admin token so operator-only workloads (invoice zips, pool stats) can run
+ADMIN_TOKEN = uuid.uuid4().hex
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--database', help='SQLite file to build or reuse (default: a new temp file; DATABASE_URL wins)')
+    parser.add_argument('--reuse', action='store_true', help='benchmark the existing data instead of generating more')
+    parser.add_argument('--concurrency', type=int, default=8, help='client connections per workload')
+    parser.add_argument('--requests', type=int, default=200, help='requests per workload')
+    parser.add_argument('--heavy-requests', type=int, default=3, help='requests per heavy workload')
+    parser.add_argument('--warmup', type=int, default=2, help='untimed requests per workload')
+    parser.add_argument('--workers', type=int, default=2, help='gunicorn worker processes')
+    parser.add_argument('--threads', type=int, default=4, help='threads per gunicorn worker')
+    parser.add_argument('--only', help='regex: run only the workloads whose name matches')
+    parser.add_argument('--skip-writes', action='store_true', help='read-only workloads')
+    parser.add_argument('--output', help='write this run\'s results as JSON')
+    parser.add_argument('--save-baseline', metavar='PATH', help='write this run\'s results as the new baseline')
+    parser.add_argument('--baseline', metavar='PATH', help='compare with this baseline and flag regressions')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='allowed slowdown before flagging (0.25 = 25%%)')
+    parser.add_argument('--min-delta-ms', type=float, default=2.0, help='ignore latency changes smaller than this')
+    add_arguments(parser)
+    return parser.parse_args()
+
+
+def sample_data(limit=1000):
+    """Random products and sales orders for the workloads to address"""
+    from extensions import db
+    from models import Product, Order
+    
+    products = db.session.query(
+        Product.id, Product.name, Product.sku, Product.hsn_code, Product.category, Product.unit_price, Product.gst_rate
+    ).order_by(db.func.random()).limit(limit).all()
+    order_ids = [
+        order_id for order_id, in db.session.query(Order.id)
+        .filter(Order.order_type == 'sales').order_by(db.func.random()).limit(limit)
+    ]
+    if not products or not order_ids:
+        sys.exit("The database has no products or sales orders; run without --reuse to generate them")
+    return {'products': [row._asdict() for row in products], 'order_ids': order_ids}
+
+
+def order_body(sample, rng):
+    items = [
+        {'product_id': product['id'], 'quantity': 1, 'unit_price': product['unit_price']}
+        for product in rng.sample(sample['products'], min(3, len(sample['products'])))
+    ]
+    return {'order_type': 'sales', 'customer_name': 'Benchmark Customer', 'customer_mobile': '9000000000', 'items': items}
+
+
+def new_product_body(sample, rng):
+    return {
+        'name': 'Benchmark Product', 'sku': f"BENCH-{uuid.uuid4().hex[:12]}", 'hsn_code': '8471',
+        'category': 'Benchmark', 'unit_price': 99.0, 'gst_rate': 18.0, 'available_qty': 100, 'min_qty': 5
+    }
+
+
+def product_csv_body(sample, rng, rows=50):
+    lines = ['name,sku,hsn_code,category,unit_price,gst_rate,available_qty,min_qty']
+    lines.extend(f"Imported Product {index},IMP-{uuid.uuid4().hex[:12]},8471,Benchmark,49.0,18,10,2" for index in range(rows))
+    return '\n'.join(lines) + '\n'
+
+
+BODIES = {
+    'order': order_body,
+    'order_batch': lambda sample, rng: [order_body(sample, rng) for _ in range(10)],
+    'new_product': new_product_body,
+    'product_update': None,  # Built in build_request: it must name the product in the path
+    'product_csv': product_csv_body,
+}
+
+
+def build_request(name, sample, rng):
+    """(method, path, body bytes, headers) for one request of a workload"""
+    method, template, body_name, _ = WORKLOADS[name]
+    product = rng.choice(sample['products'])
+    yesterday = (date.today() - timedelta(days=1)).isoformat()
+    # Search a sampled category, and autocomplete the first half of a sampled product name as if being typed
+    path = template.format(
+        product_id=product['id'], order_id=rng.choice(sample['order_ids']),
+        category=product['category'], yesterday=yesterday, search_query=quote(product['category'] or product['name']),
+        typed_prefix=quote(product['name'][:max(3, len(product['name']) // 2)])
+    )
+    headers = {ADMIN_HEADER: ADMIN_TOKEN}
+    if body_name is None:
+        return method, path, None, headers
+    if body_name == 'product_update':
+        body = {**product, 'available_qty': rng.randint(0, 500)}
+        body.pop('id')
+    else:
+        body = BODIES[body_name](sample, rng)
+    if isinstance(body, str):
+        return method, path, body.encode(), {**headers, 'Content-Type': 'text/csv'}
+    return method, path, json.dumps(body).encode(), {**headers, 'Content-Type': 'application/json'}
+
+
+def count_queries(app, names, sample):
+    """SQL statements per request of each workload, measured in-process after one warm-up call"""
+    from query_budget import recent_reports
+    
+    rng = random.Random(0)
+    client = app.test_client()
+    counts = {}
+    app.config.update(QUERY_CHECKS=True)
+    try:
+        for name in names:
+            for attempt in range(2 if WORKLOADS[name][0] == 'GET' else 1):
+                method, path, body, headers = build_request(name, sample, rng)
+                recent_reports.clear()
+                response = client.open(path, method=method, data=body, headers=headers)
+                response.get_data()
+                response.close()
+            counts[name] = recent_reports[-1]['statements'] if recent_reports else None
+    finally:
+        app.config.update(QUERY_CHECKS=False)
+    return counts
+
+
+def uncovered_endpoints(app, names):
+    """(endpoint, method) pairs under /api that none of the named workloads calls"""
+    adapter = app.url_map.bind('localhost')
+    covered = set()
+    for name in names:
+        method, template, _, _ = WORKLOADS[name]
+        path = template.split('?')[0].format(product_id=1, order_id=1, category='x', yesterday='x', search_query='x', typed_prefix='x')
+        endpoint, _ = adapter.match(path, method=method)
+        covered.add((endpoint, method))
+    everything = {
+        (rule.endpoint, method) for rule in app.url_map.iter_rules() if rule.rule.startswith('/api')
+        for method in rule.methods - {'HEAD', 'OPTIONS'}
+    }
+    return sorted(everything - covered)
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_server(args, database_url, port, log_path):
+    env = dict(os.environ, DATABASE_URL=database_url, QUERY_CHECKS='0', PROFILER_TOKEN='', PROFILER_SAMPLE_RATE='0')
+    env['PROMETHEUS_MULTIPROC_DIR'] = tempfile.mkdtemp(prefix='api-benchmark-metrics-')
+    command = [
+        sys.executable, '-m', 'gunicorn', '--config', os.path.join(ROOT, 'gunicorn.conf.py'),
+        '--bind', f"127.0.0.1:{port}", '--workers', str(args.workers), '--threads', str(args.threads),
+        '--timeout', '600', 'main:app'
+    ]
+    log = open(log_path, 'w')
+    server = subprocess.Popen(command, cwd=ROOT, env=env, stdout=log, stderr=subprocess.STDOUT)
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            break
+        try:
+            connection = http.client.HTTPConnection('127.0.0.1', port, timeout=5)
+            connection.request('GET', '/api/system/db-pool', headers={ADMIN_HEADER: ADMIN_TOKEN})
+            if connection.getresponse().status == 200:
+                return server
+        except OSError:
+            time.sleep(0.2)
+    server.kill()
+    with open(log_path) as f:
+        sys.exit(f"gunicorn did not start:\n{f.read()[-2000:]}")
+
+
+def run_workload(port, name, sample, requests, concurrency, warmup):
+    """Fire `requests` requests from `concurrency` keep-alive connections; returns the latency summary"""
+    results = []
+    results_lock = threading.Lock()
+    remaining = itertools.count()
+    
+    def client(seed, timed):
+        rng = random.Random(seed)
+        connection = http.client.HTTPConnection('127.0.0.1', port, timeout=600)
+        samples = []
+        while next(remaining) < (requests if timed else warmup):
+            method, path, body, headers = build_request(name, sample, rng)
+            for attempt in (1, 2):
+                started = time.perf_counter()
+                try:
+                    connection.request(method, path, body=body, headers=headers)
+                    response = connection.getresponse()
+                    response.read()
+                    status = response.status
+                    break
+                except (OSError, http.client.HTTPException) as e:
+                    status = type(e).__name__
+                    connection.close()
+                    connection = http.client.HTTPConnection('127.0.0.1', port, timeout=600)
+                    # The server may close an idle keep-alive connection; that is not the request failing
+                    if not isinstance(e, STALE_CONNECTION_ERRORS):
+                        break
+            samples.append((time.perf_counter() - started, status))
+        connection.close()
+        if timed:
+            with results_lock:
+                results.extend(samples)
+    
+    client(-1, timed=False)
+    remaining = itertools.count()
+    threads = [threading.Thread(target=client, args=(seed, True)) for seed in range(min(concurrency, requests))]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - started
+    return summarize(results, wall)
+
+
+def summarize(results, wall):
+    import numpy as np
+    
+    latencies = np.array([seconds for seconds, _ in results]) * 1000
+    statuses = Counter(str(status) for _, status in results)
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99]) if len(latencies) else (0.0, 0.0, 0.0)
+    return {
+        'requests': len(results),
+        'errors': sum(count for status, count in statuses.items() if not status.isdigit() or int(status) >= 400),
+        'statuses': dict(statuses),
+        'p50_ms': round(float(p50), 2),
+        'p95_ms': round(float(p95), 2),
+        'p99_ms': round(float(p99), 2),
+        'mean_ms': round(float(latencies.mean()), 2) if len(latencies) else 0.0,
+        'rps': round(len(results) / wall, 1) if wall else 0.0
+    }
+
+
+def compare(results, baseline, tolerance, min_delta_ms):
+    """Regression messages for workloads present in both runs"""
+    flags = []
+    for name, current in results.items():
+        previous = baseline['results'].get(name)
+        if previous is None:
+            continue
+        # A handful of requests (heavy workloads) gives a usable median but no tail or rate
+        enough = min(current['requests'], previous['requests']) >= MIN_REQUESTS_FOR_TAIL
+        for key in COMPARED_LATENCIES if enough else COMPARED_LATENCIES[:1]:
+            before, after = previous[key], current[key]
+            if after > before * (1 + tolerance) and after - before > min_delta_ms:
+                flags.append(f"{name}: {key} {before:.1f} -> {after:.1f} ms ({after / before - 1:+.0%})" if before else
+                             f"{name}: {key} {before:.1f} -> {after:.1f} ms")
+        if enough and current['rps'] * (1 + tolerance) < previous['rps']:
+            flags.append(f"{name}: throughput {previous['rps']:.1f} -> {current['rps']:.1f} req/s")
+        if (current.get('queries') or 0) > (previous.get('queries') or 0):
+            flags.append(f"{name}: SQL statements per request {previous.get('queries')} -> {current.get('queries')}")
+        if current['errors'] > previous['errors']:
+            flags.append(f"{name}: errors {previous['errors']} -> {current['errors']} ({current['statuses']})")
+    return flags
+
+
+def print_table(results, baseline):
+    print(f"\n{'workload':<26}{'reqs':>6}{'err':>5}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'req/s':>9}{'sql':>6}  p95 vs baseline")
+    for name, result in results.items():
+        previous = (baseline or {}).get('results', {}).get(name)
+        delta = f"{result['p95_ms'] / previous['p95_ms'] - 1:+.0%}" if previous and previous['p95_ms'] else ''
+        print(f"{name:<26}{result['requests']:>6}{result['errors']:>5}{result['p50_ms']:>10.1f}{result['p95_ms']:>10.1f}"
+              f"{result['p99_ms']:>10.1f}{result['rps']:>9.1f}{result['queries'] if result['queries'] is not None else '-':>6}  {delta}")
+
+
+def main():
+    args = parse_args()
+    if not os.environ.get('DATABASE_URL'):
+        database = args.database or os.path.join(tempfile.mkdtemp(prefix='api-benchmark-'), 'bench.db')
+        os.environ['DATABASE_URL'] = f"sqlite:///{os.path.abspath(database)}"
+    database_url = os.environ['DATABASE_URL']
+    os.environ['ADMIN_TOKEN'] = ADMIN_TOKEN
+    # GST reports refuse to guess the seller's state
+    if not os.environ.get('BUSINESS_GSTIN'):
+        os.environ.setdefault('BUSINESS_STATE_CODE', SELLER_STATE_CODE)
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    
+    from main import app
+    from extensions import db
+    from models import Product, Order, OrderItem
+    from schema import init_database
+    
+    names = [
+        name for name, (method, _, _, _) in WORKLOADS.items()
+        if (not args.only or re.search(args.only, name)) and not (args.skip_writes and method != 'GET')
+    ]
+    with app.app_context():
+        init_database()
+        if not args.reuse:
+            print(f"Generating data into {database_url}")
+            generate(
+                products=args.products, customers=args.customers, orders=args.orders,
+                lines_per_order=args.lines_per_order, warehouses=args.warehouses, days=args.days,
+                purchase_ratio=args.purchase_ratio, credit_ratio=args.credit_ratio, seed=args.seed
+            )
+        dataset = {
+            'products': db.session.query(Product).count(),
+            'orders': db.session.query(Order).count(),
+            'order_lines': db.session.query(OrderItem).count()
+        }
+        sample = sample_data()
+        print(f"Dataset: {dataset['products']:,} products, {dataset['orders']:,} orders, {dataset['order_lines']:,} lines")
+        for endpoint, method in uncovered_endpoints(app, WORKLOADS):
+            print(f"  not benchmarked: {method} {endpoint}")
+        queries = count_queries(app, names, sample)
+        db.session.remove()
+        db.engine.dispose()
+    
+    port = free_port()
+    log_path = os.path.join(tempfile.gettempdir(), f"api-benchmark-gunicorn-{port}.log")
+    server = start_server(args, database_url, port, log_path)
+    results = {}
+    try:
+        for name in names:
+            heavy = WORKLOADS[name][3]
+            result = run_workload(
+                port, name, sample, args.heavy_requests if heavy else args.requests,
+                1 if heavy else args.concurrency, args.warmup
+            )
+            result['queries'] = queries.get(name)
+            results[name] = result
+            print(f"  {name:<26} p95 {result['p95_ms']:8.1f} ms  {result['rps']:8.1f} req/s  {result['errors']} error(s)")
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+    
+    run = {
+        'meta': {
+            'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'git_commit': subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True, text=True).stdout.strip(),
+            'database': database_url.split(':', 1)[0],
+            'dataset': dataset,
+            'concurrency': args.concurrency,
+            'requests': args.requests,
+            'workers': args.workers,
+            'threads': args.threads,
+            'python': platform.python_version(),
+            'cpus': os.cpu_count()
+        },
+        'results': results
+    }
+    print_table(results, baseline)
+    for path in (args.output, args.save_baseline):
+        if path:
+            with open(path, 'w') as f:
+                json.dump(run, f, indent=2)
+            print(f"\nWrote {path}")
+    
+    if baseline:
+        settings = ('database', 'dataset', 'concurrency', 'workers', 'threads', 'cpus')
+        changed = [key for key in settings if baseline['meta'].get(key) != run['meta'][key]]
+        if changed:
+            print(f"\nNote: {', '.join(changed)} differ from the baseline ({baseline['meta'].get('git_commit')}); numbers may not be comparable")
+        flags = compare(results, baseline, args.tolerance, args.min_delta_ms)
+        print(f"\n{len(flags)} regression(s) against {args.baseline}")
+        for flag in flags:
+            print(f"  REGRESSION {flag}")
+        if flags:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,143 @@
+"""
+Always-on cost of the request/SQL metrics.
+
+Times the same requests through the test client with METRICS_ENABLED=0
+and =1, each in a fresh interpreter against the same seeded SQLite file,
+and reports the per-request difference. The runs alternate to spread
+noise from the machine evenly over both modes. The instrumentation hooks
+are also timed on their own, which is the figure to watch.
+
+Usage:
+    python benchmarks/metrics_overhead.py --requests 2000 --rounds 3
+    python benchmarks/metrics_overhead.py --path '/api/products?limit=20'
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=2000, help='timed requests per run')
+    parser.add_argument('--rounds', type=int, default=3, help='runs per mode')
+    parser.add_argument('--path', action='append', help='GET paths to cycle through (repeatable)')
+    parser.add_argument('--sql-statements', type=int, default=5, help='statements per request for the hook timing')
+    parser.add_argument('--run', choices=('0', '1'), help=argparse.SUPPRESS)
+    parser.add_argument('--database', help=argparse.SUPPRESS)
+    return parser.parse_args()
+
+
+def seed(database):
+    os.environ['DATABASE_URL'] = f"sqlite:///{database}"
+    from main import app
+    from extensions import db
+    from models import Product, Stock
+    from schema import init_database
+    from checkout import create_orders_batch
+    
+    with app.app_context():
+        init_database()
+        for index in range(50):
+            product = Product(
+                name=f"Metrics Product {index}", sku=f"METRICS-{index}",
+                hsn_code='0000', category='Bench', unit_price=10.0, gst_rate=18.0
+            )
+            db.session.add(product)
+            db.session.flush()
+            db.session.add(Stock(product_id=product.id, available_qty=10 ** 6, min_qty=0))
+        db.session.commit()
+        create_orders_batch([
+            {'order_type': 'sales', 'items': [{'product_id': 1 + k % 50, 'quantity': 1, 'unit_price': 10.0}]}
+            for k in range(500)
+        ])
+
+
+def timed_run(args):
+    os.environ['DATABASE_URL'] = f"sqlite:///{args.database}"
+    os.environ['METRICS_ENABLED'] = args.run
+    import logging
+    from main import app
+    
+    logging.disable(logging.WARNING)
+    client = app.test_client()
+    paths = args.path
+    for path in paths:
+        client.get(path)  # Warm caches and lazy imports
+    
+    started = time.perf_counter()
+    for index in range(args.requests):
+        client.get(paths[index % len(paths)])
+    elapsed = time.perf_counter() - started
+    result = {'metrics': args.run == '1', 'us_per_request': elapsed / args.requests * 1e6}
+    if args.run == '1':
+        result['hook_us'] = hook_cost(app, args.sql_statements)
+    print(json.dumps(result))
+
+
+def hook_cost(app, sql_statements, iterations=20000):
+    """Microseconds the instrumentation adds to one request running `sql_statements` statements.
+    
+    Calls the hooks directly, so it is not drowned out by the noise of
+    whole requests; the end-to-end runs show the same cost in context.
+    """
+    from flask import Response
+    from metrics import _before_cursor_execute, _after_cursor_execute
+    
+    metrics = app.extensions['metrics']
+    response = Response('x' * 2048)
+    connection = type('Connection', (), {'info': {}})()
+    with app.test_request_context('/api/orders'):
+        started = time.perf_counter()
+        for _ in range(iterations):
+            metrics.before_request()
+            for _ in range(sql_statements):
+                _before_cursor_execute(connection, None, None, None, None, False)
+                _after_cursor_execute(connection, None, None, None, None, False)
+            metrics.after_request(response)
+        return (time.perf_counter() - started) / iterations * 1e6
+
+
+def main():
+    args = parse_args()
+    args.path = args.path or ['/api/orders?limit=20', '/api/products?limit=20', '/dashboard']
+    if args.run:
+        timed_run(args)
+        return
+    
+    database = os.path.join(tempfile.mkdtemp(prefix='metrics-overhead-'), 'bench.db')
+    seed(database)
+    timings = {'0': [], '1': []}
+    hooks = []
+    for _ in range(args.rounds):
+        for mode in ('0', '1'):
+            output = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), '--run', mode, '--database', database,
+                 '--requests', str(args.requests), '--sql-statements', str(args.sql_statements), *[arg for path in args.path for arg in ('--path', path)]],
+                capture_output=True, text=True, cwd=ROOT
+            )
+            lines = [line for line in output.stdout.splitlines() if line.startswith('{')]
+            if output.returncode != 0 or not lines:
+                sys.exit(f"run failed:\n{output.stderr[-2000:]}")
+            result = json.loads(lines[-1])
+            timings[mode].append(result['us_per_request'])
+            if 'hook_us' in result:
+                hooks.append(result['hook_us'])
+    
+    off, on = min(timings['0']), min(timings['1'])
+    print(f"{args.requests} requests x {args.rounds} rounds over {', '.join(args.path)}")
+    print(f"metrics off: {off:8.1f} us/request (best of {args.rounds})")
+    print(f"metrics on:  {on:8.1f} us/request (best of {args.rounds})")
+    print(f"difference:  {on - off:8.1f} us/request ({(on - off) / off:.1%}; run-to-run noise on a busy machine can exceed this)")
+    hook = min(hooks)
+    print(f"hooks alone: {hook:8.1f} us/request with {args.sql_statements} SQL statements ({hook / off:.1%} of a request)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,207 @@
+"""
+Mixed read/write throughput on /api/orders with several worker processes
+sharing one SQLite file, with and without the concurrent SQLite profile.
+
+Each mode gets a fresh database. Worker processes are forked from one
+preloaded app, like gunicorn --preload workers. For --duration seconds,
+each worker reads the latest orders page (GET /api/orders?limit=50) or
+places a sales order (POST /api/orders), picked by --write-ratio.
+
+  * default:    SQLite's own settings (rollback journal, synchronous=FULL)
+  * concurrent: WAL, synchronous=NORMAL, busy_timeout, mmap and cache sizing
+
+Usage:
+    python benchmarks/sqlite_concurrency.py --processes 4 --duration 10
+    python benchmarks/sqlite_concurrency.py --modes concurrent --write-ratio 0.5
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from queue import Empty
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+MODES = ('default', 'concurrent')
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--processes', type=int, default=4, help='worker processes sharing the database')
+    parser.add_argument('--duration', type=float, default=10.0, help='seconds of load per mode')
+    parser.add_argument('--write-ratio', type=float, default=0.3, help='fraction of requests that place orders')
+    parser.add_argument('--products', type=int, default=20)
+    parser.add_argument('--seed-orders', type=int, default=500, help='orders created before the run starts')
+    parser.add_argument('--modes', nargs='+', choices=MODES, default=list(MODES))
+    parser.add_argument('--run-mode', choices=MODES, help=argparse.SUPPRESS)
+    parser.add_argument('--seed', type=int, default=42)
+    return parser.parse_args()
+
+
+def percentile(values, fraction):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+def worker(app, args, index, product_ids, queue):
+    rng = random.Random(args.seed + index)
+    client = app.test_client()
+    stats = {'read': [], 'write': [], 'errors': {}}
+    deadline = time.perf_counter() + args.duration
+    try:
+        run_requests(client, rng, args, product_ids, deadline, stats)
+    finally:
+        queue.put(stats)
+
+
+def run_requests(client, rng, args, product_ids, deadline, stats):
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        if rng.random() < args.write_ratio:
+            kind = 'write'
+            items = [
+                {'product_id': product_id, 'quantity': 1, 'unit_price': 10.0}
+                for product_id in rng.sample(product_ids, rng.randint(1, 3))
+            ]
+            response = client.post('/api/orders', json={'order_type': 'sales', 'items': items})
+        else:
+            kind = 'read'
+            response = client.get('/api/orders?limit=50')
+        elapsed = time.perf_counter() - started
+        if response.status_code == 200:
+            stats[kind].append(elapsed)
+        else:
+            error = (response.get_json(silent=True) or {}).get('error', str(response.status_code))
+            key = f"{kind}: {error[:80]}"
+            stats['errors'][key] = stats['errors'].get(key, 0) + 1
+
+
+def run_mode(args):
+    """Runs in a fresh interpreter so each mode builds its own app and engine"""
+    db_path = os.path.join(tempfile.mkdtemp(prefix='sqlite-concurrency-'), 'bench.db')
+    os.environ['DATABASE_URL'] = f"sqlite:///{db_path}"
+    os.environ['SQLITE_PROFILE'] = args.run_mode
+    
+    import logging
+    from main import app
+    from extensions import db
+    from models import Product, Stock
+    from schema import init_database
+    
+    logging.disable(logging.WARNING)
+    with app.app_context():
+        init_database()
+        product_ids = []
+        for index in range(args.products):
+            product = Product(
+                name=f"Bench Product {index}", sku=f"BENCH-{index}",
+                hsn_code='0000', category='Bench', unit_price=10.0, gst_rate=18.0
+            )
+            db.session.add(product)
+            db.session.flush()
+            db.session.add(Stock(product_id=product.id, available_qty=10 ** 9, min_qty=0))
+            product_ids.append(product.id)
+        db.session.commit()
+        journal_mode = db.session.execute(db.text('PRAGMA journal_mode')).scalar()
+        db.session.remove()
+        
+        client = app.test_client()
+        for start in range(0, args.seed_orders, 1000):
+            client.post('/api/orders/batch', json=[
+                {'order_type': 'sales', 'items': [{'product_id': product_ids[k % len(product_ids)], 'quantity': 1, 'unit_price': 10.0}]}
+                for k in range(start, min(start + 1000, args.seed_orders))
+            ])
+    
+    context = multiprocessing.get_context('fork')
+    queue = context.Queue()
+    processes = [
+        context.Process(target=worker, args=(app, args, index, product_ids, queue))
+        for index in range(args.processes)
+    ]
+    started = time.perf_counter()
+    for process in processes:
+        process.start()
+    # A worker stuck on a lock for longer than this is reported rather than waited for
+    results = []
+    for _ in processes:
+        try:
+            results.append(queue.get(timeout=args.duration + 60))
+        except Empty:
+            results.append({'read': [], 'write': [], 'errors': {'worker timed out': 1}})
+            break
+    for process in processes:
+        process.join(timeout=5)
+        if process.is_alive():
+            process.terminate()
+    elapsed = time.perf_counter() - started
+    
+    reads = [value for result in results for value in result['read']]
+    writes = [value for result in results for value in result['write']]
+    errors = {}
+    for result in results:
+        for key, count in result['errors'].items():
+            errors[key] = errors.get(key, 0) + count
+    
+    print(json.dumps({
+        'mode': args.run_mode,
+        'journal_mode': journal_mode,
+        'elapsed': elapsed,
+        'reads': len(reads),
+        'writes': len(writes),
+        'read_p50_ms': (percentile(reads, 0.5) or 0) * 1000,
+        'read_p95_ms': (percentile(reads, 0.95) or 0) * 1000,
+        'write_p50_ms': (percentile(writes, 0.5) or 0) * 1000,
+        'write_p95_ms': (percentile(writes, 0.95) or 0) * 1000,
+        'errors': errors
+    }))
+
+
+def main():
+    args = parse_args()
+    if args.run_mode:
+        run_mode(args)
+        return
+    
+    passthrough = [
+        '--processes', str(args.processes), '--duration', str(args.duration),
+        '--write-ratio', str(args.write_ratio), '--products', str(args.products),
+        '--seed-orders', str(args.seed_orders), '--seed', str(args.seed)
+    ]
+    print(f"{args.processes} processes, {args.duration:.0f}s per mode, {args.write_ratio:.0%} writes")
+    print(f"{'mode':<12}{'journal':>9}{'reads/s':>10}{'writes/s':>10}{'read p50/p95 ms':>18}{'write p50/p95 ms':>19}{'errors':>8}")
+    for mode in args.modes:
+        try:
+            output = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), '--run-mode', mode, *passthrough],
+                capture_output=True, text=True, cwd=ROOT, timeout=args.duration + 300
+            )
+        except subprocess.TimeoutExpired:
+            print(f"{mode:<12} timed out")
+            continue
+        lines = [line for line in output.stdout.splitlines() if line.startswith('{')]
+        if output.returncode != 0 or not lines:
+            print(f"{mode:<12} failed:\n{output.stderr[-2000:]}")
+            continue
+        result = json.loads(lines[-1])
+        print(
+            f"{mode:<12}{result['journal_mode']:>9}"
+            f"{result['reads'] / result['elapsed']:>10.1f}{result['writes'] / result['elapsed']:>10.1f}"
+            f"{result['read_p50_ms']:>9.1f}/{result['read_p95_ms']:<8.1f}"
+            f"{result['write_p50_ms']:>10.1f}/{result['write_p95_ms']:<8.1f}"
+            f"{sum(result['errors'].values()):>8}"
+        )
+        for error, count in sorted(result['errors'].items(), key=lambda item: -item[1])[:3]:
+            print(f"    {count} x {error}")
+        sys.stdout.flush()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,129 @@
+"""
+Multi-threaded checkout stress test.
+
+Fires concurrent sales orders at POST /api/orders against a throwaway
+database and checks the invariants the checkout path must hold:
+
+  * every created order has a unique order number
+  * no stock row ever goes negative
+  * stock taken == quantity on successful orders (nothing lost or oversold)
+
+Usage:
+    python benchmarks/stress_checkout.py --threads 16 --orders 50
+    DATABASE_URL=postgresql://... python benchmarks/stress_checkout.py
+
+Exits with status 1 if any invariant is violated.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--threads', type=int, default=16, help='concurrent client threads')
+    parser.add_argument('--orders', type=int, default=50, help='orders placed by each thread')
+    parser.add_argument('--products', type=int, default=5, help='products competing for stock')
+    parser.add_argument('--stock', type=int, default=200, help='starting stock per product')
+    parser.add_argument('--seed', type=int, default=42)
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    
+    if 'DATABASE_URL' not in os.environ:
+        db_path = os.path.join(tempfile.mkdtemp(prefix='stress-checkout-'), 'stress.db')
+        os.environ['DATABASE_URL'] = f"sqlite:///{db_path}"
+    
+    from app import app
+    from extensions import db
+    from models import Product, Stock, Order, OrderItem
+    from schema import init_database
+    
+    # Seed products with a fixed amount of stock to fight over
+    with app.app_context():
+        init_database()
+        product_ids = []
+        for index in range(args.products):
+            product = Product(
+                name=f"Stress Product {index}", sku=f"STRESS-{time.time_ns()}-{index}",
+                hsn_code='0000', category='Stress', unit_price=10.0, gst_rate=18.0
+            )
+            db.session.add(product)
+            db.session.flush()
+            db.session.add(Stock(product_id=product.id, available_qty=args.stock, min_qty=0))
+            product_ids.append(product.id)
+        db.session.commit()
+    
+    results = {'created': [], 'rejected': 0, 'errors': []}
+    lock = threading.Lock()
+    
+    def worker(thread_index):
+        rng = random.Random(args.seed + thread_index)
+        client = app.test_client()
+        for _ in range(args.orders):
+            items = [
+                {'product_id': product_id, 'quantity': rng.randint(1, 3), 'unit_price': 10.0}
+                for product_id in rng.sample(product_ids, rng.randint(1, len(product_ids)))
+            ]
+            response = client.post('/api/orders', json={'order_type': 'sales', 'items': items})
+            with lock:
+                if response.status_code == 200:
+                    results['created'].append(response.get_json()['order_id'])
+                elif response.status_code == 409:
+                    results['rejected'] += 1
+                else:
+                    results['errors'].append(response.get_json())
+    
+    threads = [threading.Thread(target=worker, args=(index,)) for index in range(args.threads)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    
+    failures = []
+    with app.app_context():
+        order_numbers = [
+            number for (number,) in db.session.query(Order.order_number).filter(Order.id.in_(results['created']))
+        ]
+        if len(order_numbers) != len(set(order_numbers)):
+            failures.append(f"duplicate order numbers: {len(order_numbers) - len(set(order_numbers))}")
+        
+        for product_id in product_ids:
+            remaining = db.session.query(Stock.available_qty).filter_by(product_id=product_id).scalar()
+            sold = db.session.query(db.func.coalesce(db.func.sum(OrderItem.quantity), 0)).filter(
+                OrderItem.product_id == product_id, OrderItem.order_id.in_(results['created'])
+            ).scalar()
+            if remaining < 0:
+                failures.append(f"product {product_id} went negative: {remaining}")
+            if remaining + sold != args.stock:
+                failures.append(f"product {product_id} lost stock: {args.stock} start, {sold} sold, {remaining} left")
+    
+    attempted = args.threads * args.orders
+    print(f"attempted {attempted} orders with {args.threads} threads in {elapsed:.2f}s "
+          f"({attempted / elapsed:.1f} orders/s)")
+    print(f"created {len(results['created'])}, rejected for stock {results['rejected']}, "
+          f"errors {len(results['errors'])}")
+    for error in results['errors'][:5]:
+        print(f"  error: {error}")
+    
+    if results['errors']:
+        failures.append(f"{len(results['errors'])} unexpected errors")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    if failures:
+        sys.exit(1)
+    print("OK: unique order numbers, no negative or lost stock")
+
+
+if __name__ == '__main__':
+    main()
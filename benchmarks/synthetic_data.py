@@ -0,0 +1,260 @@
+"""
+Bulk synthetic dataset for benchmarks: products, stock, warehouses,
+customers, sales/purchase orders with GST-split lines, and credit
+transactions.
+
+Rows go in through multi-row Core inserts in chunks, skipping the ORM,
+so 100k products and a few million order lines take minutes, not hours.
+Order and line ids are assigned here, continuing after any existing
+rows, so a database can be grown in several runs. The same --seed gives
+the same data.
+
+Usage:
+    python benchmarks/synthetic_data.py --products 100000 --orders 1000000 --lines-per-order 3
+    DATABASE_URL=postgresql://... python benchmarks/synthetic_data.py --products 20000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+CHUNK_ROWS = 20000
+CATEGORIES = ('Electronics', 'Grocery', 'Pharma', 'Apparel', 'Hardware', 'Stationery', 'Home', 'Beauty')
+HSN_CODES = ('8471', '1006', '3004', '6109', '7318', '4820', '9403', '3304')
+GST_RATES = (0.0, 5.0, 12.0, 18.0, 28.0)
+STATE_CODES = ('27', '29', '07', '33', '24', '09', '19', '36')
+# Seller's state for the IGST vs CGST/SGST split, unless BUSINESS_STATE_CODE / BUSINESS_GSTIN is set
+SELLER_STATE_CODE = STATE_CODES[0]
+TABLES = (
+    'product', 'stock', 'warehouse', 'warehouse_stock', 'customer',
+    'order', 'order_item', 'credit_transaction'
+)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    add_arguments(parser)
+    return parser.parse_args()
+
+
+def add_arguments(parser):
+    parser.add_argument('--products', type=int, default=5000)
+    parser.add_argument('--customers', type=int, default=2000)
+    parser.add_argument('--orders', type=int, default=50000)
+    parser.add_argument('--lines-per-order', type=float, default=3.0, help='average order lines (1 to 2x-1)')
+    parser.add_argument('--warehouses', type=int, default=3)
+    parser.add_argument('--days', type=int, default=365, help='days of order history')
+    parser.add_argument('--purchase-ratio', type=float, default=0.1, help='fraction of orders that are purchases')
+    parser.add_argument('--credit-ratio', type=float, default=0.2, help='fraction of sales orders sold on credit')
+    parser.add_argument('--seed', type=int, default=42)
+
+
+def insert_chunks(table, rows):
+    """Insert an iterable of row dicts in CHUNK_ROWS batches; returns the row count"""
+    from extensions import db
+    
+    count = 0
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= CHUNK_ROWS:
+            db.session.execute(table.insert(), chunk)
+            count += len(chunk)
+            chunk = []
+    if chunk:
+        db.session.execute(table.insert(), chunk)
+        count += len(chunk)
+    db.session.commit()
+    return count
+
+
+def next_id(model):
+    from extensions import db
+    
+    return (db.session.query(db.func.max(model.id)).scalar() or 0) + 1
+
+
+def generate(products=5000, customers=2000, orders=50000, lines_per_order=3.0, warehouses=3,
+             days=365, purchase_ratio=0.1, credit_ratio=0.2, seed=42, log=print):
+    """Append a synthetic dataset to the app's database; returns row counts per table.
+    
+    Needs an app context and an initialized schema (init-db).
+    """
+    from sqlalchemy import bindparam
+    from extensions import db
+    from models import Product, Stock, Customer, Order, OrderItem, CreditTransaction
+    from models_advanced import Warehouse, WarehouseStock
+    from gst_engine import split_order_lines
+    from stats_cache import bump_version
+    
+    rng = random.Random(seed)
+    counts = {}
+    now = datetime.utcnow()
+    started = time.perf_counter()
+    
+    def done(table, count):
+        counts[table] = count
+        log(f"  {table:<20} {count:>10,} rows  ({time.perf_counter() - started:6.1f}s)")
+    
+    # Catalog, one stock row per product
+    first_product = next_id(Product)
+    product_ids = range(first_product, first_product + products)
+    prices = {}
+    rates = {}
+    
+    def product_rows():
+        for product_id in product_ids:
+            index = rng.randrange(len(CATEGORIES))
+            price = round(rng.uniform(10, 5000), 2)
+            prices[product_id] = price
+            rates[product_id] = rng.choice(GST_RATES)
+            yield {
+                'id': product_id, 'name': f"Synthetic {CATEGORIES[index]} {product_id}", 'sku': f"SYN-{seed}-{product_id:07d}",
+                'hsn_code': HSN_CODES[index], 'category': CATEGORIES[index], 'unit_price': price,
+                'purchase_price': round(price * rng.uniform(0.6, 0.9), 2), 'gst_rate': rates[product_id],
+                'description': '', 'base_unit': 'piece', 'conversion_factor': 1,
+                'track_batches': False, 'has_expiry': False, 'created_at': now, 'updated_at': now
+            }
+    done('product', insert_chunks(Product.__table__, product_rows()))
+    done('stock', insert_chunks(Stock.__table__, (
+        {'product_id': product_id, 'available_qty': rng.randint(0, 500), 'min_qty': 10}
+        for product_id in product_ids
+    )))
+    
+    first_warehouse = next_id(Warehouse)
+    warehouse_ids = range(first_warehouse, first_warehouse + warehouses)
+    done('warehouse', insert_chunks(Warehouse.__table__, (
+        {'id': warehouse_id, 'name': f"Synthetic Warehouse {warehouse_id}", 'code': f"SYN-{seed}-{warehouse_id}",
+         'is_active': True, 'created_at': now}
+        for warehouse_id in warehouse_ids
+    )))
+    done('warehouse_stock', insert_chunks(WarehouseStock.__table__, (
+        {'warehouse_id': warehouse_id, 'product_id': product_id, 'available_qty': rng.randint(0, 200),
+         'reserved_qty': 0, 'min_qty': 10, 'max_qty': 1000, 'location': f"R{product_id % 50}-S{product_id % 7}",
+         'last_updated': now}
+        for warehouse_id in warehouse_ids for product_id in product_ids
+    )))
+    
+    first_customer = next_id(Customer)
+    customer_list = []
+    
+    def customer_rows():
+        for customer_id in range(first_customer, first_customer + customers):
+            gst = f"{rng.choice(STATE_CODES)}ABCDE{customer_id % 10000:04d}F1Z5" if rng.random() < 0.5 else None
+            customer = {
+                'id': customer_id, 'name': f"Customer {customer_id}", 'mobile': f"9{seed % 10}{customer_id:08d}",
+                'email': f"customer{customer_id}@example.com", 'gst_number': gst, 'address': '',
+                'credit_limit': 50000.0, 'outstanding_amount': 0.0, 'created_at': now
+            }
+            customer_list.append(customer)
+            yield customer
+    done('customer', insert_chunks(Customer.__table__, customer_rows()))
+    
+    # Orders and their lines in chunks, GST split by the same engine checkout uses
+    first_order = next_id(Order)
+    first_line = next_id(OrderItem)
+    outstanding = {}
+    order_count = line_count = credit_count = 0
+    max_lines = max(1, int(lines_per_order * 2) - 1)
+    orders_per_chunk = max(1, int(CHUNK_ROWS / lines_per_order))
+    for chunk_start in range(0, orders, orders_per_chunk):
+        chunk_orders, chunk_lines = [], []
+        for order_id in range(first_order + chunk_start, first_order + min(orders, chunk_start + orders_per_chunk)):
+            customer = rng.choice(customer_list) if customer_list else None
+            lines = [
+                (product_id, rng.randint(1, 10))
+                for product_id in rng.sample(product_ids, min(rng.randint(1, max_lines), len(product_ids)))
+            ]
+            created = now - timedelta(seconds=rng.randrange(days * 86400))
+            chunk_orders.append({
+                'id': order_id, 'order_number': f"SYN{seed}-{order_id:09d}",
+                'order_type': 'purchase' if rng.random() < purchase_ratio else 'sales',
+                'customer_name': customer['name'] if customer else None,
+                'customer_mobile': customer['mobile'] if customer else None,
+                'customer_gst': customer['gst_number'] if customer else None,
+                'status': 'completed' if rng.random() < 0.9 else 'pending',
+                'created_at': created, 'updated_at': created,
+                'lines': lines, 'customer_id': customer['id'] if customer else None
+            })
+        places, splits = split_order_lines([
+            (order['customer_gst'], [(prices[product_id] * quantity, rates[product_id]) for product_id, quantity in order['lines']])
+            for order in chunk_orders
+        ])
+        
+        split_iter = iter(splits)
+        credits = []
+        for order, place in zip(chunk_orders, places):
+            total = gst = 0.0
+            for product_id, quantity in order.pop('lines'):
+                split = next(split_iter)
+                taxable = prices[product_id] * quantity
+                tax = split['cgst_amount'] + split['sgst_amount'] + split['igst_amount']
+                total += taxable + tax
+                gst += tax
+                chunk_lines.append({
+                    'id': first_line + line_count, 'order_id': order['id'], 'product_id': product_id,
+                    'quantity': quantity, 'unit_price': prices[product_id], 'total_price': taxable, **split
+                })
+                line_count += 1
+            customer_id = order.pop('customer_id')
+            order.update(total_amount=round(total, 2), gst_amount=round(gst, 2), place_of_supply=place)
+            if customer_id and order['order_type'] == 'sales' and rng.random() < credit_ratio:
+                paid = round(total * rng.choice((0.0, 0.5, 1.0)), 2)
+                credits.append({'customer_id': customer_id, 'order_id': order['id'], 'transaction_type': 'sale',
+                                'amount': order['total_amount'], 'description': f"Order {order['order_number']}",
+                                'created_at': order['created_at']})
+                if paid:
+                    credits.append({'customer_id': customer_id, 'order_id': order['id'], 'transaction_type': 'payment',
+                                    'amount': paid, 'description': 'Payment received',
+                                    'created_at': order['created_at'] + timedelta(days=rng.randint(1, 30))})
+                outstanding[customer_id] = outstanding.get(customer_id, 0.0) + order['total_amount'] - paid
+        
+        db.session.execute(Order.__table__.insert(), chunk_orders)
+        for start in range(0, len(chunk_lines), CHUNK_ROWS):
+            db.session.execute(OrderItem.__table__.insert(), chunk_lines[start:start + CHUNK_ROWS])
+        if credits:
+            db.session.execute(CreditTransaction.__table__.insert(), credits)
+        db.session.commit()
+        order_count += len(chunk_orders)
+        credit_count += len(credits)
+    done('order', order_count)
+    done('order_item', line_count)
+    done('credit_transaction', credit_count)
+    
+    if outstanding:
+        customer_table = Customer.__table__
+        db.session.execute(
+            customer_table.update()
+            .where(customer_table.c.id == bindparam('customer_id'))
+            .values(outstanding_amount=bindparam('amount')),
+            [{'customer_id': customer_id, 'amount': round(amount, 2)} for customer_id, amount in outstanding.items()]
+        )
+        db.session.commit()
+    
+    # Core inserts skip the ORM hooks that publish new data versions
+    bump_version(*TABLES)
+    return counts
+
+
+def main():
+    args = parse_args()
+    if not os.environ.get('BUSINESS_GSTIN'):
+        os.environ.setdefault('BUSINESS_STATE_CODE', SELLER_STATE_CODE)
+    from main import app
+    from schema import init_database
+    
+    with app.app_context():
+        init_database()
+        print(f"Generating into {app.config['SQLALCHEMY_DATABASE_URI']}")
+        started = time.perf_counter()
+        counts = generate(**vars(args))
+        print(f"{sum(counts.values()):,} rows in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == '__main__':
+    main()
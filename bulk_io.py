@@ -0,0 +1,240 @@
+# Streaming bulk product import/export (CSV and NDJSON)
+import csv
+import io
+import json
+from datetime import datetime
+from sqlalchemy import insert, update
+from extensions import db
+from models import Product, Stock
+
+IMPORT_CHUNK_SIZE = 1000
+EXPORT_BATCH_SIZE = 1000
+MAX_REPORTED_ERRORS = 1000
+
+PRODUCT_FIELDS = {
+    'name': str,
+    'sku': str,
+    'hsn_code': str,
+    'category': str,
+    'unit_price': float,
+    'purchase_price': float,
+    'gst_rate': float,
+    'description': str,
+}
+STOCK_FIELDS = {
+    'available_qty': int,
+    'min_qty': int,
+}
+REQUIRED_FOR_INSERT = ('name', 'sku', 'hsn_code', 'category', 'unit_price')
+EXPORT_COLUMNS = list(PRODUCT_FIELDS) + list(STOCK_FIELDS)
+
+
+class _ReadOnlyStream(io.RawIOBase):
+    """io wrapper for WSGI input streams that only implement read(), like gunicorn's request body"""
+    
+    def __init__(self, stream):
+        self.stream = stream
+    
+    def readable(self):
+        return True
+    
+    def readinto(self, buffer):
+        data = self.stream.read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+
+
+def text_stream(stream, encoding, newline=None):
+    """Decode a binary stream lazily; TextIOWrapper needs the full io interface"""
+    if not hasattr(stream, 'readable'):
+        stream = io.BufferedReader(_ReadOnlyStream(stream))
+    return io.TextIOWrapper(stream, encoding=encoding, newline=newline)
+
+
+def iter_csv_rows(stream):
+    """Yield (line_number, row_dict) from a binary CSV stream without buffering it"""
+    reader = csv.DictReader(text_stream(stream, 'utf-8-sig', newline=''))
+    for row in reader:
+        yield reader.line_num, row
+
+
+def iter_ndjson_rows(stream):
+    """Yield (line_number, row_dict) from a binary NDJSON stream, one object per line"""
+    for line_number, line in enumerate(text_stream(stream, 'utf-8'), start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            row = {'__error__': f"Invalid JSON: {e}"}
+        yield line_number, row
+
+
+def parse_product_row(row):
+    """Coerce a raw import row into (product_values, stock_values). Blank cells are skipped."""
+    if not isinstance(row, dict):
+        raise ValueError("Row must be an object")
+    if '__error__' in row:
+        raise ValueError(row['__error__'])
+    
+    product_values = {}
+    stock_values = {}
+    for fields, target in ((PRODUCT_FIELDS, product_values), (STOCK_FIELDS, stock_values)):
+        for field, cast in fields.items():
+            value = row.get(field)
+            if value is None or (isinstance(value, str) and not value.strip()):
+                continue
+            try:
+                target[field] = cast(value.strip() if isinstance(value, str) else value)
+            except (TypeError, ValueError):
+                raise ValueError(f"Invalid {field}: {value!r}")
+    
+    if not product_values.get('sku'):
+        raise ValueError("Missing sku")
+    return product_values, stock_values
+
+
+def _upsert_chunk(chunk):
+    """Upsert one chunk of parsed rows by SKU using executemany-style statements"""
+    # Last row wins when a SKU repeats inside the chunk
+    by_sku = {}
+    for line_number, product_values, stock_values in chunk:
+        by_sku[product_values['sku']] = (line_number, product_values, stock_values)
+    
+    existing = dict(
+        db.session.query(Product.sku, Product.id).filter(Product.sku.in_(list(by_sku)))
+    )
+    
+    errors = []
+    new_products = []
+    product_updates = []
+    for sku, (line_number, product_values, stock_values) in by_sku.items():
+        if sku in existing:
+            if len(product_values) > 1:
+                product_updates.append({'id': existing[sku], **product_values, 'updated_at': datetime.utcnow()})
+            continue
+        missing = [field for field in REQUIRED_FOR_INSERT if field not in product_values]
+        if missing:
+            errors.append({'line': line_number, 'sku': sku, 'error': f"Missing {', '.join(missing)} for new product"})
+            continue
+        new_products.append(product_values)
+    
+    if product_updates:
+        db.session.execute(update(Product), product_updates)
+    
+    inserted_ids = {}
+    if new_products:
+        inserted = db.session.execute(
+            insert(Product).returning(Product.sku, Product.id, sort_by_parameter_order=True),
+            new_products
+        )
+        inserted_ids = dict(inserted.all())
+    
+    # Stock rows: update the ones that exist, create the rest
+    product_ids = {**existing, **inserted_ids}
+    stock_ids = dict(
+        db.session.query(Stock.product_id, Stock.id).filter(Stock.product_id.in_(list(product_ids.values())))
+    )
+    
+    stock_updates = []
+    new_stock = []
+    for sku, product_id in product_ids.items():
+        stock_values = by_sku[sku][2]
+        if product_id in stock_ids:
+            if stock_values:
+                stock_updates.append({'id': stock_ids[product_id], **stock_values})
+        else:
+            new_stock.append({
+                'product_id': product_id,
+                'available_qty': stock_values.get('available_qty', 0),
+                'min_qty': stock_values.get('min_qty', 10)
+            })
+    
+    if stock_updates:
+        db.session.execute(update(Stock), stock_updates)
+    if new_stock:
+        db.session.execute(insert(Stock), new_stock)
+    
+    return len(inserted_ids), len(existing), errors
+
+
+def import_products(rows, chunk_size=IMPORT_CHUNK_SIZE):
+    """Stream (line_number, row) pairs into Product + Stock, committing per chunk.
+    
+    Invalid rows are reported and skipped. If a chunk fails in the database
+    it is rolled back and every row in it is reported, but later chunks
+    still load.
+    """
+    summary = {'processed': 0, 'inserted': 0, 'updated': 0, 'failed': 0, 'errors': []}
+    
+    def report(error):
+        summary['failed'] += 1
+        if len(summary['errors']) < MAX_REPORTED_ERRORS:
+            summary['errors'].append(error)
+    
+    def flush(chunk):
+        try:
+            inserted, updated, errors = _upsert_chunk(chunk)
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            for line_number, product_values, _ in chunk:
+                report({'line': line_number, 'sku': product_values['sku'], 'error': str(e)})
+            return
+        summary['inserted'] += inserted
+        summary['updated'] += updated
+        for error in errors:
+            report(error)
+    
+    chunk = []
+    for line_number, row in rows:
+        summary['processed'] += 1
+        try:
+            product_values, stock_values = parse_product_row(row)
+        except ValueError as e:
+            report({'line': line_number, 'sku': row.get('sku') if isinstance(row, dict) else None, 'error': str(e)})
+            continue
+        chunk.append((line_number, product_values, stock_values))
+        if len(chunk) >= chunk_size:
+            flush(chunk)
+            chunk = []
+    if chunk:
+        flush(chunk)
+    
+    summary['errors_truncated'] = summary['failed'] > len(summary['errors'])
+    return summary
+
+
+def iter_product_export(batch_size=EXPORT_BATCH_SIZE):
+    """Yield export rows as dicts from a server-side cursor, batch_size rows at a time"""
+    columns = [getattr(Product, field) for field in PRODUCT_FIELDS]
+    statement = db.select(
+        *columns,
+        db.func.coalesce(Stock.available_qty, 0).label('available_qty'),
+        db.func.coalesce(Stock.min_qty, 10).label('min_qty')
+    ).outerjoin(Stock, Stock.product_id == Product.id).order_by(Product.id)
+    
+    result = db.session.execute(statement.execution_options(stream_results=True, yield_per=batch_size))
+    for row in result:
+        yield dict(row._mapping)
+
+
+def export_csv(rows):
+    """Render export rows as CSV text chunks"""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=EXPORT_COLUMNS)
+    writer.writeheader()
+    for row in rows:
+        writer.writerow(row)
+        if buffer.tell() >= 64 * 1024:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def export_ndjson(rows):
+    """Render export rows as NDJSON lines"""
+    for row in rows:
+        yield json.dumps(row, separators=(',', ':')) + '\n'
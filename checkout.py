@@ -0,0 +1,353 @@
+# Order checkout service - concurrency-safe order numbers and stock decrements
+from datetime import datetime
+from sqlalchemy import update, insert, func
+from sqlalchemy.exc import IntegrityError
+from extensions import db
+from models import Product, Stock, Order, OrderItem, OrderSequence
+from gst_engine import split_order_lines
+from sqlite_profile import retry_on_lock
+
+
+class InsufficientStockError(ValueError):
+    """Raised when a sales order would take a product's stock below zero"""
+    
+    def __init__(self, product_id, requested):
+        self.product_id = product_id
+        self.requested = requested
+        super().__init__(f"Insufficient stock for product ID {product_id} (requested {requested})")
+
+
+def issued_order_number(conn, prefix, day):
+    """Highest per-day counter already used in an order number for `day` (0 if none)"""
+    orders = Order.__table__
+    stem = f"{prefix}-{day}-"
+    latest = conn.execute(
+        db.select(orders.c.order_number)
+        .where(orders.c.order_number.like(f"{stem}%"))
+        .order_by(func.length(orders.c.order_number).desc(), orders.c.order_number.desc())
+        .limit(1)
+    ).scalar()
+    suffix = latest[len(stem):] if latest else ''
+    return int(suffix) if suffix.isdigit() else 0
+
+
+def allocate_order_numbers(count, prefix='ORD', now=None):
+    """Allocate `count` consecutive per-day order numbers, e.g. ORD-20240101-0001.
+    
+    The counter is bumped in its own short transaction so the row lock is
+    released immediately instead of being held for the whole checkout. A
+    rolled-back checkout leaves a gap in the sequence but never a duplicate.
+    A day's counter starts after the highest number already issued that
+    day, so numbers handed out before the sequence existed are not reused.
+    """
+    day = (now or datetime.now()).strftime('%Y%m%d')
+    table = OrderSequence.__table__
+    
+    for _ in range(5):
+        try:
+            with db.engine.begin() as conn:
+                bumped = conn.execute(
+                    table.update()
+                    .where(table.c.prefix == prefix, table.c.day == day)
+                    .values(last_value=table.c.last_value + count)
+                )
+                if bumped.rowcount == 0:
+                    # First order of the day - a concurrent insert loses on the unique constraint
+                    last_value = issued_order_number(conn, prefix, day) + count
+                    conn.execute(table.insert().values(prefix=prefix, day=day, last_value=last_value))
+                else:
+                    last_value = conn.execute(
+                        db.select(table.c.last_value).where(table.c.prefix == prefix, table.c.day == day)
+                    ).scalar_one()
+            return [f"{prefix}-{day}-{value:04d}" for value in range(last_value - count + 1, last_value + 1)]
+        except IntegrityError:
+            continue
+    
+    raise RuntimeError(f"Could not allocate order numbers for {day}")
+
+
+def allocate_order_number(prefix='ORD', now=None):
+    """Allocate the next per-day order number"""
+    return allocate_order_numbers(1, prefix=prefix, now=now)[0]
+
+
+def decrement_stock(quantities):
+    """Atomically take stock for {product_id: quantity}, rejecting oversell.
+    
+    Each product is a single conditional UPDATE, applied in product_id order
+    so concurrent checkouts always lock rows in the same sequence. Products
+    without a stock row are left untracked, as before.
+    """
+    for product_id in sorted(quantities):
+        quantity = quantities[product_id]
+        result = db.session.execute(
+            update(Stock)
+            .where(Stock.product_id == product_id, Stock.available_qty >= quantity)
+            .values(available_qty=Stock.available_qty - quantity)
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount == 0:
+            tracked = db.session.query(Stock.id).filter(Stock.product_id == product_id).first()
+            if tracked:
+                raise InsufficientStockError(product_id, quantity)
+
+
+def place_order(data):
+    """Create an order with its items and take stock for sales orders.
+    
+    The caller owns the transaction: commit on success, rollback on error.
+    """
+    order_number = allocate_order_number()
+    
+    order = Order()
+    order.order_number = order_number
+    order.order_type = data['order_type']
+    order.customer_name = data.get('customer_name', '')
+    order.customer_mobile = data.get('customer_mobile', '')
+    order.customer_gst = data.get('customer_gst', '')
+    order.status = 'pending'
+    
+    db.session.add(order)
+    db.session.flush()
+    
+    total_amount = 0
+    total_gst = 0
+    quantities = {}
+    lines = []
+    
+    for item_data in data['items']:
+        product = db.session.get(Product, item_data['product_id'])
+        if not product:
+            raise ValueError(f"Product with ID {item_data['product_id']} not found")
+        
+        quantity = int(item_data['quantity'])
+        if quantity <= 0:
+            raise ValueError(f"Quantity for product ID {product.id} must be positive")
+        unit_price = float(item_data['unit_price'])
+        item_total = quantity * unit_price
+        
+        # Calculate GST
+        gst_amount = (item_total * product.gst_rate) / 100
+        
+        order_item = OrderItem()
+        order_item.order_id = order.id
+        order_item.product_id = product.id
+        order_item.quantity = quantity
+        order_item.unit_price = unit_price
+        order_item.total_price = item_total
+        
+        db.session.add(order_item)
+        lines.append((order_item, item_total, product.gst_rate))
+        
+        total_amount += item_total
+        total_gst += gst_amount
+        quantities[product.id] = quantities.get(product.id, 0) + quantity
+    
+    # Update stock for sales orders
+    if data['order_type'] == 'sales':
+        decrement_stock(quantities)
+    
+    # Persist the CGST/SGST/IGST split for every line
+    places, splits = split_order_lines([(order.customer_gst, [(total, rate) for _, total, rate in lines])])
+    order.place_of_supply = places[0]
+    for (order_item, _, _), split in zip(lines, splits):
+        for field, value in split.items():
+            setattr(order_item, field, value)
+    
+    order.total_amount = total_amount
+    order.gst_amount = total_gst
+    
+    return order
+
+
+BATCH_MAX_ORDERS = 1000
+ORDER_STATUSES = ('pending', 'completed', 'cancelled')
+
+
+def _prepare_batch(orders_data, catalog):
+    """Validate orders against the prefetched catalog and a running stock ledger.
+    
+    Returns (prepared, results) where `prepared` holds the accepted orders in
+    input order and `results` has an error entry for every rejected one.
+    """
+    available = {product_id: qty for product_id, (_, qty) in catalog.items()}
+    prepared = []
+    results = [None] * len(orders_data)
+    
+    for index, data in enumerate(orders_data):
+        try:
+            order_type = data.get('order_type')
+            if order_type not in ('sales', 'purchase'):
+                raise ValueError(f"Invalid order_type: {order_type!r}")
+            status = data.get('status', 'pending')
+            if status not in ORDER_STATUSES:
+                raise ValueError(f"Invalid status: {status!r}")
+            created_at = datetime.fromisoformat(data['created_at']) if data.get('created_at') else datetime.utcnow()
+            if not data.get('items'):
+                raise ValueError("Order has no items")
+            
+            lines = []
+            quantities = {}
+            for item_data in data['items']:
+                product_id = int(item_data['product_id'])
+                if product_id not in catalog:
+                    raise ValueError(f"Product with ID {product_id} not found")
+                quantity = int(item_data['quantity'])
+                if quantity <= 0:
+                    raise ValueError(f"Quantity for product ID {product_id} must be positive")
+                lines.append((product_id, quantity, float(item_data['unit_price'])))
+                quantities[product_id] = quantities.get(product_id, 0) + quantity
+            
+            if order_type == 'sales':
+                for product_id, quantity in quantities.items():
+                    if available[product_id] is not None and available[product_id] < quantity:
+                        raise InsufficientStockError(product_id, quantity)
+                for product_id, quantity in quantities.items():
+                    if available[product_id] is not None:
+                        available[product_id] -= quantity
+            
+            prepared.append({
+                'index': index,
+                'order_type': order_type,
+                'status': status,
+                'created_at': created_at,
+                'customer_name': data.get('customer_name', ''),
+                'customer_mobile': data.get('customer_mobile', ''),
+                'customer_gst': data.get('customer_gst', ''),
+                'lines': lines,
+                'quantities': quantities
+            })
+        except (KeyError, TypeError, ValueError) as e:
+            message = f"Missing field: {e}" if isinstance(e, KeyError) else str(e)
+            results[index] = {'index': index, 'success': False, 'error': message}
+    
+    return prepared, results
+
+
+def _insert_batch(prepared, catalog):
+    """Bulk-insert prepared orders and items, then apply aggregated stock deltas"""
+    # GST for every line in the batch in one pass
+    line_totals = [
+        (quantity * unit_price, quantity * unit_price * catalog[product_id][0] / 100)
+        for order in prepared for product_id, quantity, unit_price in order['lines']
+    ]
+    places, line_splits = split_order_lines([
+        (order['customer_gst'], [
+            (quantity * unit_price, catalog[product_id][0]) for product_id, quantity, unit_price in order['lines']
+        ])
+        for order in prepared
+    ])
+    
+    order_rows = []
+    position = 0
+    for order, order_number, place in zip(prepared, allocate_order_numbers(len(prepared)), places):
+        totals = line_totals[position:position + len(order['lines'])]
+        position += len(order['lines'])
+        order['order_number'] = order_number
+        order_rows.append({
+            'order_number': order_number,
+            'order_type': order['order_type'],
+            'customer_name': order['customer_name'],
+            'customer_mobile': order['customer_mobile'],
+            'customer_gst': order['customer_gst'],
+            'total_amount': sum(total for total, _ in totals),
+            'gst_amount': sum(gst for _, gst in totals),
+            'status': order['status'],
+            'place_of_supply': place,
+            'created_at': order['created_at']
+        })
+    
+    order_ids = db.session.scalars(
+        insert(Order).returning(Order.id, sort_by_parameter_order=True),
+        order_rows
+    ).all()
+    
+    item_rows = []
+    stock_deltas = {}
+    splits = iter(line_splits)
+    for order, order_id in zip(prepared, order_ids):
+        order['order_id'] = order_id
+        for product_id, quantity, unit_price in order['lines']:
+            item_rows.append({
+                'order_id': order_id,
+                'product_id': product_id,
+                'quantity': quantity,
+                'unit_price': unit_price,
+                'total_price': quantity * unit_price,
+                **next(splits)
+            })
+        if order['order_type'] == 'sales':
+            for product_id, quantity in order['quantities'].items():
+                stock_deltas[product_id] = stock_deltas.get(product_id, 0) + quantity
+    
+    db.session.execute(insert(OrderItem), item_rows)
+    decrement_stock(stock_deltas)
+
+
+def place_orders_batch(orders_data, max_attempts=3):
+    """Ingest many orders in one transaction with per-order results.
+    
+    Products and stock for every referenced SKU are prefetched in one IN
+    query, invalid or oversold orders are rejected individually, and the
+    rest are bulk-inserted with one conditional stock UPDATE per product.
+    If a concurrent checkout takes stock between the prefetch and the
+    update, the batch is rolled back and re-planned against fresh stock.
+    The caller commits.
+    """
+    if len(orders_data) > BATCH_MAX_ORDERS:
+        raise ValueError(f"Batch too large: {len(orders_data)} orders (max {BATCH_MAX_ORDERS})")
+    
+    product_ids = set()
+    for data in orders_data:
+        for item_data in (data.get('items') or []) if isinstance(data, dict) else []:
+            try:
+                product_ids.add(int(item_data['product_id']))
+            except (KeyError, TypeError, ValueError):
+                pass
+    
+    for attempt in range(max_attempts):
+        catalog = {
+            product_id: (gst_rate, available_qty)
+            for product_id, gst_rate, available_qty in db.session.query(
+                Product.id, Product.gst_rate, Stock.available_qty
+            ).outerjoin(Stock, Stock.product_id == Product.id).filter(Product.id.in_(product_ids))
+        }
+        
+        prepared, results = _prepare_batch(
+            [data if isinstance(data, dict) else {} for data in orders_data], catalog
+        )
+        if not prepared:
+            return results
+        
+        try:
+            _insert_batch(prepared, catalog)
+            break
+        except InsufficientStockError:
+            db.session.rollback()
+            if attempt == max_attempts - 1:
+                raise
+    
+    for order in prepared:
+        results[order['index']] = {
+            'index': order['index'],
+            'success': True,
+            'order_id': order['order_id'],
+            'order_number': order['order_number']
+        }
+    return results
+
+
+@retry_on_lock
+def create_order(data):
+    """place_order in its own committed transaction, retried on SQLite lock contention"""
+    order = place_order(data)
+    db.session.commit()
+    return order
+
+
+@retry_on_lock
+def create_orders_batch(orders_data):
+    """place_orders_batch in its own committed transaction, retried on SQLite lock contention"""
+    results = place_orders_batch(orders_data)
+    db.session.commit()
+    return results
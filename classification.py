@@ -0,0 +1,192 @@
+# Persisted ABC/XYZ product classification, refreshed from the daily sales rollups
+from bisect import bisect_left
+from datetime import datetime, date, timedelta
+from flask import current_app
+from sqlalchemy import func, insert, delete
+from extensions import db
+from models import Product
+from models_advanced import SalesAnalytics, ProductClassification, SystemSetting
+from analytics import bucket_expression, bucket_keys, bucket_start
+from rollups import refresh_sales_rollups, rollup_high_water_mark, rollup_data_version, rollups_due, schedule_refresh, state_setting, claim_state
+
+CLASSIFICATION_STATE_KEY = 'classification.rollup_mark'
+CLASSIFICATION_HINT = 'No ABC/XYZ classes yet: run `flask classify-products` once; reads keep them current after that.'
+
+DEFAULTS = {
+    'ABC_THRESHOLDS': (80, 95),     # Cumulative revenue % closing classes A and B
+    'ABC_WINDOW_DAYS': 365,
+    'XYZ_THRESHOLDS': (0.5, 1.0),   # Demand CV closing classes X and Y
+    'XYZ_WINDOW_DAYS': 182,
+    'XYZ_PERIOD': 'week',
+}
+
+
+def classification_settings():
+    return {key: current_app.config.get(key, default) for key, default in DEFAULTS.items()}
+
+
+def _abc_class(cumulative_share, thresholds):
+    if cumulative_share <= thresholds[0]:
+        return 'A'
+    if cumulative_share <= thresholds[1]:
+        return 'B'
+    return 'C'
+
+
+def _xyz_class(cv, thresholds):
+    if cv is None:
+        return None
+    if cv <= thresholds[0]:
+        return 'X'
+    if cv <= thresholds[1]:
+        return 'Y'
+    return 'Z'
+
+
+def compute_classifications(today=None, settings=None):
+    """Classify every product from SalesAnalytics; returns insertable rows.
+    
+    Revenue per product and the per-period demand moments (sum, sum of
+    squares) are aggregated in SQL, so Python only walks one row per product.
+    """
+    settings = settings or classification_settings()
+    today = today or date.today()
+    
+    abc_start = today - timedelta(days=settings['ABC_WINDOW_DAYS'])
+    revenues = db.session.query(
+        SalesAnalytics.product_id,
+        func.sum(SalesAnalytics.revenue).label('revenue')
+    ).filter(
+        SalesAnalytics.date >= abc_start,
+        SalesAnalytics.date <= today
+    ).group_by(SalesAnalytics.product_id).all()
+    
+    # Per-period quantities first, then sum and sum of squares per product.
+    # Only complete periods count, starting from each product's first sale.
+    period = settings['XYZ_PERIOD']
+    xyz_end = bucket_start(datetime.combine(today, datetime.min.time()), period)
+    xyz_start = xyz_end - timedelta(days=settings['XYZ_WINDOW_DAYS'])
+    period_keys = bucket_keys(xyz_start, xyz_end, period)
+    bucket = bucket_expression(SalesAnalytics.date, period)
+    per_period = db.session.query(
+        SalesAnalytics.product_id.label('product_id'),
+        bucket.label('bucket'),
+        func.sum(SalesAnalytics.quantity_sold).label('quantity')
+    ).filter(
+        SalesAnalytics.date >= xyz_start.date(),
+        SalesAnalytics.date < xyz_end.date()
+    ).group_by(SalesAnalytics.product_id, bucket).subquery()
+    moments = {}
+    for row in db.session.query(
+        per_period.c.product_id,
+        func.min(per_period.c.bucket).label('first_bucket'),
+        func.sum(per_period.c.quantity).label('total'),
+        func.sum(per_period.c.quantity * per_period.c.quantity).label('total_sq')
+    ).group_by(per_period.c.product_id):
+        periods = len(period_keys) - bisect_left(period_keys, row.first_bucket)
+        moments[row.product_id] = (float(row.total or 0), float(row.total_sq or 0), periods)
+    
+    total_revenue = sum(float(row.revenue or 0) for row in revenues)
+    computed_at = datetime.utcnow()
+    rows = []
+    cumulative = 0.0
+    ranked = sorted(revenues, key=lambda row: float(row.revenue or 0), reverse=True)
+    classified = set()
+    for row in ranked:
+        revenue = float(row.revenue or 0)
+        cumulative += revenue
+        share = (cumulative / total_revenue * 100) if total_revenue > 0 else 100.0
+        rows.append({'product_id': row.product_id, 'revenue': revenue, 'cumulative_share': share})
+        classified.add(row.product_id)
+    
+    # Products with no sales in the window are class C
+    for (product_id,) in db.session.query(Product.id):
+        if product_id not in classified:
+            rows.append({'product_id': product_id, 'revenue': 0.0, 'cumulative_share': 100.0})
+    
+    for row in rows:
+        total, total_sq, periods = moments.get(row['product_id'], (0.0, 0.0, 0))
+        cv = None
+        if total > 0 and periods:
+            mean = total / periods
+            variance = max(total_sq / periods - mean * mean, 0.0)
+            cv = variance ** 0.5 / mean
+        row['abc_class'] = _abc_class(row['cumulative_share'], settings['ABC_THRESHOLDS']) if row['revenue'] > 0 else 'C'
+        row['demand_cv'] = cv
+        row['xyz_class'] = _xyz_class(cv, settings['XYZ_THRESHOLDS'])
+        row['computed_at'] = computed_at
+    
+    return rows
+
+
+def classification_mark(today=None, settings=None):
+    """What current classes were computed from: the rollup data version and the latest complete XYZ period"""
+    settings = settings or classification_settings()
+    period = bucket_start(datetime.combine(today or date.today(), datetime.min.time()), settings['XYZ_PERIOD'])
+    return f"{rollup_data_version()}@{period.date().isoformat()}"
+
+
+def refresh_classifications(force=False):
+    """Recompute and store classes when new sales have been rolled up or a new XYZ period started since the last run.
+    
+    Runs from `flask classify-products` or on the background refresh
+    thread; requests only read the stored classes. Returns the number of
+    products classified, or 0 when nothing changed.
+    """
+    # Bring the rollups up to date first, backfilling them if they were never built
+    refresh_sales_rollups(full=rollup_high_water_mark() is None)
+    mark_value = classification_mark()
+    
+    setting = state_setting(CLASSIFICATION_STATE_KEY, 'Sales rollup data version the ABC/XYZ classes were computed from')
+    previous = setting.value or ''
+    if not force and previous == mark_value:
+        return 0
+    if not claim_state(CLASSIFICATION_STATE_KEY, previous, mark_value):
+        db.session.rollback()
+        return 0
+    
+    rows = compute_classifications()
+    db.session.execute(delete(ProductClassification))
+    if rows:
+        db.session.execute(insert(ProductClassification), rows)
+    db.session.commit()
+    return len(rows)
+
+
+def ensure_fresh_classifications():
+    """When the stored classes were computed, or None if never; queues a background run when they are out of date"""
+    computed = db.session.query(SystemSetting.value, SystemSetting.updated_at).filter_by(key=CLASSIFICATION_STATE_KEY).first()
+    if computed is None or not computed.value:
+        return None
+    # Sales not rolled up yet only show up in the mark after the refresh's own rollup step
+    if computed.value != classification_mark() or rollups_due(rollup_high_water_mark()):
+        schedule_refresh(refresh_classifications)
+    return computed.updated_at
+
+
+def classification_summary():
+    """ABC counts and revenue shares for products that sold in the window, plus the ABC x XYZ matrix"""
+    rows = db.session.query(
+        ProductClassification.abc_class,
+        ProductClassification.xyz_class,
+        func.count(ProductClassification.id).label('count'),
+        func.sum(ProductClassification.revenue).label('revenue')
+    ).filter(ProductClassification.revenue > 0).group_by(
+        ProductClassification.abc_class, ProductClassification.xyz_class
+    ).all()
+    
+    total_products = sum(row.count for row in rows)
+    total_revenue = sum(float(row.revenue or 0) for row in rows)
+    summary = {}
+    for abc in ('A', 'B', 'C'):
+        count = sum(row.count for row in rows if row.abc_class == abc)
+        value = sum(float(row.revenue or 0) for row in rows if row.abc_class == abc)
+        summary[f'category{abc}'] = {
+            'count': count,
+            'percentage': round((count / total_products) * 100, 1) if total_products else 0,
+            'value': round((value / total_revenue) * 100, 1) if total_revenue else 0
+        }
+    summary['matrix'] = {
+        f"{row.abc_class}{row.xyz_class or '-'}": row.count for row in rows
+    }
+    return summary
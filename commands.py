@@ -0,0 +1,261 @@
+# Flask CLI commands (run with `flask --app main <command>`)
+import time
+import click
+from flask.cli import with_appcontext
+
+
+@click.command('init-db')
+@with_appcontext
+def init_db_command():
+    """Create and upgrade the schema and seed reference data (run once per deploy)."""
+    from schema import init_database
+    
+    started = time.perf_counter()
+    changes = init_database()
+    for change in changes:
+        click.echo(f"  {change}")
+    click.echo(f"Database ready ({len(changes)} change(s)) in {time.perf_counter() - started:.2f}s")
+
+
+@click.command('rebuild-search-index')
+@with_appcontext
+def rebuild_search_index_command():
+    """Re-index every product for /api/search (triggers keep it current after that)."""
+    from search import init_search_index, rebuild_search_index
+    
+    started = time.perf_counter()
+    init_search_index()
+    count = rebuild_search_index()
+    click.echo(f"Indexed {count} product(s) in {time.perf_counter() - started:.2f}s")
+
+
+@click.command('startup-report')
+@with_appcontext
+def startup_report_command():
+    """Show how long each phase of creating the app took."""
+    from flask import current_app
+    
+    timer = current_app.extensions.get('startup_timer')
+    if timer is None:
+        click.echo('No startup timings recorded for this app.')
+    else:
+        click.echo(timer.report())
+
+
+@click.command('pool-stats')
+@with_appcontext
+def pool_stats_command():
+    """Show the configured connection pool for this process."""
+    import json
+    from extensions import db
+    from db_pool import pool_stats
+    
+    click.echo(json.dumps(pool_stats(db.engines), indent=2))
+
+
+@click.command('rollup-sales')
+@click.option('--full', is_flag=True, help='Rebuild the daily rollups for all history (backfill).')
+@with_appcontext
+def rollup_sales_command(full):
+    """Fold new or changed sales orders into the daily rollup tables.
+    
+    Run with --full after deleting orders or changing purchase prices:
+    incremental runs only see orders whose updated_at moved.
+    """
+    from rollups import refresh_sales_rollups
+    
+    started = time.perf_counter()
+    days = refresh_sales_rollups(full=full)
+    if days is None:
+        click.echo('Another worker is refreshing the rollups; nothing to do.')
+    else:
+        click.echo(f"Updated {days} day(s) of sales rollups in {time.perf_counter() - started:.2f}s")
+
+
+@click.command('classify-products')
+@click.option('--force', is_flag=True, help='Recompute even if no new sales were rolled up.')
+@with_appcontext
+def classify_products_command(force):
+    """Refresh the persisted ABC/XYZ product classes."""
+    from classification import refresh_classifications
+    
+    started = time.perf_counter()
+    count = refresh_classifications(force=force)
+    if count:
+        click.echo(f"Classified {count} product(s) in {time.perf_counter() - started:.2f}s")
+    else:
+        click.echo('Classes are up to date.')
+
+
+@click.command('forecast-products')
+@click.option('--force', is_flag=True, help='Refit even if no new sales were rolled up.')
+@with_appcontext
+def forecast_products_command(force):
+    """Refit and store the per-product demand forecasts."""
+    from forecasting import refresh_forecasts
+    
+    started = time.perf_counter()
+    count = refresh_forecasts(force=force)
+    if count:
+        click.echo(f"Forecast {count} product(s) in {time.perf_counter() - started:.2f}s")
+    else:
+        click.echo('Forecasts are up to date.')
+
+
+@click.command('backfill-gst')
+@click.option('--start', help='First order date (YYYY-MM-DD).')
+@click.option('--end', help='Last order date (YYYY-MM-DD, inclusive).')
+@click.option('--force', is_flag=True, help='Recompute lines that already have a stored split.')
+@with_appcontext
+def backfill_gst_command(start, end, force):
+    """Store the CGST/SGST/IGST split on order lines that do not have one."""
+    from analytics import parse_date_arg
+    from gst_engine import GSTConfigError, backfill_gst
+    
+    started = time.perf_counter()
+    try:
+        count = backfill_gst(parse_date_arg(start), parse_date_arg(end, end_of_day=True), force=force)
+    except GSTConfigError as e:
+        raise click.ClickException(str(e))
+    click.echo(f"Updated GST split on {count} order line(s) in {time.perf_counter() - started:.2f}s")
+
+
+@click.command('render-invoices')
+@click.option('--start', help='First order date (YYYY-MM-DD).')
+@click.option('--end', help='Last order date (YYYY-MM-DD, inclusive).')
+@click.option('--status', help='Only orders with this status.')
+@click.option('--output', '-o', required=True, help='A .zip file, or a directory to write into.')
+@click.option('--workers', '-w', type=int, help='Render processes (default: INVOICE_WORKERS or 2).')
+@with_appcontext
+def render_invoices_command(start, end, status, output, workers):
+    """Render sales invoices with UPI QR codes in bulk."""
+    from analytics import parse_date_arg
+    from invoice_batch import (
+        business_details, count_invoices, invoice_workers, iter_invoice_batches,
+        render_invoices, stream_zip, write_directory
+    )
+    
+    criteria = {
+        'start': parse_date_arg(start),
+        'end': parse_date_arg(end, end_of_day=True),
+        'status': status
+    }
+    total = count_invoices(**criteria)
+    workers = workers or invoice_workers()
+    click.echo(f"Rendering {total} invoice(s) with {workers} worker(s)")
+    
+    def progress(done, elapsed):
+        rate = done / elapsed if elapsed > 0 else 0
+        click.echo(f"  {done}/{total} invoices ({rate:.1f}/s)")
+    
+    started = time.perf_counter()
+    results = render_invoices(iter_invoice_batches(**criteria), business_details(), workers, progress)
+    if output.endswith('.zip'):
+        with open(output, 'wb') as f:
+            for chunk in stream_zip(results, {'start': start, 'end': end, 'status': status}):
+                f.write(chunk)
+    else:
+        write_directory(results, output)
+    elapsed = time.perf_counter() - started
+    click.echo(f"Wrote {total} invoice(s) to {output} in {elapsed:.2f}s ({total / elapsed if elapsed > 0 else 0:.1f}/s)")
+
+
+@click.command('check-query-plans')
+@click.option('--verbose', '-v', is_flag=True, help='Print every plan, not just failures.')
+@with_appcontext
+def check_query_plans_command(verbose):
+    """Assert the hot analytics queries use index scans (SQLite)."""
+    from query_plans import check_query_plans
+    
+    failures = 0
+    for name, plan, problems in check_query_plans():
+        status = 'FAIL' if problems else 'ok'
+        click.echo(f"[{status}] {name}" + (f": {'; '.join(problems)}" if problems else ''))
+        if problems or verbose:
+            for line in plan:
+                click.echo(f"        {line}")
+        failures += bool(problems)
+    
+    if failures:
+        raise SystemExit(1)
+
+
+def sample_paths(paths):
+    """Budgeted paths with arguments filled in from the data where a bare call runs no queries"""
+    from urllib.parse import quote
+    from extensions import db
+    from models import Product
+    
+    name = db.session.query(Product.name).order_by(Product.id).limit(1).scalar() or ''
+    word = (name.split() or ['item'])[0]
+    filled = []
+    for path in paths:
+        if path == '/api/search':
+            # Without q, search returns nothing before touching the index
+            filled += [f"{path}?q={quote(word)}", f"{path}?q={quote(word[:3])}&autocomplete=1"]
+        else:
+            filled.append(path)
+    return filled
+
+
+@click.command('check-query-budgets')
+@click.option('--path', 'paths', multiple=True, help='Extra GET path to check, e.g. "/api/orders?limit=20" (repeatable).')
+@click.option('--threshold', type=int, help='Flag statement shapes repeated more than this many times per request.')
+@with_appcontext
+def check_query_budgets_command(paths, threshold):
+    """Call every GET endpoint with a query budget and fail if one is exceeded or runs N+1 loads.
+    
+    Each path is measured on its first, cold call, then again warm: read
+    endpoints never refresh derived tables inline, so both must fit.
+    """
+    from flask import current_app
+    from query_budget import recent_reports, DEFAULT_REPEAT_THRESHOLD
+    
+    app = current_app._get_current_object()
+    budgeted = sorted(
+        rule.rule for rule in app.url_map.iter_rules()
+        if not rule.arguments and 'GET' in rule.methods
+        and 'GET' in getattr(app.view_functions[rule.endpoint], 'query_budget', {})
+    )
+    threshold = threshold if threshold is not None else app.config.get('QUERY_REPEAT_THRESHOLD', DEFAULT_REPEAT_THRESHOLD)
+    app.config.update(QUERY_CHECKS=True, QUERY_CHECKS_STRICT=False, QUERY_REPEAT_THRESHOLD=threshold)
+    
+    failures = 0
+    client = app.test_client()
+    for path in [*sample_paths(budgeted), *paths]:
+        for run in ('cold', 'warm'):
+            recent_reports.clear()
+            response = client.get(path)
+            if not recent_reports:
+                click.echo(f"[FAIL] {path} ({run}): no report recorded (status {response.status_code})")
+                failures += 1
+                continue
+            report = recent_reports[-1]
+            problems = []
+            if response.status_code >= 400:
+                problems.append(f"status {response.status_code}")
+            if report['budget'] is not None and report['statements'] > report['budget']:
+                problems.append(f"{report['statements']} statements over budget {report['budget']}")
+            problems.extend(f"{count} x {shape[:120]}" for shape, count in report['repeated'])
+            status = 'FAIL' if problems else 'ok'
+            click.echo(f"[{status}] {path} ({run}): {report['statements']}/{report['budget']} statements, {report['sql_ms']}ms SQL")
+            for problem in problems:
+                click.echo(f"        {problem}")
+            failures += bool(problems)
+    
+    if failures:
+        raise SystemExit(1)
+
+
+def register_commands(app):
+    app.cli.add_command(init_db_command)
+    app.cli.add_command(rebuild_search_index_command)
+    app.cli.add_command(startup_report_command)
+    app.cli.add_command(pool_stats_command)
+    app.cli.add_command(rollup_sales_command)
+    app.cli.add_command(classify_products_command)
+    app.cli.add_command(forecast_products_command)
+    app.cli.add_command(backfill_gst_command)
+    app.cli.add_command(render_invoices_command)
+    app.cli.add_command(check_query_plans_command)
+    app.cli.add_command(check_query_budgets_command)
@@ -0,0 +1,49 @@
+# Conditional GET (ETag / Last-Modified) for polled read APIs, keyed on table data versions
+import hashlib
+from datetime import datetime, date, timezone
+from functools import wraps
+from flask import current_app, request, make_response
+from stats_cache import data_version
+
+
+def conditional_get(*tables, daily=False):
+    """Answer unchanged GET polls with 304 before the view runs.
+    
+    The ETag hashes the request path and query string with the data
+    versions of `tables`. Views whose output also depends on today's date
+    pass daily=True so the tag rolls over at midnight.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if request.method != 'GET':
+                return view(*args, **kwargs)
+            
+            version, modified = data_version(tables)
+            key = f"{request.full_path}|{version}"
+            last_modified = datetime.fromtimestamp(int(modified), tz=timezone.utc)
+            if daily:
+                today = date.today()
+                key += f"|{today.isoformat()}"
+                midnight = datetime.combine(today, datetime.min.time()).astimezone(timezone.utc)
+                last_modified = max(last_modified, midnight)
+            etag = hashlib.sha1(key.encode()).hexdigest()[:20]
+            
+            # If-None-Match takes precedence; If-Modified-Since only has second resolution
+            if request.if_none_match:
+                not_modified = request.if_none_match.contains(etag)
+            else:
+                not_modified = request.if_modified_since is not None and last_modified <= request.if_modified_since
+            
+            if not_modified:
+                response = current_app.response_class(status=304)
+            else:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            response.set_etag(etag)
+            response.last_modified = last_modified
+            response.cache_control.no_cache = True
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,108 @@
+# Connection pool settings, fork safety for preloaded apps, and live pool statistics
+import os
+import threading
+from sqlalchemy import event
+from sqlalchemy.pool import QueuePool
+
+# Config / environment key -> (create_engine option, type)
+POOL_SETTINGS = {
+    'DB_POOL_SIZE': ('pool_size', int),
+    'DB_MAX_OVERFLOW': ('max_overflow', int),
+    'DB_POOL_TIMEOUT': ('pool_timeout', float),
+    'DB_POOL_RECYCLE': ('pool_recycle', int),
+}
+DEFAULT_POOL_RECYCLE = 300
+
+_counters = {}
+_counters_lock = threading.Lock()
+
+
+def pool_config_from_env():
+    """DB_POOL_* settings present in the environment, converted to their types"""
+    return {key: cast(os.environ[key]) for key, (_, cast) in POOL_SETTINGS.items() if os.environ.get(key)}
+
+
+def engine_options(config):
+    """SQLALCHEMY_ENGINE_OPTIONS from the DB_POOL_* config keys.
+    
+    Unset keys keep SQLAlchemy's defaults (5 connections, 10 overflow, 30s
+    timeout). Size and overflow only apply to queue pools, so they are
+    dropped for in-memory SQLite, which uses a per-thread pool.
+    """
+    options = {'pool_pre_ping': True, 'pool_recycle': DEFAULT_POOL_RECYCLE}
+    queue_pool = ':memory:' not in config.get('SQLALCHEMY_DATABASE_URI', '')
+    for key, (option, cast) in POOL_SETTINGS.items():
+        if config.get(key) is None:
+            continue
+        if option in ('pool_size', 'max_overflow', 'pool_timeout') and not queue_pool:
+            continue
+        options[option] = cast(config[key])
+    return options
+
+
+def _track(engine):
+    counters = {'connects': 0, 'checkouts': 0, 'peak_checked_out': 0}
+    _counters[engine] = counters
+    
+    @event.listens_for(engine, 'connect')
+    def count_connect(dbapi_connection, connection_record):
+        with _counters_lock:
+            counters['connects'] += 1
+    
+    @event.listens_for(engine, 'checkout')
+    def count_checkout(dbapi_connection, connection_record, connection_proxy):
+        with _counters_lock:
+            counters['checkouts'] += 1
+            pool = engine.pool
+            if isinstance(pool, QueuePool):
+                counters['peak_checked_out'] = max(counters['peak_checked_out'], pool.checkedout())
+
+
+def _reset_after_fork(engines):
+    # A connection opened before the fork would be shared by parent and child
+    # and corrupt each other's protocol state. close=False leaves the parent's
+    # sockets alone and just gives this process an empty pool of its own.
+    for engine in engines:
+        engine.dispose(close=False)
+        counters = _counters.get(engine)
+        if counters:
+            counters.update(connects=0, checkouts=0, peak_checked_out=0)
+
+
+def init_pool(engines):
+    """Track pool usage on the app's engines and reset their pools in forked children.
+    
+    Covers gunicorn --preload workers as well as the multiprocessing
+    pools used for forecasting and invoice rendering.
+    """
+    engines = list(engines)
+    for engine in engines:
+        if engine not in _counters:
+            _track(engine)
+    os.register_at_fork(after_in_child=lambda: _reset_after_fork(engines))
+
+
+def pool_stats(engines):
+    """Live statistics for this worker process's pools, one dict per bind"""
+    stats = {}
+    for bind, engine in engines.items():
+        pool = engine.pool
+        entry = {
+            'pool': type(pool).__name__,
+            'pid': os.getpid(),
+            **_counters.get(engine, {})
+        }
+        if isinstance(pool, QueuePool):
+            entry.update({
+                'size': pool.size(),
+                'max_overflow': pool._max_overflow,
+                'timeout': pool.timeout(),
+                'checked_in': pool.checkedin(),
+                'checked_out': pool.checkedout(),
+                # QueuePool counts overflow from -size; only connections beyond the pool matter here
+                'overflow': max(pool.overflow(), 0),
+                # Connections this process may still hand out before checkouts start waiting
+                'available': pool.size() + pool._max_overflow - pool.checkedout() if pool._max_overflow >= 0 else None
+            })
+        stats[bind or 'default'] = entry
+    return stats
@@ -1,16 +1,18 @@
 # Enhanced features for Stock Inventory Management System
 
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, Response, jsonify, request
 from extensions import db
-from models import Product, Stock, Order, OrderItem, Customer, GSTState
-import qrcode
-import io
-import base64
+from models import Product, Stock, Order, Customer, GSTState
+from analytics import profit_analytics_summary, parse_date_arg
+from conditional import conditional_get
+from query_budget import query_budget
+from qr_service import order_qr, QR_FORMATS
 
 # Create blueprint for enhanced features
 enhanced_bp = Blueprint('enhanced', __name__, url_prefix='/api/enhanced')
 
 @enhanced_bp.route('/low-stock-alerts')
+@conditional_get('product', 'stock')
 def low_stock_alerts():
     """Get products that are below minimum stock level"""
     try:
@@ -33,82 +35,42 @@ def low_stock_alerts():
         return jsonify({'error': str(e)}), 500
 
 @enhanced_bp.route('/profit-analytics')
+@conditional_get('order', 'order_item', 'product', daily=True)
+@query_budget(4)
 def profit_analytics():
-    """Calculate profit/loss analytics"""
+    """Calculate profit/loss analytics: ?start=&end=&group_by=product|category|month&limit=&sort="""
     try:
-        # Get all completed sales orders with their items
-        sales_orders = Order.query.filter_by(order_type='sales', status='completed').all()
-        
-        total_revenue = 0
-        total_cost = 0
-        product_profits = {}
-        
-        for order in sales_orders:
-            for item in order.items:
-                product = item.product
-                revenue = item.total_price
-                cost = getattr(product, 'purchase_price', product.unit_price * 0.7) * item.quantity
-                profit = revenue - cost
-                
-                total_revenue += revenue
-                total_cost += cost
-                
-                if product.name not in product_profits:
-                    product_profits[product.name] = {
-                        'revenue': 0, 'cost': 0, 'profit': 0, 'units_sold': 0
-                    }
-                
-                product_profits[product.name]['revenue'] += revenue
-                product_profits[product.name]['cost'] += cost
-                product_profits[product.name]['profit'] += profit
-                product_profits[product.name]['units_sold'] += item.quantity
+        summary = profit_analytics_summary(
+            start=parse_date_arg(request.args.get('start')),
+            end=parse_date_arg(request.args.get('end'), end_of_day=True),
+            group_by=request.args.get('group_by', 'product'),
+            limit=request.args.get('limit', 10, type=int),
+            sort=request.args.get('sort', 'units_sold')
+        )
         
-        # Top selling products
-        top_products = sorted(
-            product_profits.items(), 
-            key=lambda x: x[1]['units_sold'], 
-            reverse=True
-        )[:10]
+        # Top selling products, kept under the original key for existing clients
+        if summary['group_by'] == 'product':
+            summary['top_products'] = summary['groups']
         
-        return jsonify({
-            'total_revenue': total_revenue,
-            'total_cost': total_cost,
-            'gross_profit': total_revenue - total_cost,
-            'profit_margin': ((total_revenue - total_cost) / total_revenue * 100) if total_revenue > 0 else 0,
-            'top_products': [{'name': name, **data} for name, data in top_products]
-        })
+        return jsonify(summary)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-def generate_upi_qr(amount, business_name, order_number):
-    """Generate UPI QR code for payment"""
-    # UPI URL format: upi://pay?pa=UPI_ID&pn=NAME&am=AMOUNT&cu=INR&tn=DESCRIPTION
-    upi_url = f"upi://pay?pa=merchant@upi&pn={business_name}&am={amount}&cu=INR&tn=Invoice {order_number}"
-    
-    qr = qrcode.QRCode(version=1, box_size=6, border=5)
-    qr.add_data(upi_url)
-    qr.make(fit=True)
-    
-    img = qr.make_image(fill_color="black", back_color="white")
-    buffer = io.BytesIO()
-    img.save(buffer, format='PNG')
-    buffer.seek(0)
-    
-    # Return base64 encoded image
-    return base64.b64encode(buffer.getvalue()).decode()
-
 @enhanced_bp.route('/upi-qr/<int:order_id>')
 def generate_invoice_qr(order_id):
-    """Generate UPI QR code for invoice payment"""
+    """UPI QR code for invoice payment: ?format=png (base64 JSON, default) or ?format=svg (image)"""
     try:
         order = Order.query.get_or_404(order_id)
         total_amount = order.total_amount + order.gst_amount
+        fmt = request.args.get('format', 'png')
+        if fmt not in QR_FORMATS:
+            return jsonify({'error': f"format must be one of {', '.join(QR_FORMATS)}"}), 400
         
-        qr_code = generate_upi_qr(
-            amount=total_amount,
-            business_name="Your Business Name",
-            order_number=order.order_number
-        )
+        qr_code = order_qr(order, fmt)
+        if fmt == 'svg':
+            return Response(qr_code, mimetype='image/svg+xml')
         
         return jsonify({
             'qr_code': qr_code,
@@ -118,29 +80,3 @@ def generate_invoice_qr(order_id):
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-def calculate_gst_split(amount, gst_rate, business_state_code, customer_gst):
-    """Calculate CGST/SGST or IGST based on state codes"""
-    gst_amount = (amount * gst_rate) / 100
-    
-    # Get customer state from GST number (first 2 digits)
-    if customer_gst and len(customer_gst) >= 2:
-        customer_state_code = customer_gst[:2]
-    else:
-        customer_state_code = business_state_code  # Same state if no GST
-    
-    if customer_state_code == business_state_code:
-        # Same state - CGST + SGST
-        return {
-            'cgst': gst_amount / 2,
-            'sgst': gst_amount / 2,
-            'igst': 0,
-            'total_gst': gst_amount
-        }
-    else:
-        # Different state - IGST
-        return {
-            'cgst': 0,
-            'sgst': 0,
-            'igst': gst_amount,
-            'total_gst': gst_amount
-        }
\ No newline at end of file
@@ -0,0 +1,325 @@
+# Per-product demand forecasts (damped-trend Holt smoothing), fitted in one vectorized batch
+import calendar
+import json
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, date, timedelta
+from itertools import repeat
+from flask import current_app
+from sqlalchemy import func, insert, delete
+from extensions import db
+from models import Product
+from models_advanced import SalesAnalytics, ProductForecast, SystemSetting
+from analytics import bucket_expression, bucket_keys, bucket_start
+from rollups import refresh_sales_rollups, rollup_high_water_mark, rollup_data_version, rollups_due, schedule_refresh, state_setting, claim_state
+
+FORECAST_STATE_KEY = 'forecast.rollup_mark'
+FORECAST_STORE_KEY = 'forecast.store_monthly'
+FORECAST_HINT = 'No demand forecasts yet: run `flask forecast-products` once; reads keep them current after that.'
+
+DEFAULTS = {
+    'FORECAST_HISTORY_WEEKS': 52,
+    'FORECAST_HORIZON_WEEKS': 32,         # Enough to cover the next six full calendar months
+    'FORECAST_MIN_HOLT_WEEKS': 8,         # Shorter histories get a flat mean forecast
+    'FORECAST_ALPHAS': (0.1, 0.2, 0.3, 0.5, 0.7),
+    'FORECAST_BETAS': (0.01, 0.05, 0.1, 0.2),
+    'FORECAST_DAMPING': 0.9,
+    'FORECAST_WORKERS': 0,                # >1 fits each category in a separate process
+}
+
+
+def forecast_settings():
+    return {key: current_app.config.get(key, default) for key, default in DEFAULTS.items()}
+
+
+def load_weekly_demand(settings, today=None):
+    """Units sold per product per complete week from SalesAnalytics, as an (n, weeks) matrix.
+    
+    Returns (product_ids, categories, unit_prices, demand, forecast_start).
+    """
+    import numpy as np
+    
+    today = today or date.today()
+    end = bucket_start(datetime.combine(today, datetime.min.time()), 'week')
+    start = end - timedelta(weeks=settings['FORECAST_HISTORY_WEEKS'])
+    week_index = {key: i for i, key in enumerate(bucket_keys(start, end, 'week'))}
+    
+    products = db.session.query(Product.id, Product.category, Product.unit_price).order_by(Product.id).all()
+    n = len(products)
+    product_ids = np.fromiter((row[0] for row in products), dtype=np.int64, count=n)
+    categories = [row[1] or '' for row in products]
+    unit_prices = np.array([row[2] or 0.0 for row in products], dtype=np.float64)
+    demand = np.zeros((n, len(week_index)), dtype=np.float64)
+    
+    bucket = bucket_expression(SalesAnalytics.date, 'week')
+    rows = db.session.query(
+        SalesAnalytics.product_id,
+        bucket,
+        func.sum(SalesAnalytics.quantity_sold)
+    ).filter(
+        SalesAnalytics.date >= start.date(),
+        SalesAnalytics.date < end.date()
+    ).group_by(SalesAnalytics.product_id, bucket).all()
+    
+    if rows and n:
+        row_product = np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows))
+        row_week = np.fromiter((week_index.get(row[1], -1) for row in rows), dtype=np.int64, count=len(rows))
+        row_qty = np.fromiter((row[2] or 0 for row in rows), dtype=np.float64, count=len(rows))
+        row_index = np.searchsorted(product_ids, row_product)
+        valid = (row_week >= 0) & (row_index < n)
+        valid[valid] &= product_ids[row_index[valid]] == row_product[valid]
+        np.add.at(demand, (row_index[valid], row_week[valid]), row_qty[valid])
+    
+    return product_ids, categories, unit_prices, demand, end.date()
+
+
+def fit_holt(demand, alphas, betas, damping, horizon, min_holt_weeks):
+    """Fit damped-trend Holt smoothing to every row of `demand` at once.
+    
+    Each product's series starts at its first full week of sales. The smoothing
+    parameters are picked per product from the alpha x beta grid by
+    one-step-ahead squared error. Pure NumPy, so it can run in a worker process.
+    """
+    import numpy as np
+    
+    n, weeks = demand.shape
+    has_sales = demand.any(axis=1)
+    first = (demand > 0).argmax(axis=1) if weeks else np.zeros(n, dtype=np.int64)
+    first = np.where(has_sales, first, weeks)
+    history = weeks - first
+    # The first sale usually lands mid-week, so the smoothing starts from the week after
+    start = np.where(history >= min_holt_weeks, first + 1, first)
+    
+    best_sse = np.full(n, np.inf)
+    best = {name: np.zeros(n) for name in ('alpha', 'beta', 'level', 'trend', 'abs_error')}
+    for alpha in alphas:
+        for beta in betas:
+            level = demand[:, 0].copy() if weeks else np.zeros(n)
+            trend = np.zeros(n)
+            sse = np.zeros(n)
+            abs_error = np.zeros(n)
+            for t in range(1, weeks):
+                active = t > start
+                observed = demand[:, t]
+                predicted = level + damping * trend
+                error = np.where(active, observed - predicted, 0.0)
+                sse += error * error
+                abs_error += np.abs(error)
+                new_level = alpha * observed + (1 - alpha) * predicted
+                new_trend = beta * (new_level - level) + (1 - beta) * damping * trend
+                # Until the first sale the state just tracks the (zero) observations
+                level = np.where(active, new_level, observed)
+                trend = np.where(active, new_trend, 0.0)
+            better = sse < best_sse
+            best_sse = np.where(better, sse, best_sse)
+            for name, value in (('alpha', alpha), ('beta', beta), ('level', level), ('trend', trend), ('abs_error', abs_error)):
+                best[name] = np.where(better, value, best[name])
+    
+    steps = np.cumsum(damping ** np.arange(1, horizon + 1))
+    forecast = best['level'][:, None] + best['trend'][:, None] * steps[None, :]
+    
+    # Too little history for a trend: flat forecast at the mean since the first sale
+    short = history < min_holt_weeks
+    totals = demand.sum(axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean = np.where(history > 0, totals / history, 0.0)
+        mae = np.where(weeks - start > 1, best['abs_error'] / (weeks - start - 1), np.nan)
+    forecast[short] = mean[short, None]
+    
+    return {
+        'forecast': np.maximum(forecast, 0.0),
+        'holt': ~short,
+        'alpha': best['alpha'],
+        'beta': best['beta'],
+        'level': np.where(short, mean, best['level']),
+        'trend': np.where(short, 0.0, best['trend']),
+        'mae': mae,
+        'history': history,
+        'has_sales': has_sales,
+    }
+
+
+def fit_forecasts(demand, categories, settings):
+    """fit_holt over all products, fanned out per category when FORECAST_WORKERS > 1"""
+    import numpy as np
+    
+    args = (
+        settings['FORECAST_ALPHAS'], settings['FORECAST_BETAS'], settings['FORECAST_DAMPING'],
+        settings['FORECAST_HORIZON_WEEKS'], settings['FORECAST_MIN_HOLT_WEEKS']
+    )
+    workers = settings['FORECAST_WORKERS'] or 0
+    groups, group_index = np.unique(np.array(categories, dtype=object), return_inverse=True)
+    if workers <= 1 or len(groups) < 2:
+        return fit_holt(demand, *args)
+    
+    partitions = [np.flatnonzero(group_index == i) for i in range(len(groups))]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(fit_holt, (demand[rows] for rows in partitions), *(repeat(arg) for arg in args)))
+    
+    merged = {}
+    for rows, result in zip(partitions, results):
+        for name, values in result.items():
+            if name not in merged:
+                merged[name] = np.zeros((len(demand),) + values.shape[1:], dtype=values.dtype)
+            merged[name][rows] = values
+    return merged
+
+
+def store_monthly_forecast(forecast, unit_prices, forecast_start):
+    """Store-wide forecast revenue and units per fully covered calendar month"""
+    weekly_units = forecast.sum(axis=0)
+    weekly_sales = (forecast * unit_prices[:, None]).sum(axis=0)
+    months = {}
+    for week, (units, sales) in enumerate(zip(weekly_units.tolist(), weekly_sales.tolist())):
+        for offset in range(7):
+            day = forecast_start + timedelta(days=week * 7 + offset)
+            month = months.setdefault(day.strftime('%Y-%m'), {'sales': 0.0, 'units': 0.0, 'days': 0})
+            month['sales'] += sales / 7
+            month['units'] += units / 7
+            month['days'] += 1
+    
+    return [
+        {'month': key, 'sales': round(value['sales'], 2), 'units': round(value['units'], 1)}
+        for key, value in sorted(months.items())
+        if key > forecast_start.strftime('%Y-%m')
+        and value['days'] == calendar.monthrange(int(key[:4]), int(key[5:]))[1]
+    ]
+
+
+def compute_forecasts(today=None, settings=None):
+    """Fit every product with sales history; returns (insertable rows, store monthly forecast)"""
+    import numpy as np
+    
+    settings = settings or forecast_settings()
+    product_ids, categories, unit_prices, demand, forecast_start = load_weekly_demand(settings, today)
+    result = fit_forecasts(demand, categories, settings)
+    
+    computed_at = datetime.utcnow()
+    forecast = result['forecast']
+    daily_demand = forecast[:, :4].mean(axis=1) / 7 if forecast.shape[1] else np.zeros(len(product_ids))
+    rows = []
+    for i in np.flatnonzero(result['has_sales']).tolist():
+        holt = bool(result['holt'][i])
+        mae = float(result['mae'][i])
+        rows.append({
+            'product_id': int(product_ids[i]),
+            'model': 'holt' if holt else 'mean',
+            'alpha': float(result['alpha'][i]) if holt else None,
+            'beta': float(result['beta'][i]) if holt else None,
+            'level': float(result['level'][i]),
+            'trend': float(result['trend'][i]),
+            'forecast_start': forecast_start,
+            'weekly_forecast': json.dumps([round(value, 3) for value in forecast[i].tolist()]),
+            'daily_demand': float(daily_demand[i]),
+            'mae': None if np.isnan(mae) else mae,
+            'history_weeks': int(result['history'][i]),
+            'computed_at': computed_at
+        })
+    
+    return rows, store_monthly_forecast(forecast, unit_prices, forecast_start)
+
+
+def forecast_mark(today=None):
+    """What current forecasts were fitted on: the rollup data version and the week the forecast starts"""
+    week = bucket_start(datetime.combine(today or date.today(), datetime.min.time()), 'week')
+    return f"{rollup_data_version()}@{week.date().isoformat()}"
+
+
+def refresh_forecasts(force=False):
+    """Refit and store forecasts when new sales have been rolled up or a new week started since the last fit.
+    
+    Fitting every SKU takes seconds, so this runs from `flask
+    forecast-products` or on the background refresh thread; requests only
+    read the stored forecasts. Returns the number of products forecast,
+    or 0 when nothing changed.
+    """
+    # Bring the rollups up to date first, backfilling them if they were never built
+    refresh_sales_rollups(full=rollup_high_water_mark() is None)
+    mark_value = forecast_mark()
+    
+    setting = state_setting(FORECAST_STATE_KEY, 'Sales rollup data version the demand forecasts were fitted on')
+    store = state_setting(FORECAST_STORE_KEY, 'Store-wide monthly sales forecast (JSON)')
+    previous = setting.value or ''
+    if not force and previous == mark_value:
+        return 0
+    if not claim_state(FORECAST_STATE_KEY, previous, mark_value):
+        db.session.rollback()
+        return 0
+    
+    rows, monthly = compute_forecasts()
+    db.session.execute(delete(ProductForecast))
+    if rows:
+        db.session.execute(insert(ProductForecast), rows)
+    store.value = json.dumps(monthly)
+    store.updated_at = datetime.utcnow()
+    db.session.commit()
+    return len(rows)
+
+
+def ensure_fresh_forecasts():
+    """When the stored forecasts were fitted, or None if never; queues a background refit when they are out of date.
+    
+    Out of date means new sales were rolled up or a new week started, so
+    the forecast never runs out of future months. Forecasts that were
+    never fitted are left to `flask forecast-products`, which also
+    backfills the rollups.
+    """
+    fitted = db.session.query(SystemSetting.value, SystemSetting.updated_at).filter_by(key=FORECAST_STATE_KEY).first()
+    if fitted is None or not fitted.value:
+        return None
+    # Sales not rolled up yet only show up in the mark after the refresh's own rollup step
+    if fitted.value != forecast_mark() or rollups_due(rollup_high_water_mark()):
+        schedule_refresh(refresh_forecasts)
+    return fitted.updated_at
+
+
+def store_forecast(months=6):
+    """The cached store-wide forecast for the next `months` calendar months"""
+    value = db.session.query(SystemSetting.value).filter_by(key=FORECAST_STORE_KEY).scalar()
+    current = date.today().strftime('%Y-%m')
+    return [month for month in json.loads(value or '[]') if month['month'] > current][:months]
+
+
+def product_forecasts(product_id=None, category=None, limit=50):
+    """Cached per-product forecasts, fastest movers first"""
+    query = db.session.query(ProductForecast, Product.name, Product.sku, Product.category).join(
+        Product, Product.id == ProductForecast.product_id
+    )
+    if product_id:
+        query = query.filter(ProductForecast.product_id == product_id)
+    if category:
+        query = query.filter(Product.category == category)
+    query = query.order_by(ProductForecast.daily_demand.desc(), ProductForecast.product_id)
+    if limit:
+        query = query.limit(limit)
+    
+    return [{
+        'product_id': forecast.product_id,
+        'product': name,
+        'sku': sku,
+        'category': category_name,
+        'model': forecast.model,
+        'alpha': forecast.alpha,
+        'beta': forecast.beta,
+        'daily_demand': round(forecast.daily_demand or 0, 3),
+        'forecast_start': forecast.forecast_start.isoformat(),
+        'weekly_forecast': json.loads(forecast.weekly_forecast),
+        'mae': forecast.mae,
+        'history_weeks': forecast.history_weeks,
+        'computed_at': forecast.computed_at.isoformat() if forecast.computed_at else None
+    } for forecast, name, sku, category_name in query]
+
+
+def forecast_daily_demand(product_ids):
+    """Cached daily demand forecasts aligned with a sorted product_ids array (NaN where missing)"""
+    import numpy as np
+    
+    demand = np.full(len(product_ids), np.nan)
+    rows = db.session.query(ProductForecast.product_id, ProductForecast.daily_demand).all()
+    if rows and len(product_ids):
+        ids = np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows))
+        values = np.fromiter((row[1] or 0 for row in rows), dtype=np.float64, count=len(rows))
+        index = np.searchsorted(product_ids, ids)
+        valid = index < len(product_ids)
+        valid[valid] &= product_ids[index[valid]] == ids[valid]
+        demand[index[valid]] = values[valid]
+    return demand
@@ -0,0 +1,255 @@
+# GST engine: CGST/SGST/IGST splits for many lines at once, and GSTR-1 style summaries in SQL
+import logging
+from flask import current_app
+from sqlalchemy import func, case, update
+from extensions import db
+from models import Product, Order, OrderItem, GSTState
+
+BACKFILL_CHUNK_SIZE = 5000
+UNKNOWN_STATE_MESSAGE = (
+    "Neither BUSINESS_STATE_CODE nor BUSINESS_GSTIN is set, so inter-state supplies cannot be told "
+    "apart and every sale is split as intra-state CGST/SGST"
+)
+
+logger = logging.getLogger(__name__)
+_warned_unknown_state = False
+
+
+class GSTConfigError(RuntimeError):
+    """The seller's GST state is not configured"""
+
+
+def business_state_code(required=False):
+    """Seller's GST state code: BUSINESS_STATE_CODE, else the BUSINESS_GSTIN prefix.
+    
+    When neither is set, required=True raises GSTConfigError; otherwise
+    '' is returned and a warning is logged once per process.
+    """
+    global _warned_unknown_state
+    code = current_app.config.get('BUSINESS_STATE_CODE') or (current_app.config.get('BUSINESS_GSTIN') or '')[:2]
+    if not code:
+        if required:
+            raise GSTConfigError(f"{UNKNOWN_STATE_MESSAGE}; set one of them first")
+        if not _warned_unknown_state:
+            logger.warning(UNKNOWN_STATE_MESSAGE)
+            _warned_unknown_state = True
+    return code
+
+
+def gst_state_codes():
+    return {code for (code,) in db.session.query(GSTState.state_code)}
+
+
+def place_of_supply(customer_gst, business_state, state_codes):
+    """Buyer's state code: the customer GSTIN prefix when it names a GST state, else the seller's state"""
+    prefix = (customer_gst or '').strip()[:2]
+    return prefix if prefix in state_codes else business_state
+
+
+def split_gst(taxable, rates, places, business_state):
+    """CGST/SGST/IGST for arrays of lines at once.
+    
+    Supplies to another state are IGST; same-state supplies (or any supply
+    when the seller's state is unknown) split evenly into CGST and SGST.
+    """
+    import numpy as np
+    
+    taxable = np.asarray(taxable, dtype=np.float64)
+    rates = np.asarray(rates, dtype=np.float64)
+    gst = taxable * rates / 100
+    interstate = (np.asarray(places, dtype=object) != business_state) if business_state else np.zeros(len(gst), dtype=bool)
+    half = np.where(interstate, 0.0, gst / 2)
+    return {
+        'gst': gst,
+        'cgst': half,
+        'sgst': half,
+        'igst': np.where(interstate, gst, 0.0)
+    }
+
+
+def split_order_lines(orders):
+    """Split every line of several orders in one pass.
+    
+    `orders` is a list of (customer_gst, [(taxable, rate), ...]). Returns
+    (places, lines) with one place of supply per order and one dict of
+    gst_rate/cgst_amount/sgst_amount/igst_amount per line, in input order.
+    """
+    business_state = business_state_code()
+    state_codes = gst_state_codes()
+    places = [place_of_supply(customer_gst, business_state, state_codes) for customer_gst, _ in orders]
+    taxable, rates, line_places = [], [], []
+    for place, (_, lines) in zip(places, orders):
+        for amount, rate in lines:
+            taxable.append(amount)
+            rates.append(rate or 0)
+            line_places.append(place)
+    
+    split = split_gst(taxable, rates, line_places, business_state)
+    lines = [
+        {'gst_rate': rate, 'cgst_amount': cgst, 'sgst_amount': sgst, 'igst_amount': igst}
+        for rate, cgst, sgst, igst in zip(
+            rates, split['cgst'].tolist(), split['sgst'].tolist(), split['igst'].tolist()
+        )
+    ]
+    return places, lines
+
+
+def backfill_gst(start=None, end=None, force=False, chunk_size=BACKFILL_CHUNK_SIZE):
+    """Compute and store the split for order lines placed before it was persisted.
+    
+    Lines without a stored rate use the product's current GST rate. With
+    force=True every line in the range is recomputed. Commits per chunk
+    and returns the number of lines updated.
+    """
+    business_state = business_state_code(required=True)
+    state_codes = gst_state_codes()
+    updated = 0
+    last_id = 0
+    while True:
+        query = db.session.query(
+            OrderItem.id, OrderItem.total_price,
+            func.coalesce(OrderItem.gst_rate, Product.gst_rate, 0),
+            Order.id, Order.customer_gst, Order.updated_at
+        ).join(Order, Order.id == OrderItem.order_id).join(
+            Product, Product.id == OrderItem.product_id
+        ).filter(OrderItem.id > last_id)
+        if not force:
+            query = query.filter(OrderItem.gst_rate.is_(None))
+        if start:
+            query = query.filter(Order.created_at >= start)
+        if end:
+            query = query.filter(Order.created_at < end)
+        rows = query.order_by(OrderItem.id).limit(chunk_size).all()
+        if not rows:
+            return updated
+        last_id = rows[-1][0]
+        
+        places = {}
+        for _, _, _, order_id, customer_gst, order_updated_at in rows:
+            if order_id not in places:
+                places[order_id] = (place_of_supply(customer_gst, business_state, state_codes), order_updated_at)
+        split = split_gst(
+            [row[1] for row in rows],
+            [row[2] for row in rows],
+            [places[row[3]][0] for row in rows],
+            business_state
+        )
+        
+        db.session.execute(update(OrderItem), [
+            {'id': row[0], 'gst_rate': row[2], 'cgst_amount': cgst, 'sgst_amount': sgst, 'igst_amount': igst}
+            for row, cgst, sgst, igst in zip(rows, split['cgst'].tolist(), split['sgst'].tolist(), split['igst'].tolist())
+        ])
+        # Keep updated_at so the sales rollups do not treat these orders as changed
+        db.session.execute(update(Order), [
+            {'id': order_id, 'place_of_supply': place, 'updated_at': order_updated_at}
+            for order_id, (place, order_updated_at) in places.items()
+        ])
+        db.session.commit()
+        updated += len(rows)
+
+
+def _gst_lines(columns, start=None, end=None, order_type='sales'):
+    """Non-cancelled order lines of one type within [start, end), joined to orders and products"""
+    query = db.session.query(*columns).select_from(OrderItem).join(
+        Order, Order.id == OrderItem.order_id
+    ).join(
+        Product, Product.id == OrderItem.product_id
+    ).filter(
+        Order.order_type == order_type,
+        Order.status != 'cancelled'
+    )
+    if start:
+        query = query.filter(Order.created_at >= start)
+    if end:
+        query = query.filter(Order.created_at < end)
+    return query
+
+
+def _tax_columns():
+    taxable = func.coalesce(func.sum(OrderItem.total_price), 0)
+    cgst = func.coalesce(func.sum(OrderItem.cgst_amount), 0)
+    sgst = func.coalesce(func.sum(OrderItem.sgst_amount), 0)
+    igst = func.coalesce(func.sum(OrderItem.igst_amount), 0)
+    return (
+        taxable.label('taxable_value'),
+        cgst.label('cgst'),
+        sgst.label('sgst'),
+        igst.label('igst'),
+        (taxable + cgst + sgst + igst).label('total_value')
+    )
+
+
+def _tax_dict(row):
+    return {
+        'taxable_value': round(float(row.taxable_value), 2),
+        'cgst': round(float(row.cgst), 2),
+        'sgst': round(float(row.sgst), 2),
+        'igst': round(float(row.igst), 2),
+        'total_tax': round(float(row.cgst + row.sgst + row.igst), 2),
+        'total_value': round(float(row.total_value), 2)
+    }
+
+
+def gst_totals(start=None, end=None, order_type='sales'):
+    """Tax totals for the range, plus how many lines have no stored split yet"""
+    unsplit = func.coalesce(func.sum(case((OrderItem.gst_rate.is_(None), 1), else_=0)), 0).label('unsplit_lines')
+    row = _gst_lines((*_tax_columns(), unsplit), start, end, order_type).one()
+    return {**_tax_dict(row), 'unsplit_lines': int(row.unsplit_lines)}
+
+
+def _report(rows, totals):
+    """Summary payload; reports only read, so unsplit lines are flagged rather than backfilled"""
+    report = {'business_state_code': business_state_code(), 'rows': rows, 'totals': totals}
+    if totals['unsplit_lines']:
+        report['hint'] = (
+            f"{totals['unsplit_lines']} order line(s) in this range have no stored GST split and are "
+            "missing from the CGST/SGST/IGST columns; run `flask backfill-gst` for the range"
+        )
+    return report
+
+
+def hsn_summary(start=None, end=None, order_type='sales'):
+    """GSTR-1 table 12 style: one row per HSN code and rate"""
+    business_state_code(required=True)
+    rows = _gst_lines((
+        Product.hsn_code,
+        OrderItem.gst_rate,
+        func.min(Product.name).label('description'),
+        func.sum(OrderItem.quantity).label('quantity'),
+        *_tax_columns()
+    ), start, end, order_type).group_by(Product.hsn_code, OrderItem.gst_rate).order_by(
+        Product.hsn_code, OrderItem.gst_rate
+    )
+    return _report([{
+        'hsn_code': row.hsn_code,
+        'gst_rate': row.gst_rate,
+        'description': row.description,
+        'quantity': int(row.quantity or 0),
+        **_tax_dict(row)
+    } for row in rows], gst_totals(start, end, order_type))
+
+
+def state_summary(start=None, end=None, order_type='sales'):
+    """GSTR-1 style place-of-supply summary: B2B (buyer has a GSTIN) vs B2C, per state and rate"""
+    business_state_code(required=True)
+    supply_type = case((func.coalesce(Order.customer_gst, '') != '', 'B2B'), else_='B2C').label('supply_type')
+    rows = _gst_lines((
+        Order.place_of_supply,
+        func.min(GSTState.state_name).label('state_name'),
+        supply_type,
+        OrderItem.gst_rate,
+        func.count(func.distinct(Order.id)).label('invoices'),
+        *_tax_columns()
+    ), start, end, order_type).outerjoin(
+        GSTState, GSTState.state_code == Order.place_of_supply
+    ).group_by(Order.place_of_supply, supply_type, OrderItem.gst_rate).order_by(
+        Order.place_of_supply, supply_type, OrderItem.gst_rate
+    )
+    return _report([{
+        'place_of_supply': row.place_of_supply,
+        'state_name': row.state_name,
+        'supply_type': row.supply_type,
+        'gst_rate': row.gst_rate,
+        'invoices': row.invoices,
+        **_tax_dict(row)
+    } for row in rows], gst_totals(start, end, order_type))
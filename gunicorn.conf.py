@@ -0,0 +1,33 @@
+# Gunicorn settings for `gunicorn main:app` (picked up automatically from the working directory)
+import os
+import shutil
+import tempfile
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '5000')}"
+workers = int(os.environ.get('WEB_CONCURRENCY', '2'))
+threads = int(os.environ.get('GUNICORN_THREADS', '1'))
+
+# Build the app once in the master and fork workers from it; the factory opens
+# no connections and every worker gets its own empty pool after the fork.
+# Each worker holds up to DB_POOL_SIZE + DB_MAX_OVERFLOW connections, so size
+# those for `threads` and keep workers * that below the server's limit.
+preload_app = os.environ.get('GUNICORN_PRELOAD', '1') == '1'
+
+# Workers write their metrics to files here so /metrics can sum them. It must be
+# set before prometheus_client is imported, which this file is loaded ahead of.
+os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', os.path.join(tempfile.gettempdir(), 'stockmanager-metrics'))
+
+
+def on_starting(server):
+    # Counts from a previous run would otherwise be added to this one's
+    directory = os.environ['PROMETHEUS_MULTIPROC_DIR']
+    shutil.rmtree(directory, ignore_errors=True)
+    os.makedirs(directory)
+
+
+def child_exit(server, worker):
+    try:
+        from prometheus_client import multiprocess
+    except ImportError:
+        return
+    multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,206 @@
+# Vectorized reorder-point / EOQ engine over every SKU at once
+from __future__ import annotations
+from dataclasses import dataclass
+from datetime import datetime, date, timedelta
+from statistics import NormalDist
+from typing import TYPE_CHECKING
+from flask import current_app
+from sqlalchemy import func
+from extensions import db
+from models import Product, Stock, Order, OrderItem
+from models_advanced import ReorderRule
+from analytics import day_expression
+
+if TYPE_CHECKING:
+    import numpy as np  # Imported on first use; loading NumPy adds noticeably to worker boot
+
+DEFAULTS = {
+    'DEMAND_WINDOW_DAYS': 90,
+    'SERVICE_LEVEL': 0.95,            # Probability of not stocking out during lead time
+    'DEFAULT_LEAD_TIME_DAYS': 7,      # Used when a product has no active ReorderRule
+    'ORDERING_COST': 500.0,           # Fixed cost per purchase order (INR)
+    'HOLDING_COST_RATE': 0.20,        # Annual holding cost as a fraction of purchase price
+}
+
+
+def optimizer_settings():
+    return {key: current_app.config.get(key, default) for key, default in DEFAULTS.items()}
+
+
+@dataclass
+class DemandMatrix:
+    """Per-product daily demand plus the product attributes the engine needs, as arrays"""
+    product_ids: np.ndarray     # (n,) int64
+    names: list                 # (n,) product names, same order
+    demand: np.ndarray          # (n, days) float64 units sold per day
+    available: np.ndarray       # (n,) current stock
+    min_qty: np.ndarray         # (n,) configured alert threshold
+    lead_time: np.ndarray       # (n,) days
+    unit_cost: np.ndarray       # (n,) purchase price (falls back to 70% of unit price)
+
+
+def load_demand_matrix(days=None, end=None, default_lead_time=None):
+    """Two queries: product/stock/lead-time attributes, then per-product daily demand."""
+    import numpy as np
+    
+    settings = optimizer_settings()
+    days = days or settings['DEMAND_WINDOW_DAYS']
+    default_lead_time = default_lead_time or settings['DEFAULT_LEAD_TIME_DAYS']
+    end = end or date.today() + timedelta(days=1)
+    start = end - timedelta(days=days)
+    
+    lead_times = db.session.query(
+        ReorderRule.product_id.label('product_id'),
+        func.min(ReorderRule.lead_time_days).label('lead_time_days')
+    ).filter(ReorderRule.is_active.is_(True)).group_by(ReorderRule.product_id).subquery()
+    
+    products = db.session.query(
+        Product.id,
+        Product.name,
+        Product.purchase_price,
+        Product.unit_price,
+        func.coalesce(Stock.available_qty, 0),
+        func.coalesce(Stock.min_qty, 10),
+        lead_times.c.lead_time_days
+    ).outerjoin(Stock, Stock.product_id == Product.id).outerjoin(
+        lead_times, lead_times.c.product_id == Product.id
+    ).order_by(Product.id).all()
+    
+    n = len(products)
+    product_ids = np.fromiter((row[0] for row in products), dtype=np.int64, count=n)
+    purchase_price = np.array([row[2] or 0.0 for row in products], dtype=np.float64)
+    unit_price = np.array([row[3] or 0.0 for row in products], dtype=np.float64)
+    
+    matrix = DemandMatrix(
+        product_ids=product_ids,
+        names=[row[1] for row in products],
+        demand=np.zeros((n, days), dtype=np.float64),
+        available=np.array([row[4] for row in products], dtype=np.float64),
+        min_qty=np.array([row[5] for row in products], dtype=np.float64),
+        lead_time=np.array([row[6] or default_lead_time for row in products], dtype=np.float64),
+        unit_cost=np.where(purchase_price > 0, purchase_price, unit_price * 0.7)
+    )
+    if n == 0:
+        return matrix
+    
+    # Sales that have not been cancelled consume stock, so they all count as demand
+    day = day_expression(Order.created_at)
+    rows = db.session.query(
+        OrderItem.product_id,
+        day,
+        func.sum(OrderItem.quantity)
+    ).join(Order, Order.id == OrderItem.order_id).filter(
+        Order.order_type == 'sales',
+        Order.status != 'cancelled',
+        Order.created_at >= datetime.combine(start, datetime.min.time()),
+        Order.created_at < datetime.combine(end, datetime.min.time())
+    ).group_by(OrderItem.product_id, day).all()
+    
+    if rows:
+        day_index = {}
+        for offset in range(days):
+            current = start + timedelta(days=offset)
+            day_index[current] = offset
+            day_index[current.isoformat()] = offset
+        row_product = np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows))
+        row_day = np.fromiter((day_index.get(row[1], -1) for row in rows), dtype=np.int64, count=len(rows))
+        row_qty = np.fromiter((row[2] or 0 for row in rows), dtype=np.float64, count=len(rows))
+        
+        # product_ids is sorted, so searchsorted maps ids to matrix rows
+        row_index = np.searchsorted(product_ids, row_product)
+        valid = (row_day >= 0) & (row_index < n)
+        valid[valid] &= product_ids[row_index[valid]] == row_product[valid]
+        np.add.at(matrix.demand, (row_index[valid], row_day[valid]), row_qty[valid])
+    
+    return matrix
+
+
+def optimize_inventory(matrix, settings=None, forecast=None):
+    """Demand velocity, safety stock, reorder point and EOQ for every SKU in one pass.
+    
+    `forecast` is an optional (n,) array of forecast daily demand; where it
+    is present (not NaN) it replaces the historical mean. Returns a dict of
+    (n,) arrays aligned with matrix.product_ids.
+    """
+    import numpy as np
+    
+    settings = settings or optimizer_settings()
+    z = NormalDist().inv_cdf(settings['SERVICE_LEVEL'])
+    
+    velocity = matrix.demand.mean(axis=1)
+    if forecast is not None:
+        velocity = np.where(np.isnan(forecast), velocity, forecast)
+    sigma = matrix.demand.std(axis=1)
+    lead_time = matrix.lead_time
+    
+    safety_stock = z * sigma * np.sqrt(lead_time)
+    reorder_point = np.maximum(velocity * lead_time + safety_stock, matrix.min_qty)
+    
+    annual_demand = velocity * 365
+    holding_cost = matrix.unit_cost * settings['HOLDING_COST_RATE']
+    with np.errstate(divide='ignore', invalid='ignore'):
+        eoq = np.sqrt(2 * annual_demand * settings['ORDERING_COST'] / holding_cost)
+        days_of_cover = np.where(velocity > 0, matrix.available / velocity, np.inf)
+    # No cost data: order a month of demand; no demand: nothing to order
+    eoq = np.where(np.isfinite(eoq), eoq, velocity * 30)
+    eoq = np.ceil(np.maximum(eoq, 0))
+    
+    # Above reorder point + one order quantity there is more stock than the policy would ever hold
+    max_level = reorder_point + np.maximum(eoq, matrix.min_qty)
+    understocked = matrix.available <= reorder_point
+    overstocked = ~understocked & (matrix.available > max_level)
+    
+    return {
+        'velocity': velocity,
+        'safety_stock': safety_stock,
+        'reorder_point': np.ceil(reorder_point),
+        'eoq': eoq,
+        'days_of_cover': days_of_cover,
+        'understocked': understocked,
+        'overstocked': overstocked,
+        'max_level': np.ceil(max_level),
+    }
+
+
+def rank_suggestions(matrix, result, limit=None):
+    """Suggestions ordered by urgency: reorders by fewest days of cover, then the largest overstocks"""
+    import numpy as np
+    
+    reorder = np.flatnonzero(result['understocked'])
+    reorder = reorder[np.lexsort((-result['velocity'][reorder], result['days_of_cover'][reorder]))]
+    excess = matrix.available - result['max_level']
+    reduce = np.flatnonzero(result['overstocked'])
+    reduce = reduce[np.argsort(-(excess[reduce] * matrix.unit_cost[reduce]), kind='stable')]
+    
+    ordered = np.concatenate((reorder, reduce))
+    if limit is not None:
+        ordered = ordered[:limit]
+    
+    suggestions = []
+    for index in ordered.tolist():
+        velocity = float(result['velocity'][index])
+        suggestion = {
+            'product_id': int(matrix.product_ids[index]),
+            'product': matrix.names[index],
+            'available_qty': int(matrix.available[index]),
+            'daily_demand': round(velocity, 2),
+            'safety_stock': int(np.ceil(result['safety_stock'][index])),
+            'reorder_point': int(result['reorder_point'][index]),
+            'eoq': int(result['eoq'][index]),
+            'days_of_cover': round(float(result['days_of_cover'][index]), 1) if velocity > 0 else None
+        }
+        if result['understocked'][index]:
+            quantity = max(int(result['eoq'][index]), int(result['reorder_point'][index] - matrix.available[index]), 1)
+            suggestion.update({
+                'action': 'increase',
+                'quantity': quantity,
+                'reason': f"At or below reorder point ({suggestion['reorder_point']}) - order {quantity} (EOQ)"
+            })
+        else:
+            suggestion.update({
+                'action': 'reduce',
+                'quantity': int(excess[index]),
+                'reason': 'Overstocked - consider promotion'
+            })
+        suggestions.append(suggestion)
+    return suggestions
@@ -0,0 +1,250 @@
+# Bulk invoice rendering: batched order loading, a process pool, streamed zip or directory output
+import base64
+import json
+import multiprocessing
+import os
+import re
+import threading
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from functools import lru_cache
+from itertools import repeat
+from flask import current_app
+from jinja2 import Environment, FileSystemLoader, select_autoescape
+from extensions import db
+from models import Order, OrderItem, Product
+from models_advanced import PaymentQR
+from qr_service import upi_payee, upi_url, render_qr, qr_cache_key
+
+INVOICE_BATCH_SIZE = 500
+INVOICE_WORKERS_DEFAULT = 2
+TEMPLATE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'templates')
+
+# One render pool per process, shared by every export
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def invoice_workers():
+    """Render processes: INVOICE_WORKERS, else at most two so an export cannot take over the host"""
+    return max(1, int(current_app.config.get('INVOICE_WORKERS', min(INVOICE_WORKERS_DEFAULT, os.cpu_count() or 1))))
+
+
+def invoice_pool(workers):
+    """The shared render pool, created on first use with `workers` processes.
+    
+    Workers are spawned, not forked: forking a multithreaded server
+    process can copy locks held by other threads.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+        return _pool
+
+
+def business_details():
+    payee_vpa, payee_name = upi_payee()
+    return {
+        'name': current_app.config.get('BUSINESS_NAME', payee_name),
+        'gstin': current_app.config.get('BUSINESS_GSTIN', ''),
+        'address': current_app.config.get('BUSINESS_ADDRESS', ''),
+        'payee_vpa': payee_vpa,
+        'payee_name': payee_name
+    }
+
+
+def invoice_filters(start=None, end=None, status=None, order_type='sales'):
+    filters = [Order.order_type == order_type]
+    if start:
+        filters.append(Order.created_at >= start)
+    if end:
+        filters.append(Order.created_at < end)
+    if status:
+        filters.append(Order.status == status)
+    return filters
+
+
+def count_invoices(**criteria):
+    return db.session.query(db.func.count(Order.id)).filter(*invoice_filters(**criteria)).scalar()
+
+
+def iter_invoice_batches(batch_size=INVOICE_BATCH_SIZE, **criteria):
+    """Yield lists of plain invoice dicts (picklable for worker processes).
+    
+    Three queries per batch: the orders (keyset on id), their items with
+    product details, and any QR images already stored for them.
+    """
+    filters = invoice_filters(**criteria)
+    business = business_details()
+    last_id = 0
+    while True:
+        orders = db.session.query(
+            Order.id, Order.order_number, Order.status, Order.created_at,
+            Order.customer_name, Order.customer_mobile, Order.customer_gst,
+            Order.total_amount, Order.gst_amount
+        ).filter(*filters, Order.id > last_id).order_by(Order.id).limit(batch_size).all()
+        if not orders:
+            return
+        order_ids = [order.id for order in orders]
+        last_id = order_ids[-1]
+        
+        items = {}
+        for row in db.session.query(
+            OrderItem.order_id, Product.name, Product.hsn_code, Product.gst_rate,
+            OrderItem.quantity, OrderItem.unit_price, OrderItem.total_price
+        ).join(Product, Product.id == OrderItem.product_id).filter(
+            OrderItem.order_id.in_(order_ids)
+        ).order_by(OrderItem.order_id, OrderItem.id):
+            items.setdefault(row.order_id, []).append({
+                'name': row.name,
+                'hsn_code': row.hsn_code,
+                'gst_rate': row.gst_rate or 0,
+                'quantity': row.quantity,
+                'unit_price': row.unit_price,
+                'total_price': row.total_price
+            })
+        
+        stored_qr = dict(db.session.query(PaymentQR.cache_key, PaymentQR.png).filter(
+            PaymentQR.order_id.in_(order_ids), PaymentQR.png.isnot(None)
+        ))
+        
+        batch = []
+        for order in orders:
+            grand_total = (order.total_amount or 0) + (order.gst_amount or 0)
+            amount = f"{grand_total:.2f}"
+            qr_key = qr_cache_key(business['payee_vpa'], business['payee_name'], amount, order.order_number)
+            batch.append({
+                'order_number': order.order_number,
+                'status': order.status,
+                'date': order.created_at.strftime('%d %b %Y') if order.created_at else '',
+                'customer_name': order.customer_name,
+                'customer_mobile': order.customer_mobile,
+                'customer_gst': order.customer_gst,
+                'total_amount': order.total_amount or 0,
+                'gst_amount': order.gst_amount or 0,
+                'grand_total': grand_total,
+                'items': items.get(order.id, []),
+                'upi_url': upi_url(business['payee_vpa'], business['payee_name'], amount, order.order_number),
+                'qr_png': stored_qr.get(qr_key)
+            })
+        yield batch
+
+
+@lru_cache(maxsize=1)
+def _invoice_template():
+    environment = Environment(loader=FileSystemLoader(TEMPLATE_DIR), autoescape=select_autoescape(['html']))
+    return environment.get_template('invoice_document.html')
+
+
+def render_invoice(invoice, business):
+    """Render one invoice to (order_number, html bytes, QR PNG bytes); runs in worker processes"""
+    qr_png = invoice['qr_png'] or render_qr(invoice['upi_url'])
+    html = _invoice_template().render(invoice=invoice, business=business, qr_png=qr_png)
+    return invoice['order_number'], html.encode('utf-8'), base64.b64decode(qr_png)
+
+
+def render_invoices(batches, business, workers=1, progress=None):
+    """Yield rendered invoices in order, overlapping the next batch's queries with rendering.
+    
+    `progress(done, elapsed_seconds)` is called after every batch.
+    """
+    started = time.perf_counter()
+    done = 0
+    pool = invoice_pool(workers) if workers > 1 else None
+    in_flight = []
+    
+    def submit(batch):
+        if pool is None:
+            return map(render_invoice, batch, repeat(business))
+        results = pool.map(render_invoice, batch, repeat(business), chunksize=max(1, len(batch) // (workers * 4)))
+        in_flight.append(results)
+        return results
+    
+    try:
+        pending = None
+        for batch in batches:
+            submitted = submit(batch)
+            if pending is not None:
+                for result in pending:
+                    done += 1
+                    yield result
+                if progress:
+                    progress(done, time.perf_counter() - started)
+            pending = submitted
+        if pending is not None:
+            for result in pending:
+                done += 1
+                yield result
+            if progress:
+                progress(done, time.perf_counter() - started)
+    finally:
+        # The pool outlives this export; closing the result iterators cancels work nobody will read
+        for results in in_flight:
+            results.close()
+
+
+def invoice_filename(order_number):
+    return re.sub(r'[^A-Za-z0-9._-]', '_', order_number)
+
+
+class _ChunkSink:
+    """Write-only file object for zipfile that hands written bytes back to a generator"""
+    
+    def __init__(self):
+        self.chunks = []
+    
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+    
+    def flush(self):
+        pass
+    
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks.clear()
+        return data
+
+
+def stream_zip(results, summary=None):
+    """Zip rendered invoices as a byte stream: invoices/*.html, qr/*.png and manifest.json"""
+    sink = _ChunkSink()
+    count = 0
+    started = time.perf_counter()
+    with zipfile.ZipFile(sink, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        for order_number, html, png in results:
+            name = invoice_filename(order_number)
+            archive.writestr(f"invoices/{name}.html", html)
+            # PNG data is already compressed
+            archive.writestr(f"qr/{name}.png", png, compress_type=zipfile.ZIP_STORED)
+            count += 1
+            chunk = sink.drain()
+            if chunk:
+                yield chunk
+        elapsed = time.perf_counter() - started
+        archive.writestr('manifest.json', json.dumps({
+            **(summary or {}),
+            'invoices': count,
+            'elapsed_seconds': round(elapsed, 3),
+            'invoices_per_second': round(count / elapsed, 1) if elapsed > 0 else None,
+            'generated_at': datetime.utcnow().isoformat()
+        }, indent=2))
+    yield sink.drain()
+
+
+def write_directory(results, directory):
+    """Write rendered invoices under directory/invoices and directory/qr; returns the count"""
+    os.makedirs(os.path.join(directory, 'invoices'), exist_ok=True)
+    os.makedirs(os.path.join(directory, 'qr'), exist_ok=True)
+    count = 0
+    for order_number, html, png in results:
+        name = invoice_filename(order_number)
+        with open(os.path.join(directory, 'invoices', f'{name}.html'), 'wb') as f:
+            f.write(html)
+        with open(os.path.join(directory, 'qr', f'{name}.png'), 'wb') as f:
+            f.write(png)
+        count += 1
+    return count
@@ -1,4 +1,11 @@
-from safe_app import app
+# WSGI entry point: gunicorn [--preload] main:app
+from app_factory import create_app
+
+app = create_app()
 
 if __name__ == '__main__':
+    # Development server: set up the database first (production runs `flask --app main init-db` on deploy)
+    from schema import init_database
+    with app.app_context():
+        init_database()
     app.run(host='0.0.0.0', port=5000, debug=True)
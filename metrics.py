@@ -0,0 +1,134 @@
+# Request and SQL metrics in Prometheus text format, summed across gunicorn workers
+import os
+import time
+from contextvars import ContextVar
+from flask import Response, got_request_exception, request
+from sqlalchemy import event
+
+# Seconds; API reads are mostly 5-100ms, report exports and invoice zips run to tens of seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+SQL_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 250)
+SQL_TIME_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+# [started, SQL statements, SQL seconds] for the request being handled. A context
+# variable rather than flask.g: the SQL hooks run per statement and g is a proxy.
+_request_stats = ContextVar('request_stats', default=None)
+
+
+class RequestMetrics:
+    """Prometheus collectors plus the hooks that feed them"""
+    
+    def __init__(self):
+        from prometheus_client import Counter, Histogram
+        
+        self.requests = Counter(
+            'http_requests_total', 'Requests handled', ['endpoint', 'method', 'status']
+        )
+        self.latency = Histogram(
+            'http_request_duration_seconds', 'Time from before_request to after_request',
+            ['endpoint', 'method'], buckets=LATENCY_BUCKETS
+        )
+        self.response_size = Histogram(
+            'http_response_size_bytes', 'Response body size (streamed responses are not counted)',
+            ['endpoint'], buckets=SIZE_BUCKETS
+        )
+        self.sql_count = Histogram(
+            'http_request_sql_statements', 'SQL statements executed per request',
+            ['endpoint'], buckets=SQL_COUNT_BUCKETS
+        )
+        self.sql_time = Histogram(
+            'http_request_sql_duration_seconds', 'Total time spent in SQL statements per request',
+            ['endpoint'], buckets=SQL_TIME_BUCKETS
+        )
+        self.exceptions = Counter(
+            'http_request_exceptions_total', 'Requests that raised an unhandled exception',
+            ['endpoint', 'exception']
+        )
+        self._children = {}
+    
+    def before_request(self):
+        _request_stats.set([time.perf_counter(), 0, 0.0])
+    
+    def after_request(self, response):
+        stats = _request_stats.get()
+        if stats is None:
+            return response
+        _request_stats.set(None)
+        started, statements, sql_seconds = stats
+        elapsed = time.perf_counter() - started
+        key = (request.endpoint or 'unmatched', request.method, response.status_code)
+        children = self._children.get(key)
+        if children is None:
+            children = self._children[key] = self._label(*key)
+        latency, requests, sql_count, sql_time, response_size = children
+        latency.observe(elapsed)
+        requests.inc()
+        sql_count.observe(statements)
+        sql_time.observe(sql_seconds)
+        if not response.is_streamed and response.content_length is not None:
+            response_size.observe(response.content_length)
+        return response
+    
+    def _label(self, endpoint, method, status):
+        # labels() validates and hashes on every call; resolving each series once keeps the hook cheap
+        return (
+            self.latency.labels(endpoint, method),
+            self.requests.labels(endpoint, method, str(status)),
+            self.sql_count.labels(endpoint),
+            self.sql_time.labels(endpoint),
+            self.response_size.labels(endpoint)
+        )
+    
+    def record_exception(self, sender, exception, **extra):
+        self.exceptions.labels(request.endpoint or 'unmatched', type(exception).__name__).inc()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # A connection runs one statement at a time, so one slot is enough
+    conn.info['metrics_started'] = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.pop('metrics_started', None)
+    stats = _request_stats.get()
+    if started is not None and stats is not None:
+        stats[1] += 1
+        stats[2] += time.perf_counter() - started
+
+
+def render_metrics():
+    """Text exposition of every worker's metrics when PROMETHEUS_MULTIPROC_DIR is set, else this process's"""
+    from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, generate_latest
+    
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        from prometheus_client import multiprocess
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return Response(generate_latest(registry), mimetype=CONTENT_TYPE_LATEST)
+
+
+def init_metrics(app, engines):
+    """Instrument the app and its engines and serve /metrics (METRICS_ENABLED=0 turns it all off).
+    
+    Needs prometheus_client; without it the app runs uninstrumented.
+    """
+    if not app.config.get('METRICS_ENABLED', os.environ.get('METRICS_ENABLED', '1') == '1'):
+        return None
+    try:
+        metrics = RequestMetrics()
+    except ImportError as e:
+        app.logger.warning(f"Metrics disabled: {e}")
+        return None
+    
+    app.before_request(metrics.before_request)
+    app.after_request(metrics.after_request)
+    got_request_exception.connect(metrics.record_exception, app, weak=False)
+    for engine in engines:
+        event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+    app.add_url_rule('/metrics', 'metrics', render_metrics)
+    app.extensions['metrics'] = metrics
+    return metrics
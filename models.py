@@ -40,7 +40,7 @@ class Product(db.Model):
 
 class Stock(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    product_id = db.Column(db.Integer, db.ForeignKey('product.id'), nullable=False)
+    product_id = db.Column(db.Integer, db.ForeignKey('product.id'), nullable=False, index=True)
     available_qty = db.Column(db.Integer, default=0)
     min_qty = db.Column(db.Integer, default=10)  # Alert threshold
     product = db.relationship('Product', backref=db.backref('stock', uselist=False))
@@ -55,15 +55,36 @@ class Order(db.Model):
     total_amount = db.Column(db.Float, default=0.0)
     gst_amount = db.Column(db.Float, default=0.0)
     status = db.Column(db.String(20), default='pending')  # pending, completed, cancelled
+    place_of_supply = db.Column(db.String(2))  # GST state code of the buyer
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)  # Drives incremental rollups
+    __table_args__ = (
+        # Order feed (type, newest first) and completed-sales analytics over date ranges
+        db.Index('ix_order_type_created_at', 'order_type', 'created_at'),
+        db.Index('ix_order_type_status_created_at', 'order_type', 'status', 'created_at'),
+        # Rollup change detection
+        db.Index('ix_order_type_updated_at', 'order_type', 'updated_at'),
+    )
+
+# Per-day order number allocator (one row per day, bumped atomically)
+class OrderSequence(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    prefix = db.Column(db.String(10), nullable=False, default='ORD')
+    day = db.Column(db.String(8), nullable=False)  # YYYYMMDD
+    last_value = db.Column(db.Integer, nullable=False, default=0)
+    __table_args__ = (db.UniqueConstraint('prefix', 'day', name='uq_order_sequence_prefix_day'),)
 
 class OrderItem(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    order_id = db.Column(db.Integer, db.ForeignKey('order.id'), nullable=False)
-    product_id = db.Column(db.Integer, db.ForeignKey('product.id'), nullable=False)
+    order_id = db.Column(db.Integer, db.ForeignKey('order.id'), nullable=False, index=True)
+    product_id = db.Column(db.Integer, db.ForeignKey('product.id'), nullable=False, index=True)
     quantity = db.Column(db.Integer, nullable=False)
     unit_price = db.Column(db.Float, nullable=False)
-    total_price = db.Column(db.Float, nullable=False)
+    total_price = db.Column(db.Float, nullable=False)  # Taxable value
+    gst_rate = db.Column(db.Float)  # Rate applied when the order was placed; NULL until the split is computed
+    cgst_amount = db.Column(db.Float)
+    sgst_amount = db.Column(db.Float)
+    igst_amount = db.Column(db.Float)
     order = db.relationship('Order', backref=db.backref('items', lazy=True))
     product = db.relationship('Product', backref=db.backref('order_items', lazy=True))
 
@@ -108,7 +129,7 @@ class Customer(db.Model):
 # Credit transactions for customers
 class CreditTransaction(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    customer_id = db.Column(db.Integer, db.ForeignKey('customer.id'), nullable=False)
+    customer_id = db.Column(db.Integer, db.ForeignKey('customer.id'), nullable=False, index=True)
     order_id = db.Column(db.Integer, db.ForeignKey('order.id'), nullable=True)
     transaction_type = db.Column(db.String(20), nullable=False)  # 'sale', 'payment', 'adjustment'
     amount = db.Column(db.Float, nullable=False)
@@ -140,7 +161,7 @@ class GSTState(db.Model):
             ('Lakshadweep', '31'), ('Puducherry', '34'), ('Andaman and Nicobar Islands', '35')
         ]
         
-        for state_name, code in states:
-            if not GSTState.query.filter_by(state_code=code).first():
-                state = GSTState(state_name=state_name, state_code=code)
-                db.session.add(state)
+        existing = {code for (code,) in db.session.query(GSTState.state_code)}
+        missing = [GSTState(state_name=state_name, state_code=code) for state_name, code in states if code not in existing]
+        db.session.add_all(missing)
+        return len(missing)
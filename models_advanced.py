@@ -28,6 +28,7 @@ class WarehouseStock(db.Model):
     
     warehouse = db.relationship('Warehouse', backref=db.backref('stocks', lazy=True))
     product = db.relationship('Product', backref=db.backref('warehouse_stocks', lazy=True))
+    __table_args__ = (db.Index('ix_warehouse_stock_warehouse_product', 'warehouse_id', 'product_id'),)
 
 # Purchase Order System
 class PurchaseOrder(db.Model):
@@ -132,6 +133,57 @@ class SalesAnalytics(db.Model):
     
     product = db.relationship('Product', backref=db.backref('sales_analytics', lazy=True))
     warehouse = db.relationship('Warehouse', backref=db.backref('sales_analytics', lazy=True))
+    __table_args__ = (
+        db.Index('ix_sales_analytics_date', 'date'),
+        db.Index('ix_sales_analytics_product_date', 'product_id', 'date'),
+    )
+
+# Store-wide daily totals, refreshed together with SalesAnalytics
+class DailySalesSummary(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    date = db.Column(db.Date, unique=True, nullable=False)
+    order_count = db.Column(db.Integer, default=0)
+    revenue = db.Column(db.Float, default=0.0)
+    gst_amount = db.Column(db.Float, default=0.0)
+    customer_count = db.Column(db.Integer, default=0)
+
+# Persisted ABC (revenue share) / XYZ (demand variability) class per product
+class ProductClassification(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    product_id = db.Column(db.Integer, db.ForeignKey('product.id'), unique=True, nullable=False)
+    abc_class = db.Column(db.String(1), index=True)  # A, B, C
+    xyz_class = db.Column(db.String(1), index=True)  # X, Y, Z; NULL when there was no demand
+    revenue = db.Column(db.Float, default=0.0)
+    cumulative_share = db.Column(db.Float, default=0.0)  # Cumulative revenue % at this product
+    demand_cv = db.Column(db.Float)  # Coefficient of variation of per-period quantity
+    computed_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    product = db.relationship('Product', backref=db.backref('classification', uselist=False))
+
+class ProductForecast(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    product_id = db.Column(db.Integer, db.ForeignKey('product.id'), unique=True, nullable=False)
+    model = db.Column(db.String(20), nullable=False)  # holt (damped trend) or mean (short history)
+    alpha = db.Column(db.Float)
+    beta = db.Column(db.Float)
+    level = db.Column(db.Float, default=0.0)
+    trend = db.Column(db.Float, default=0.0)
+    forecast_start = db.Column(db.Date, nullable=False)  # Monday of the first forecast week
+    weekly_forecast = db.Column(db.Text, nullable=False)  # JSON list of units per week
+    daily_demand = db.Column(db.Float, default=0.0, index=True)  # Mean units/day over the next 4 weeks
+    mae = db.Column(db.Float)  # One-step-ahead mean absolute error in history
+    history_weeks = db.Column(db.Integer, default=0)
+    computed_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    product = db.relationship('Product', backref=db.backref('forecast', uselist=False))
+
+class PaymentQR(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    order_id = db.Column(db.Integer, db.ForeignKey('order.id'), nullable=False, index=True)
+    cache_key = db.Column(db.String(255), unique=True, nullable=False)  # payee|name|amount|order_number
+    png = db.Column(db.Text)  # Base64 PNG
+    svg = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
 # Notification System
 class Notification(db.Model):
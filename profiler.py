@@ -0,0 +1,247 @@
+# On-demand request profiling for admins: cProfile stats plus flame-graph-ready stack samples
+import cProfile
+import json
+import os
+import random
+import re
+import secrets
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from flask import abort, jsonify, render_template, request, send_from_directory
+from werkzeug.exceptions import HTTPException
+from werkzeug.wrappers import Response
+from admin_auth import is_admin
+
+# Config / environment key -> (default, type). Nothing is installed unless a token or sample rate is set.
+PROFILER_SETTINGS = {
+    'PROFILER_TOKEN': ('', str),            # Admin secret: send it as the X-Profile header to profile a request
+    'PROFILER_SAMPLE_RATE': (0.0, float),   # Fraction of all requests profiled without asking
+    'PROFILER_DIR': (os.path.join(tempfile.gettempdir(), 'stockmanager-profiles'), str),
+    'PROFILER_KEEP': (50, int),             # Captures kept; older ones are deleted
+    'PROFILER_INTERVAL_MS': (5, float),     # Stack sampling interval
+}
+CAPTURE_FILES = ('pstats', 'collapsed', 'json')
+_CAPTURE_NAME = re.compile(r'^[\w.-]+\.(pstats|collapsed|json)$')
+# One capture at a time per process: Python 3.12+ refuses a second concurrent cProfile session
+_capture_lock = threading.Lock()
+
+
+def profiler_config_from_env():
+    """PROFILER_* settings present in the environment, converted to their types"""
+    return {key: cast(os.environ[key]) for key, (_, cast) in PROFILER_SETTINGS.items() if os.environ.get(key)}
+
+
+def profiler_settings(config):
+    return {key: config.get(key, default) for key, (default, _) in PROFILER_SETTINGS.items()}
+
+
+class StackSampler(threading.Thread):
+    """Samples one thread's Python stack at a fixed interval into collapsed-stack counts"""
+    
+    def __init__(self, thread_id, interval):
+        super().__init__(name='profile-sampler', daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self.done = threading.Event()
+    
+    def run(self):
+        while not self.done.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+    
+    def stop(self):
+        self.done.set()
+        self.join()
+    
+    def collapsed(self):
+        """One `frame;frame;frame count` line per stack, the input format of flamegraph.pl and speedscope"""
+        return ''.join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+class RequestProfiler:
+    """WSGI middleware profiling the requests an admin asks for, plus a random sample"""
+    
+    def __init__(self, app, settings):
+        self.app = app
+        self.wsgi_app = app.wsgi_app
+        self.token = settings['PROFILER_TOKEN']
+        self.sample_rate = settings['PROFILER_SAMPLE_RATE']
+        self.directory = settings['PROFILER_DIR']
+        self.keep = settings['PROFILER_KEEP']
+        self.interval = settings['PROFILER_INTERVAL_MS'] / 1000
+        self._prune_lock = threading.Lock()
+    
+    def __call__(self, environ, start_response):
+        if is_admin(environ.get('HTTP_X_PROFILE', ''), self.token):
+            if not _capture_lock.acquire(blocking=False):
+                busy = Response(
+                    json.dumps({'error': 'Another request is being profiled in this worker; retry shortly'}),
+                    status=409, mimetype='application/json'
+                )
+                return busy(environ, start_response)
+            return self.profile(environ, start_response, 'header')
+        # Sampled requests simply go unprofiled while a capture is running
+        if self.sample_rate and random.random() < self.sample_rate and _capture_lock.acquire(blocking=False):
+            return self.profile(environ, start_response, 'sample')
+        return self.wsgi_app(environ, start_response)
+    
+    def endpoint(self, environ):
+        try:
+            endpoint, _ = self.app.url_map.bind_to_environ(environ).match()
+        except HTTPException:
+            endpoint = 'unmatched'
+        return endpoint
+    
+    def profile(self, environ, start_response, trigger):
+        """Profile one request; the caller holds _capture_lock, released once the capture is saved"""
+        endpoint = self.endpoint(environ)
+        slug = re.sub(r'[^\w]+', '_', endpoint)
+        capture_id = f"{datetime.now():%Y%m%d-%H%M%S-%f}-{slug}-{secrets.token_hex(2)}"
+        status = []
+        
+        def profiled_start_response(status_line, headers, exc_info=None):
+            status.append(status_line)
+            headers.append(('X-Profile-Id', capture_id))
+            return start_response(status_line, headers, exc_info)
+        
+        sampler = StackSampler(threading.get_ident(), self.interval)
+        profiler = cProfile.Profile()
+        started = time.perf_counter()
+        try:
+            sampler.start()
+            profiler.enable()
+        except BaseException:
+            if sampler.is_alive():
+                sampler.stop()
+            _capture_lock.release()
+            raise
+        
+        def finish():
+            try:
+                profiler.disable()
+                sampler.stop()
+                self.save(capture_id, profiler, sampler, {
+                    'id': capture_id,
+                    'endpoint': endpoint,
+                    'method': environ.get('REQUEST_METHOD'),
+                    'path': environ.get('PATH_INFO', '') + (f"?{environ['QUERY_STRING']}" if environ.get('QUERY_STRING') else ''),
+                    'status': int(status[0].split()[0]) if status else None,
+                    'duration_ms': round((time.perf_counter() - started) * 1000, 2),
+                    'samples': sum(sampler.stacks.values()),
+                    'trigger': trigger,
+                    'pid': os.getpid(),
+                    'created': datetime.now().isoformat(timespec='seconds')
+                })
+            finally:
+                _capture_lock.release()
+        
+        try:
+            body = self.wsgi_app(environ, profiled_start_response)
+        except BaseException:
+            finish()
+            raise
+        # Streamed bodies are produced while the server iterates, so keep profiling until close()
+        return ProfiledBody(body, finish)
+    
+    def save(self, capture_id, profiler, sampler, meta):
+        os.makedirs(self.directory, exist_ok=True)
+        base = os.path.join(self.directory, capture_id)
+        profiler.dump_stats(f"{base}.pstats")
+        with open(f"{base}.collapsed", 'w') as f:
+            f.write(sampler.collapsed())
+        # The metadata file is written last, and atomically: the index only lists complete captures
+        with open(f"{base}.json.tmp", 'w') as f:
+            json.dump(meta, f)
+        os.replace(f"{base}.json.tmp", f"{base}.json")
+        self.prune()
+    
+    def prune(self):
+        with self._prune_lock:
+            for capture in list_captures(self.directory)[self.keep:]:
+                for extension in CAPTURE_FILES:
+                    try:
+                        os.remove(os.path.join(self.directory, f"{capture['id']}.{extension}"))
+                    except FileNotFoundError:
+                        pass
+
+
+class ProfiledBody:
+    """Response iterable that finishes the capture when the server closes it"""
+    
+    def __init__(self, body, finish):
+        self.body = body
+        self.finish = finish
+    
+    def __iter__(self):
+        return iter(self.body)
+    
+    def close(self):
+        try:
+            if hasattr(self.body, 'close'):
+                self.body.close()
+        finally:
+            self.finish()
+
+
+def list_captures(directory):
+    """Metadata of the stored captures, newest first"""
+    try:
+        names = sorted((name for name in os.listdir(directory) if name.endswith('.json')), reverse=True)
+    except FileNotFoundError:
+        return []
+    captures = []
+    for name in names:
+        try:
+            with open(os.path.join(directory, name)) as f:
+                captures.append(json.load(f))
+        except (OSError, ValueError):
+            continue  # Pruned by another worker
+    return captures
+
+
+def init_profiler(app):
+    """Install the profiling middleware and the /admin/profiles pages when PROFILER_TOKEN or PROFILER_SAMPLE_RATE is set.
+    
+    Left unset, nothing is installed and requests take the usual path.
+    """
+    settings = profiler_settings(app.config)
+    if not settings['PROFILER_TOKEN'] and not settings['PROFILER_SAMPLE_RATE']:
+        return None
+    profiler = RequestProfiler(app, settings)
+    app.wsgi_app = profiler
+    
+    def require_admin():
+        # Header only: a token in the query string would end up in access and proxy logs
+        if not is_admin(request.headers.get('X-Profile', ''), settings['PROFILER_TOKEN']):
+            abort(403)
+    
+    def profiles_index():
+        """Recent captures across all workers, newest first (?format=json for scripts)"""
+        require_admin()
+        captures = list_captures(settings['PROFILER_DIR'])
+        if request.args.get('format') == 'json':
+            return jsonify(captures)
+        return render_template('profiles.html', captures=captures)
+    
+    def profile_download(name):
+        """Download one capture file: .pstats (snakeviz, pstats), .collapsed (flamegraph.pl, speedscope) or .json"""
+        require_admin()
+        if not _CAPTURE_NAME.match(name):
+            abort(404)
+        return send_from_directory(settings['PROFILER_DIR'], name, as_attachment=True)
+    
+    app.add_url_rule('/admin/profiles', 'profiles_index', profiles_index)
+    app.add_url_rule('/admin/profiles/<name>', 'profile_download', profile_download)
+    app.extensions['profiler'] = profiler
+    return profiler
@@ -0,0 +1,116 @@
+# UPI payment QR codes: rendered once per (payee, amount, order number), cached and stored
+import base64
+import io
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from urllib.parse import quote
+from flask import current_app
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from extensions import db
+from models import Order
+from models_advanced import PaymentQR
+
+QR_FORMATS = ('png', 'svg')
+QR_CACHE_SIZE = 2048
+
+logger = logging.getLogger(__name__)
+_prerender_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix='qr-prerender')
+
+
+def upi_payee():
+    """(VPA, display name) the QR codes pay to"""
+    return (
+        current_app.config.get('UPI_PAYEE_VPA', 'merchant@upi'),
+        current_app.config.get('UPI_PAYEE_NAME', 'Your Business Name')
+    )
+
+
+def upi_url(payee_vpa, payee_name, amount, order_number):
+    # UPI URL format: upi://pay?pa=UPI_ID&pn=NAME&am=AMOUNT&cu=INR&tn=DESCRIPTION
+    return f"upi://pay?pa={quote(payee_vpa)}&pn={quote(payee_name)}&am={amount}&cu=INR&tn={quote(f'Invoice {order_number}')}"
+
+
+def render_qr(data, fmt='png'):
+    """Base64 PNG, or SVG markup (no PIL involved) for `data`"""
+    import qrcode
+    
+    qr = qrcode.QRCode(version=1, box_size=6, border=5)
+    qr.add_data(data)
+    qr.make(fit=True)
+    
+    if fmt == 'svg':
+        from qrcode.image.svg import SvgPathImage
+        return qr.make_image(image_factory=SvgPathImage).to_string(encoding='unicode')
+    
+    buffer = io.BytesIO()
+    qr.make_image(fill_color="black", back_color="white").save(buffer, format='PNG')
+    return base64.b64encode(buffer.getvalue()).decode()
+
+
+def qr_cache_key(payee_vpa, payee_name, amount, order_number):
+    return '|'.join((payee_vpa, payee_name, amount, order_number))
+
+
+@lru_cache(maxsize=QR_CACHE_SIZE)
+def upi_qr(payee_vpa, payee_name, amount, order_number, fmt='png'):
+    """QR for one payment: from this worker's LRU, else the pre-rendered PaymentQR row, else rendered now.
+    
+    Read-only, so it is safe on GET requests; only prerender_order_qrs stores QR codes.
+    """
+    if fmt not in QR_FORMATS:
+        raise ValueError(f"format must be one of {', '.join(QR_FORMATS)}")
+    stored = db.session.query(getattr(PaymentQR, fmt)).filter_by(
+        cache_key=qr_cache_key(payee_vpa, payee_name, amount, order_number)
+    ).scalar()
+    return stored or render_qr(upi_url(payee_vpa, payee_name, amount, order_number), fmt)
+
+
+def order_qr_key(order):
+    amount = f"{(order.total_amount or 0) + (order.gst_amount or 0):.2f}"
+    return (*upi_payee(), amount, order.order_number)
+
+
+def order_qr(order, fmt='png'):
+    return upi_qr(*order_qr_key(order), fmt)
+
+
+def store_order_qrs(session, order):
+    """Render any missing formats of an order's QR into PaymentQR and commit `session`"""
+    payee_vpa, payee_name, amount, order_number = order_qr_key(order)
+    cache_key = qr_cache_key(payee_vpa, payee_name, amount, order_number)
+    stored = session.query(PaymentQR).filter_by(cache_key=cache_key).first()
+    if stored is None:
+        stored = PaymentQR(order_id=order.id, cache_key=cache_key)
+        session.add(stored)
+    for fmt in QR_FORMATS:
+        if not getattr(stored, fmt):
+            setattr(stored, fmt, render_qr(upi_url(payee_vpa, payee_name, amount, order_number), fmt))
+    try:
+        session.commit()
+    except IntegrityError:
+        # Another worker stored the same payment first; its images are identical
+        session.rollback()
+
+
+def prerender_order_qrs(order_ids):
+    """Render and store QR codes for new sales invoices on a background thread, in its own session"""
+    if not order_ids:
+        return None
+    app = current_app._get_current_object()
+    order_ids = list(order_ids)
+    
+    def run():
+        with app.app_context():
+            try:
+                with Session(db.engine) as session:
+                    orders = session.query(Order).filter(
+                        Order.id.in_(order_ids), Order.order_type == 'sales', Order.status != 'cancelled'
+                    ).all()
+                    for order in orders:
+                        store_order_qrs(session, order)
+            except Exception:
+                logger.exception("QR pre-render failed for orders %s", order_ids)
+    
+    return _prerender_pool.submit(run)
@@ -0,0 +1,122 @@
+# Development checks: repeated statement shapes (N+1 loads) and per-endpoint query budgets
+import logging
+import os
+import re
+import time
+from collections import Counter, deque
+from contextvars import ContextVar
+from flask import current_app, request
+from sqlalchemy import event
+
+DEFAULT_REPEAT_THRESHOLD = 5
+
+logger = logging.getLogger(__name__)
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'(?<![\w.])-?\d+(?:\.\d+)?\b')
+_PLACEHOLDER_LIST = re.compile(r'\(\s*(?:\?|%s|%\(\w+\)s)(?:\s*,\s*(?:\?|%s|%\(\w+\)s))*\s*\)')
+_WHITESPACE = re.compile(r'\s+')
+
+# Statements seen by the request being handled, when checks are on
+_recorded = ContextVar('recorded_statements', default=None)
+
+# Latest request reports, newest last, for the check-query-budgets command
+recent_reports = deque(maxlen=100)
+
+
+class QueryBudgetExceeded(AssertionError):
+    """Raised in strict mode when a request runs more statements than its endpoint's budget"""
+
+
+def query_budget(max_queries, methods=('GET',)):
+    """Declare how many SQL statements one request to this view may run (per HTTP method)"""
+    def decorator(view):
+        budgets = dict(getattr(view, 'query_budget', {}))
+        budgets.update((method, max_queries) for method in methods)
+        view.query_budget = budgets
+        return view
+    return decorator
+
+
+def normalize_sql(statement):
+    """Statement shape: literals and IN-lists collapsed, so loop iterations group together"""
+    shape = _STRING.sub('?', statement)
+    shape = _NUMBER.sub('?', shape)
+    shape = _PLACEHOLDER_LIST.sub('(?...)', shape)
+    return _WHITESPACE.sub(' ', shape).strip()
+
+
+def endpoint_budget(endpoint, method='GET'):
+    """QUERY_BUDGETS config entry for the endpoint (e.g. {'handle_products': 5}), else the budget declared on its view"""
+    configured = current_app.config.get('QUERY_BUDGETS') or {}
+    if endpoint in configured:
+        return configured[endpoint]
+    view = current_app.view_functions.get(endpoint)
+    return getattr(view, 'query_budget', {}).get(method)
+
+
+def _before_request():
+    if current_app.config.get('QUERY_CHECKS'):
+        _recorded.set([])
+
+
+def _after_request(response):
+    statements = _recorded.get()
+    if statements is None:
+        return response
+    _recorded.set(None)
+    
+    endpoint = request.endpoint or 'unmatched'
+    threshold = current_app.config.get('QUERY_REPEAT_THRESHOLD', DEFAULT_REPEAT_THRESHOLD)
+    shapes = Counter(shape for shape, _ in statements)
+    repeated = [(shape, count) for shape, count in shapes.most_common() if count > threshold]
+    budget = endpoint_budget(endpoint, request.method)
+    report = {
+        'endpoint': endpoint,
+        'method': request.method,
+        'path': request.full_path.rstrip('?'),
+        'statements': len(statements),
+        'sql_ms': round(sum(seconds for _, seconds in statements) * 1000, 2),
+        'budget': budget,
+        'repeated': repeated
+    }
+    recent_reports.append(report)
+    
+    for shape, count in repeated:
+        logger.warning("Possible N+1 in %s: %d x %s", endpoint, count, shape[:300])
+    response.headers['X-Query-Count'] = str(len(statements))
+    
+    if budget is not None and len(statements) > budget:
+        message = f"{endpoint} ran {len(statements)} SQL statements (budget {budget}) for {report['path']}"
+        if current_app.config.get('QUERY_CHECKS_STRICT'):
+            raise QueryBudgetExceeded(message)
+        logger.warning(message)
+    return response
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _recorded.get() is not None:
+        conn.info['query_check_started'] = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    statements = _recorded.get()
+    started = conn.info.pop('query_check_started', None)
+    if statements is not None and started is not None:
+        statements.append((normalize_sql(statement), time.perf_counter() - started))
+
+
+def init_query_checks(app, engines):
+    """Record statements per request when QUERY_CHECKS is on (env QUERY_CHECKS=1; strict: QUERY_CHECKS_STRICT=1).
+    
+    The hooks are always installed but do nothing unless the setting is on,
+    so a command or test can switch it on for a running app.
+    """
+    app.config.setdefault('QUERY_CHECKS', os.environ.get('QUERY_CHECKS') == '1')
+    app.config.setdefault('QUERY_CHECKS_STRICT', os.environ.get('QUERY_CHECKS_STRICT') == '1')
+    app.config.setdefault('QUERY_REPEAT_THRESHOLD', int(os.environ.get('QUERY_REPEAT_THRESHOLD', DEFAULT_REPEAT_THRESHOLD)))
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+    for engine in engines:
+        event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
@@ -0,0 +1,72 @@
+# Query-plan check: the hot analytics queries must be served by indexes on SQLite
+import re
+from datetime import datetime, timedelta
+from sqlalchemy import event
+from extensions import db
+from models import Stock, OrderItem, CreditTransaction
+from models_advanced import WarehouseStock, SalesAnalytics
+
+# Large tables that must never be read with a bare full-table SCAN
+HOT_TABLES = ('order', 'order_item', 'stock', 'credit_transaction', 'warehouse_stock', 'sales_analytics')
+FULL_SCAN = re.compile(r'^SCAN (\w+)$')
+
+
+def hot_queries():
+    """(name, statement) pairs for the queries the analytics and listing endpoints run most"""
+    from routes import order_feed_query
+    from analytics import sales_series_query, _completed_sales_lines
+    from rollups import changed_days_query
+    
+    now = datetime.now()
+    year_ago = now - timedelta(days=365)
+    profit_lines = _completed_sales_lines(year_ago, now)
+    
+    return [
+        ('order feed page', order_feed_query('sales').limit(51)),
+        ('order feed by status and date', order_feed_query('sales', start=year_ago, end=now, status='completed').limit(51)),
+        ('monthly completed sales', sales_series_query(year_ago, now, 'month', status='completed')),
+        ('daily sales by product', sales_series_query(year_ago, now, 'day', product_id=1)),
+        ('profit totals', profit_lines()),
+        ('rollup changed days', changed_days_query(now - timedelta(minutes=5))),
+        ('stock by product', db.session.query(Stock.available_qty).filter(Stock.product_id == 1)),
+        ('order lines by product', db.session.query(OrderItem.quantity).filter(OrderItem.product_id == 1)),
+        ('credit by customer', db.session.query(CreditTransaction.amount).filter(CreditTransaction.customer_id == 1)),
+        ('warehouse stock', db.session.query(WarehouseStock.available_qty).filter(
+            WarehouseStock.warehouse_id == 1, WarehouseStock.product_id == 1
+        )),
+        ('product rollup history', db.session.query(SalesAnalytics.revenue).filter(
+            SalesAnalytics.product_id == 1, SalesAnalytics.date >= year_ago.date()
+        )),
+    ]
+
+
+def explain(statement):
+    """EXPLAIN QUERY PLAN detail lines for an ORM query or Core statement (SQLite only)"""
+    statement = getattr(statement, 'statement', statement)
+    
+    def prefix(conn, cursor, sql, parameters, context, executemany):
+        return 'EXPLAIN QUERY PLAN ' + sql, parameters
+    
+    with db.engine.connect() as conn:
+        event.listen(conn, 'before_cursor_execute', prefix, retval=True)
+        result = conn.execute(statement)
+        return [row[-1] for row in result.cursor.fetchall()]
+
+
+def check_query_plans():
+    """Explain every hot query; returns [(name, plan_lines, problems)]"""
+    if db.engine.dialect.name != 'sqlite':
+        raise RuntimeError('Query-plan checks run against SQLite only')
+    
+    report = []
+    for name, statement in hot_queries():
+        plan = explain(statement)
+        problems = []
+        for line in plan:
+            match = FULL_SCAN.match(line)
+            if match and match.group(1) in HOT_TABLES:
+                problems.append(f"full table scan of {match.group(1)}")
+        if not any('INDEX' in line or 'PRIMARY KEY' in line for line in plan):
+            problems.append('no index used')
+        report.append((name, plan, problems))
+    return report
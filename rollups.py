@@ -0,0 +1,315 @@
+# Incremental daily sales rollups into SalesAnalytics / DailySalesSummary
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, date, timedelta
+from flask import current_app
+from sqlalchemy import func, distinct, cast, insert, update, delete, String
+from sqlalchemy.exc import IntegrityError
+from extensions import db
+from models import Product, Order, OrderItem
+from models_advanced import SalesAnalytics, DailySalesSummary, SystemSetting, Warehouse
+from analytics import day_expression, bucket_expression, MonthlySales
+from stats_cache import mark_written
+
+ROLLUP_STATE_KEY = 'sales_rollup.high_water_mark'
+# Changes only when a refresh actually rebuilt days, for consumers of the rollups
+ROLLUP_VERSION_KEY = 'sales_rollup.data_version'
+# Data-version tables of the rollups, for conditional_get on views that read them
+ROLLUP_TABLES = (SalesAnalytics.__tablename__, DailySalesSummary.__tablename__)
+# Re-scan a little behind the high-water mark to catch transactions that
+# committed late with an earlier updated_at. Day rebuilds are idempotent.
+ROLLUP_OVERLAP = timedelta(minutes=5)
+ROLLUP_DATE_CHUNK = 200
+DEFAULT_WAREHOUSE_CODE = 'MAIN'
+
+logger = logging.getLogger(__name__)
+# One thread per process runs rollup, forecast and classification refreshes in turn
+_background_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix='sales-refresh')
+_background_lock = threading.Lock()
+_background_pending = {}
+
+
+def _default_warehouse_id():
+    """Orders are not tied to a warehouse yet, so rollups book against the main store"""
+    warehouse_id = db.session.query(Warehouse.id).filter_by(code=DEFAULT_WAREHOUSE_CODE).scalar()
+    if warehouse_id is None:
+        warehouse = Warehouse(name='Main Store', code=DEFAULT_WAREHOUSE_CODE)
+        db.session.add(warehouse)
+        db.session.flush()
+        warehouse_id = warehouse.id
+    return warehouse_id
+
+
+def state_setting(key, description):
+    """Fetch (creating if needed) the SystemSetting row used as a job's state/lock"""
+    setting = SystemSetting.query.filter_by(key=key).first()
+    if setting is None:
+        try:
+            db.session.add(SystemSetting(
+                key=key, value='', category='analytics', data_type='string', description=description
+            ))
+            db.session.commit()
+        except IntegrityError:
+            # Another worker created it first
+            db.session.rollback()
+        setting = SystemSetting.query.filter_by(key=key).first()
+    return setting
+
+
+def claim_state(key, previous, value):
+    """Compare-and-set a state row inside the current transaction; False if another worker won"""
+    claimed = db.session.execute(
+        update(SystemSetting)
+        .where(SystemSetting.key == key, SystemSetting.value == previous)
+        .values(value=value, updated_at=datetime.utcnow())
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    return bool(claimed)
+
+
+def rollup_high_water_mark():
+    """Timestamp of the last completed rollup, or None if rollups have never run"""
+    value = db.session.query(SystemSetting.value).filter_by(key=ROLLUP_STATE_KEY).scalar()
+    return datetime.fromisoformat(value) if value else None
+
+
+def rollup_data_version():
+    """Opaque marker that changes whenever the rollup tables change ('' if never built)"""
+    return db.session.query(SystemSetting.value).filter_by(key=ROLLUP_VERSION_KEY).scalar() or ''
+
+
+def _rebuild_days(days):
+    """Recompute SalesAnalytics and DailySalesSummary rows for the given dates"""
+    warehouse_id = _default_warehouse_id()
+    
+    for offset in range(0, len(days), ROLLUP_DATE_CHUNK):
+        chunk = days[offset:offset + ROLLUP_DATE_CHUNK]
+        day = day_expression(Order.created_at)
+        in_chunk = (
+            Order.order_type == 'sales',
+            Order.status == 'completed',
+            Order.created_at >= datetime.combine(chunk[0], datetime.min.time()),
+            Order.created_at < datetime.combine(chunk[-1] + timedelta(days=1), datetime.min.time()),
+            day.in_(chunk)
+        )
+        # Walk-in sales without a mobile number count as one customer each
+        customer_key = func.coalesce(func.nullif(Order.customer_mobile, ''), cast(Order.id, String))
+        
+        db.session.execute(delete(SalesAnalytics).where(SalesAnalytics.date.in_(chunk)))
+        db.session.execute(delete(DailySalesSummary).where(DailySalesSummary.date.in_(chunk)))
+        
+        product_days = db.select(
+            day,
+            OrderItem.product_id,
+            db.literal(warehouse_id),
+            func.sum(OrderItem.quantity),
+            func.sum(OrderItem.total_price),
+            func.sum(OrderItem.total_price - OrderItem.quantity * func.coalesce(Product.purchase_price, 0)),
+            func.count(distinct(customer_key))
+        ).select_from(Order).join(OrderItem, OrderItem.order_id == Order.id).join(
+            Product, Product.id == OrderItem.product_id
+        ).where(*in_chunk).group_by(day, OrderItem.product_id)
+        
+        db.session.execute(insert(SalesAnalytics).from_select(
+            ['date', 'product_id', 'warehouse_id', 'quantity_sold', 'revenue', 'profit', 'customer_count'],
+            product_days
+        ))
+        
+        store_days = db.select(
+            day,
+            func.count(Order.id),
+            func.sum(Order.total_amount),
+            func.sum(Order.gst_amount),
+            func.count(distinct(customer_key))
+        ).where(*in_chunk).group_by(day)
+        
+        db.session.execute(insert(DailySalesSummary).from_select(
+            ['date', 'order_count', 'revenue', 'gst_amount', 'customer_count'],
+            store_days
+        ))
+
+
+def _rollup_rows(days):
+    """Stored rollup rows per date, to tell whether rebuilding the days changed anything"""
+    rows = {}
+    for offset in range(0, len(days), ROLLUP_DATE_CHUNK):
+        chunk = days[offset:offset + ROLLUP_DATE_CHUNK]
+        product_days = db.session.query(
+            SalesAnalytics.date, SalesAnalytics.product_id, SalesAnalytics.quantity_sold,
+            SalesAnalytics.revenue, SalesAnalytics.profit, SalesAnalytics.customer_count
+        ).filter(SalesAnalytics.date.in_(chunk))
+        store_days = db.session.query(
+            DailySalesSummary.date, db.literal(None), DailySalesSummary.order_count,
+            DailySalesSummary.revenue, DailySalesSummary.gst_amount, DailySalesSummary.customer_count
+        ).filter(DailySalesSummary.date.in_(chunk))
+        for row in product_days.union_all(store_days):
+            day, *values = row
+            rows.setdefault(_as_date(day), set()).add(
+                tuple(round(value, 6) if isinstance(value, float) else value for value in values)
+            )
+    return rows
+
+
+def _as_date(value):
+    return value if isinstance(value, date) else date.fromisoformat(str(value))
+
+
+def changed_days_query(since=None):
+    """Distinct order dates of sales orders created or updated since `since` (all if None)"""
+    query = db.session.query(day_expression(Order.created_at)).filter(Order.order_type == 'sales')
+    if since is None:
+        return query.distinct()
+    
+    # Rows from before updated_at existed fall back to created_at; UNION keeps both
+    # branches as (order_type, updated_at) index range searches
+    return query.filter(Order.updated_at >= since).union(
+        query.filter(Order.updated_at.is_(None), Order.created_at >= since)
+    )
+
+
+def refresh_sales_rollups(full=False):
+    """Fold new or changed sales orders into the daily rollup tables.
+    
+    Every day touched by an order whose updated_at is past the stored
+    high-water mark is rebuilt from the raw tables; `full` rebuilds all
+    history. The high-water mark is advanced with a compare-and-set, so
+    concurrent workers never rebuild the same window twice. The data
+    version (and the ROLLUP_TABLES versions behind HTTP ETags) only moves
+    when a rebuilt day's totals actually changed, so re-scanning the
+    overlap window does not invalidate forecasts, classes or clients'
+    cached responses. Commits and returns the number of days whose rollups
+    changed, or None if another worker won.
+    
+    Only Order.updated_at is watched: hard-deleted orders and edits to
+    Product.purchase_price (which reprices profit for all history) are
+    not picked up until `flask rollup-sales --full` runs.
+    """
+    started_at = datetime.utcnow()
+    setting = state_setting(ROLLUP_STATE_KEY, 'Order.updated_at high-water mark of the last sales rollup')
+    version = state_setting(ROLLUP_VERSION_KEY, 'Bumped whenever the sales rollup tables change')
+    previous = setting.value or ''
+    
+    if not claim_state(ROLLUP_STATE_KEY, previous, started_at.isoformat()):
+        db.session.rollback()
+        return None
+    
+    since = datetime.fromisoformat(previous) - ROLLUP_OVERLAP if previous and not full else None
+    days = sorted(_as_date(value) for (value,) in changed_days_query(since) if value is not None)
+    if full:
+        # Drop rows for days that no longer have any completed sales
+        db.session.execute(delete(SalesAnalytics))
+        db.session.execute(delete(DailySalesSummary))
+        _rebuild_days(days)
+        changed = len(days)
+    elif days:
+        before = _rollup_rows(days)
+        _rebuild_days(days)
+        after = _rollup_rows(days)
+        changed = sum(1 for day in days if before.get(day) != after.get(day))
+    else:
+        changed = 0
+    if changed or full:
+        version.value = started_at.isoformat()
+        mark_written(db.session, *ROLLUP_TABLES)
+    
+    db.session.commit()
+    return changed
+
+
+def schedule_refresh(job):
+    """Queue job() on the background refresh thread unless it is already waiting or running there"""
+    app = current_app._get_current_object()
+    
+    def run():
+        with app.app_context():
+            try:
+                job()
+            except Exception:
+                logger.exception("Background %s failed", job.__name__)
+            finally:
+                db.session.remove()
+    
+    with _background_lock:
+        pending = _background_pending.get(job)
+        if pending is None or pending.done():
+            pending = _background_pending[job] = _background_pool.submit(run)
+        return pending
+
+
+def ensure_fresh_rollups():
+    """Whether the rollup tables can be read; queues a refresh when they are older than SALES_ROLLUP_MAX_AGE seconds.
+    
+    The refresh runs on a background thread, so the request reads the
+    rollups as they are and never writes. Returns False if they have never
+    been built (run `flask rollup-sales --full` to backfill).
+    """
+    high_water_mark = rollup_high_water_mark()
+    if high_water_mark is None:
+        return False
+    if rollups_due(high_water_mark):
+        schedule_refresh(refresh_sales_rollups)
+    return True
+
+
+def rollups_due(high_water_mark):
+    """Whether rollups last refreshed at `high_water_mark` are older than SALES_ROLLUP_MAX_AGE seconds (False if never built)"""
+    max_age = current_app.config.get('SALES_ROLLUP_MAX_AGE', 60)
+    return high_water_mark is not None and datetime.utcnow() - high_water_mark > timedelta(seconds=max_age)
+
+
+def rollup_monthly_sales(start, end=None):
+    """Completed-sales totals per calendar month from DailySalesSummary"""
+    month = bucket_expression(DailySalesSummary.date, 'month').label('month')
+    query = db.session.query(
+        month,
+        func.sum(DailySalesSummary.revenue).label('total_sales'),
+        func.sum(DailySalesSummary.order_count).label('order_count')
+    ).filter(DailySalesSummary.date >= start)
+    if end is not None:
+        query = query.filter(DailySalesSummary.date < end)
+    
+    monthly = []
+    for row in query.group_by(month).order_by(month):
+        month_start = date.fromisoformat(row.month)
+        monthly.append(MonthlySales(month_start.year, month_start.month, row.total_sales, row.order_count))
+    return monthly
+
+
+def rollup_sales_series(keys, start, end, granularity, category=None, product_id=None):
+    """Completed-sales series from the rollup tables, bucketed like analytics.sales_series"""
+    if category or product_id:
+        bucket = bucket_expression(SalesAnalytics.date, granularity).label('bucket')
+        query = db.session.query(
+            bucket,
+            func.sum(SalesAnalytics.revenue).label('sales'),
+            func.sum(SalesAnalytics.quantity_sold).label('units')
+        )
+        if category:
+            query = query.join(Product, Product.id == SalesAnalytics.product_id).filter(Product.category == category)
+        if product_id:
+            query = query.filter(SalesAnalytics.product_id == product_id)
+        date_column = SalesAnalytics.date
+    else:
+        bucket = bucket_expression(DailySalesSummary.date, granularity).label('bucket')
+        query = db.session.query(
+            bucket,
+            func.sum(DailySalesSummary.revenue).label('sales'),
+            func.sum(DailySalesSummary.order_count).label('orders')
+        )
+        date_column = DailySalesSummary.date
+    
+    last_day = (end - timedelta(microseconds=1)).date()
+    query = query.filter(date_column >= start.date(), date_column <= last_day)
+    totals = {row.bucket: row for row in query.group_by(bucket)}
+    
+    series = []
+    for key in keys:
+        row = totals.get(key)
+        point = {'bucket': key, 'sales': float(row.sales or 0) if row else 0.0}
+        if category or product_id:
+            point['units'] = int(row.units or 0) if row else 0
+        else:
+            point['orders'] = int(row.orders or 0) if row else 0
+        series.append(point)
+    return series
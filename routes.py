@@ -1,18 +1,29 @@
-from flask import render_template, request, jsonify, redirect, url_for, current_app as app
+from flask import render_template, request, jsonify, redirect, url_for, Response, stream_with_context, current_app as app
 from extensions import db
 from models import Product, Stock, Order, OrderItem, Supplier, ProductBatch, Customer, CreditTransaction, GSTState
-from datetime import datetime, timedelta
-from sqlalchemy import func, extract, desc
+from models_advanced import ProductClassification
+from checkout import create_order, create_orders_batch, InsufficientStockError
+from analytics import sales_series, live_monthly_sales, bucket_keys, parse_date_arg, GRANULARITIES
+from rollups import ROLLUP_TABLES, ensure_fresh_rollups, rollup_monthly_sales, rollup_sales_series
+from classification import CLASSIFICATION_HINT, ensure_fresh_classifications, classification_summary
+from inventory_optimizer import load_demand_matrix, optimize_inventory, rank_suggestions
+from stats_cache import cached
+from conditional import conditional_get
+from query_budget import query_budget
+from admin_auth import admin_required
+from qr_service import prerender_order_qrs
+from gst_engine import hsn_summary, state_summary
+from invoice_batch import business_details, count_invoices, invoice_workers, iter_invoice_batches, render_invoices, stream_zip
+from forecasting import FORECAST_HINT, ensure_fresh_forecasts, store_forecast, product_forecasts, forecast_daily_demand
+from db_pool import pool_stats
+from search import search_products
+from bulk_io import iter_csv_rows, iter_ndjson_rows, import_products, iter_product_export, export_csv, export_ndjson
+from datetime import datetime, date, timedelta
+from sqlalchemy import func
 import json
-import qrcode
-# QR code imports handled by qrcode library directly
-import io
-import base64
 import calendar
 
-@app.route('/')
-def landing():
-    # Get real statistics from the database
+def landing_stats():
     total_products = db.session.query(Product).count()
     total_stock = db.session.query(func.sum(Stock.available_qty)).scalar() or 0
     total_orders = db.session.query(Order).count()
@@ -21,11 +32,16 @@ def landing():
     completed_orders = db.session.query(Order).filter(Order.status == 'completed').count()
     accuracy = round((completed_orders / max(total_orders, 1)) * 100) if total_orders > 0 else 0
     
-    stats = {
+    return {
         'total_products': total_products,
         'total_stock': total_stock,
         'accuracy': accuracy
     }
+
+@app.route('/')
+def landing():
+    # Real statistics from the database, cached until the next write to products, stock or orders
+    stats = cached('landing', landing_stats)
     
     return render_template('landing.html', stats=stats)
 
@@ -75,102 +91,221 @@ def logout():
     # session.clear()
     return redirect(url_for('landing'))
 
-# Utility Functions
-def calculate_gst_split(amount, gst_rate, business_state_code, customer_gst):
-    """Calculate CGST/SGST or IGST based on state codes"""
-    gst_amount = (amount * gst_rate) / 100
+GST_SUMMARIES = {'hsn': hsn_summary, 'state': state_summary}
+
+# Product listing helpers
+PRODUCT_PAGE_DEFAULT = 100
+PRODUCT_PAGE_MAX = 500
+
+def product_listing_query(cursor=None, category=None, low_stock=False, abc_class=None, xyz_class=None):
+    """Column-level product + stock + class select, one joined query ordered by Product.id"""
+    available_qty = func.coalesce(Stock.available_qty, 0)
+    min_qty = func.coalesce(Stock.min_qty, 10)
     
-    # Get customer state from GST number (first 2 digits)
-    if customer_gst and len(customer_gst) >= 2:
-        customer_state_code = customer_gst[:2]
-    else:
-        customer_state_code = business_state_code  # Same state if no GST
+    query = db.session.query(
+        Product.id,
+        Product.name,
+        Product.sku,
+        Product.hsn_code,
+        Product.category,
+        Product.unit_price,
+        Product.gst_rate,
+        Product.description,
+        available_qty.label('available_qty'),
+        min_qty.label('min_qty'),
+        ProductClassification.abc_class,
+        ProductClassification.xyz_class
+    ).outerjoin(Stock, Stock.product_id == Product.id).outerjoin(
+        ProductClassification, ProductClassification.product_id == Product.id
+    )
     
-    if customer_state_code == business_state_code:
-        # Same state - CGST + SGST
-        return {
-            'cgst': gst_amount / 2,
-            'sgst': gst_amount / 2,
-            'igst': 0,
-            'total_gst': gst_amount
-        }
-    else:
-        # Different state - IGST
-        return {
-            'cgst': 0,
-            'sgst': 0,
-            'igst': gst_amount,
-            'total_gst': gst_amount
-        }
+    if cursor is not None:
+        query = query.filter(Product.id > cursor)
+    if category:
+        query = query.filter(Product.category == category)
+    if low_stock:
+        query = query.filter(available_qty <= min_qty)
+    if abc_class:
+        query = query.filter(ProductClassification.abc_class == abc_class)
+    if xyz_class:
+        query = query.filter(ProductClassification.xyz_class == xyz_class)
+    
+    return query.order_by(Product.id)
+
+def product_row_to_dict(row):
+    """Serialize a product listing row to the /api/products JSON shape"""
+    return {
+        'id': row.id,
+        'name': row.name,
+        'sku': row.sku,
+        'hsn_code': row.hsn_code,
+        'category': row.category,
+        'unit_price': row.unit_price,
+        'gst_rate': row.gst_rate,
+        'description': row.description,
+        'available_qty': row.available_qty,
+        'min_qty': row.min_qty,
+        'abc_class': row.abc_class,
+        'xyz_class': row.xyz_class
+    }
+
+def product_page_response(cursor=None, limit=PRODUCT_PAGE_DEFAULT, category=None, low_stock=False,
+                          abc_class=None, xyz_class=None):
+    """Fetch one keyset page of products and stream it as compact JSON"""
+    limit = max(1, min(limit or PRODUCT_PAGE_DEFAULT, PRODUCT_PAGE_MAX))
+    
+    # Fetch one extra row to know whether another page exists
+    rows = product_listing_query(cursor, category, low_stock, abc_class, xyz_class).limit(limit + 1).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    next_cursor = rows[-1].id if has_more else None
+    
+    def generate():
+        yield '{"products":['
+        for index, row in enumerate(rows):
+            if index:
+                yield ','
+            yield json.dumps(product_row_to_dict(row), separators=(',', ':'))
+        yield '],"next_cursor":%s,"limit":%d}' % (json.dumps(next_cursor), limit)
+    
+    return Response(generate(), mimetype='application/json')
+
+# Order feed helpers
+ORDER_PAGE_DEFAULT = 50
+ORDER_PAGE_MAX = 500
+
+def encode_order_cursor(created_at, order_id):
+    return f"{created_at.isoformat()}_{order_id}"
+
+def decode_order_cursor(cursor):
+    """(created_at, id) from a next_cursor value; ValueError if it was not one"""
+    try:
+        created_at, order_id = cursor.rsplit('_', 1)
+        return datetime.fromisoformat(created_at), int(order_id)
+    except ValueError:
+        raise ValueError(f"Invalid cursor: {cursor!r}")
 
-def generate_upi_qr(amount, business_name, order_number):
-    """Generate UPI QR code for payment"""
-    # UPI URL format: upi://pay?pa=UPI_ID&pn=NAME&am=AMOUNT&cu=INR&tn=DESCRIPTION
-    upi_url = f"upi://pay?pa=merchant@upi&pn={business_name}&am={amount}&cu=INR&tn=Invoice {order_number}"
+def order_feed_query(order_type, cursor=None, start=None, end=None, status=None):
+    """Orders newest first with item counts from an indexed correlated COUNT per returned row"""
+    item_count = db.session.query(func.count(OrderItem.id)).filter(
+        OrderItem.order_id == Order.id
+    ).correlate(Order).scalar_subquery()
     
-    qr = qrcode.QRCode(
-        version=1,
-        box_size=6,
-        border=5
+    query = db.session.query(
+        Order.id,
+        Order.order_number,
+        Order.customer_name,
+        Order.customer_mobile,
+        Order.total_amount,
+        Order.gst_amount,
+        Order.status,
+        Order.created_at,
+        item_count.label('item_count')
+    ).filter(
+        Order.order_type == order_type
     )
-    qr.add_data(upi_url)
-    qr.make(fit=True)
     
-    img = qr.make_image(fill_color="black", back_color="white")
-    buffer = io.BytesIO()
-    img.save(buffer, format='PNG')
-    buffer.seek(0)
+    if start:
+        query = query.filter(Order.created_at >= start)
+    if end:
+        query = query.filter(Order.created_at < end)
+    if status:
+        query = query.filter(Order.status == status)
+    if cursor:
+        cursor_created_at, cursor_id = cursor
+        query = query.filter(db.or_(
+            Order.created_at < cursor_created_at,
+            db.and_(Order.created_at == cursor_created_at, Order.id < cursor_id)
+        ))
+    
+    return query.order_by(Order.created_at.desc(), Order.id.desc())
+
+def order_row_to_dict(row):
+    """Serialize an order feed row to the /api/orders JSON shape"""
+    return {
+        'id': row.id,
+        'order_number': row.order_number,
+        'customer_name': row.customer_name,
+        'customer_mobile': row.customer_mobile,
+        'total_amount': row.total_amount,
+        'gst_amount': row.gst_amount,
+        'status': row.status,
+        'created_at': row.created_at.strftime('%Y-%m-%d %H:%M'),
+        'items': row.item_count
+    }
+
+def order_page_response(order_type, cursor=None, limit=ORDER_PAGE_DEFAULT, start=None, end=None, status=None):
+    """Fetch one (created_at, id) keyset page of orders"""
+    limit = max(1, min(limit or ORDER_PAGE_DEFAULT, ORDER_PAGE_MAX))
+    
+    rows = order_feed_query(
+        order_type,
+        cursor=decode_order_cursor(cursor) if cursor else None,
+        start=parse_date_arg(start),
+        end=parse_date_arg(end, end_of_day=True),
+        status=status
+    ).limit(limit + 1).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
     
-    # Return base64 encoded image
-    return base64.b64encode(buffer.getvalue()).decode()
+    return jsonify({
+        'orders': [order_row_to_dict(row) for row in rows],
+        'next_cursor': encode_order_cursor(rows[-1].created_at, rows[-1].id) if has_more else None,
+        'limit': limit
+    })
 
 # API Routes for data operations
 @app.route('/api/dashboard-stats')
+@conditional_get('product', 'stock', 'order', daily=True)
 def dashboard_stats():
     try:
-        # Calculate dashboard statistics
-        total_products = Product.query.count()
-        total_stock = db.session.query(db.func.sum(Stock.available_qty)).scalar() or 0
-        low_stock_count = Stock.query.filter(Stock.available_qty <= Stock.min_qty).count()
-        
         # Sales data for current month
-        current_month = datetime.now().replace(day=1)
-        monthly_sales = Order.query.filter(
-            Order.order_type == 'sales',
-            Order.created_at >= current_month
-        ).count()
-        
-        return jsonify({
-            'total_products': total_products,
-            'total_stock': total_stock,
-            'low_stock_count': low_stock_count,
-            'monthly_sales': monthly_sales
-        })
+        current_month = datetime.now().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+        return jsonify(cached(f"dashboard:{current_month:%Y-%m}", lambda: dashboard_summary(current_month)))
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+def dashboard_summary(current_month):
+    # Calculate dashboard statistics
+    total_products = Product.query.count()
+    total_stock = db.session.query(db.func.sum(Stock.available_qty)).scalar() or 0
+    low_stock_count = Stock.query.filter(Stock.available_qty <= Stock.min_qty).count()
+    
+    monthly_sales = Order.query.filter(
+        Order.order_type == 'sales',
+        Order.created_at >= current_month
+    ).count()
+    
+    return {
+        'total_products': total_products,
+        'total_stock': total_stock,
+        'low_stock_count': low_stock_count,
+        'monthly_sales': monthly_sales
+    }
+
 @app.route('/api/products', methods=['GET', 'POST'])
+@conditional_get('product', 'stock', 'product_classification')
+@query_budget(3)
 def handle_products():
     if request.method == 'GET':
         try:
-            products = Product.query.all()
-            product_list = []
-            for product in products:
-                stock = Stock.query.filter_by(product_id=product.id).first()
-                product_data = {
-                    'id': product.id,
-                    'name': product.name,
-                    'sku': product.sku,
-                    'hsn_code': product.hsn_code,
-                    'category': product.category,
-                    'unit_price': product.unit_price,
-                    'gst_rate': product.gst_rate,
-                    'description': product.description,
-                    'available_qty': stock.available_qty if stock else 0,
-                    'min_qty': stock.min_qty if stock else 10
-                }
-                product_list.append(product_data)
-            return jsonify(product_list)
+            filters = {
+                'category': request.args.get('category') or None,
+                'low_stock': request.args.get('low_stock', '').lower() in ('1', 'true', 'yes'),
+                'abc_class': (request.args.get('abc_class') or '').upper() or None,
+                'xyz_class': (request.args.get('xyz_class') or '').upper() or None
+            }
+            
+            # Keyset pagination mode: ?limit=&cursor= plus the filters above
+            if 'limit' in request.args or 'cursor' in request.args:
+                return product_page_response(
+                    cursor=request.args.get('cursor', type=int),
+                    limit=request.args.get('limit', PRODUCT_PAGE_DEFAULT, type=int),
+                    **filters
+                )
+            
+            rows = product_listing_query(**filters).all()
+            return jsonify([product_row_to_dict(row) for row in rows])
         except Exception as e:
             return jsonify({'error': str(e)}), 500
     
@@ -205,6 +340,99 @@ def handle_products():
             db.session.rollback()
             return jsonify({'error': str(e)}), 500
 
+@app.route('/api/products/import', methods=['POST'])
+def import_products_api():
+    """Stream a CSV or NDJSON catalog into Product + Stock, upserting by SKU"""
+    try:
+        upload = request.files.get('file')
+        stream = upload.stream if upload else request.stream
+        filename = (upload.filename or '') if upload else ''
+        
+        import_format = request.args.get('format')
+        if not import_format:
+            if filename.endswith(('.ndjson', '.jsonl')) or 'ndjson' in (request.content_type or ''):
+                import_format = 'ndjson'
+            else:
+                import_format = 'csv'
+        if import_format not in ('csv', 'ndjson'):
+            return jsonify({'error': f"Unsupported format: {import_format}"}), 400
+        
+        rows = iter_ndjson_rows(stream) if import_format == 'ndjson' else iter_csv_rows(stream)
+        summary = import_products(rows)
+        return jsonify({'success': True, **summary})
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/products/export')
+def export_products_api():
+    """Stream the whole catalog as CSV or NDJSON with flat memory use"""
+    export_format = request.args.get('format', 'csv')
+    if export_format not in ('csv', 'ndjson'):
+        return jsonify({'error': f"Unsupported format: {export_format}"}), 400
+    
+    rows = iter_product_export()
+    if export_format == 'ndjson':
+        body, mimetype = export_ndjson(rows), 'application/x-ndjson'
+    else:
+        body, mimetype = export_csv(rows), 'text/csv'
+    
+    filename = f"products-{datetime.now().strftime('%Y%m%d')}.{export_format}"
+    return Response(
+        stream_with_context(body),
+        mimetype=mimetype,
+        headers={'Content-Disposition': f'attachment; filename="{filename}"'}
+    )
+
+SEARCH_LIMIT_DEFAULT = 20
+SEARCH_LIMIT_MAX = 100
+AUTOCOMPLETE_LIMIT = 8
+
+@app.route('/api/search')
+@query_budget(4)
+def search_api():
+    """Ranked product search over name, SKU, HSN, category, description and barcodes.
+    
+    ?q=&category=&limit=&offset= returns products (the /api/products shape
+    plus a score) and category facet counts; ?autocomplete=1 returns a few
+    compact matches for the last word typed, without facets.
+    """
+    try:
+        query = request.args.get('q', '')
+        category = request.args.get('category') or None
+        autocomplete = request.args.get('autocomplete', '').lower() in ('1', 'true', 'yes')
+        if autocomplete:
+            limit, offset = AUTOCOMPLETE_LIMIT, 0
+        else:
+            limit = max(1, min(request.args.get('limit', SEARCH_LIMIT_DEFAULT, type=int) or SEARCH_LIMIT_DEFAULT, SEARCH_LIMIT_MAX))
+            offset = max(0, request.args.get('offset', 0, type=int) or 0)
+        
+        ranked, total, facets = search_products(query, category, limit, offset, facets=not autocomplete)
+        scores = dict(ranked)
+        rows = {row.id: row for row in product_listing_query().filter(Product.id.in_(scores)).all()} if ranked else {}
+        
+        if autocomplete:
+            return jsonify({
+                'query': query,
+                'suggestions': [
+                    {'id': rows[product_id].id, 'name': rows[product_id].name, 'sku': rows[product_id].sku, 'category': rows[product_id].category}
+                    for product_id, _ in ranked if product_id in rows
+                ]
+            })
+        return jsonify({
+            'query': query,
+            'total': total,
+            'limit': limit,
+            'offset': offset,
+            'results': [
+                {**product_row_to_dict(rows[product_id]), 'score': round(score, 4)}
+                for product_id, score in ranked if product_id in rows
+            ],
+            'facets': {'category': [{'value': name, 'count': count} for name, count in facets]}
+        })
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/api/products/<int:product_id>', methods=['PUT', 'DELETE'])
 def handle_product(product_id):
     if request.method == 'PUT':
@@ -250,126 +478,114 @@ def handle_product(product_id):
             return jsonify({'error': str(e)}), 500
 
 @app.route('/api/orders', methods=['GET', 'POST'])
+@conditional_get('order', 'order_item')
+@query_budget(3)
 def handle_orders():
     if request.method == 'GET':
         try:
             order_type = request.args.get('type', 'sales')
-            orders = Order.query.filter_by(order_type=order_type).order_by(Order.created_at.desc()).all()
-            
-            order_list = []
-            for order in orders:
-                order_data = {
-                    'id': order.id,
-                    'order_number': order.order_number,
-                    'customer_name': order.customer_name,
-                    'customer_mobile': order.customer_mobile,
-                    'total_amount': order.total_amount,
-                    'gst_amount': order.gst_amount,
-                    'status': order.status,
-                    'created_at': order.created_at.strftime('%Y-%m-%d %H:%M'),
-                    'items': len(order.items)
-                }
-                order_list.append(order_data)
             
-            return jsonify(order_list)
+            # Cursor pagination mode: ?limit=&cursor=&start=&end=&status=
+            if 'limit' in request.args or 'cursor' in request.args:
+                return order_page_response(
+                    order_type,
+                    cursor=request.args.get('cursor') or None,
+                    limit=request.args.get('limit', ORDER_PAGE_DEFAULT, type=int),
+                    start=request.args.get('start') or None,
+                    end=request.args.get('end') or None,
+                    status=request.args.get('status') or None
+                )
+            
+            rows = order_feed_query(order_type).all()
+            return jsonify([order_row_to_dict(row) for row in rows])
+        except ValueError as e:
+            # Malformed cursor or start/end date
+            return jsonify({'error': str(e)}), 400
         except Exception as e:
             return jsonify({'error': str(e)}), 500
     
     elif request.method == 'POST':
         try:
             data = request.get_json()
+            order = create_order(data)
             
-            # Generate order number
-            order_number = f"ORD-{datetime.now().strftime('%Y%m%d')}-{Order.query.count() + 1:04d}"
-            
-            # Create order
-            order = Order()
-            order.order_number = order_number
-            order.order_type = data['order_type']
-            order.customer_name = data.get('customer_name', '')
-            order.customer_mobile = data.get('customer_mobile', '')
-            order.customer_gst = data.get('customer_gst', '')
-            order.status = 'pending'
-            
-            db.session.add(order)
-            db.session.flush()
-            
-            # Add order items
-            total_amount = 0
-            total_gst = 0
-            
-            for item_data in data['items']:
-                product = Product.query.get(item_data['product_id'])
-                if not product:
-                    raise ValueError(f"Product with ID {item_data['product_id']} not found")
-                
-                quantity = int(item_data['quantity'])
-                unit_price = float(item_data['unit_price'])
-                item_total = quantity * unit_price
-                
-                # Calculate GST
-                gst_amount = (item_total * product.gst_rate) / 100
-                
-                order_item = OrderItem()
-                order_item.order_id = order.id
-                order_item.product_id = product.id
-                order_item.quantity = quantity
-                order_item.unit_price = unit_price
-                order_item.total_price = item_total
-                
-                db.session.add(order_item)
-                
-                total_amount += item_total
-                total_gst += gst_amount
-                
-                # Update stock for sales orders
-                if data['order_type'] == 'sales':
-                    stock = Stock.query.filter_by(product_id=product.id).first()
-                    if stock:
-                        stock.available_qty = max(0, stock.available_qty - quantity)
-            
-            order.total_amount = total_amount
-            order.gst_amount = total_gst
-            
-            db.session.commit()
+            # Render the payment QR now so invoice views never wait for it
+            prerender_order_qrs([order.id])
             
             return jsonify({'success': True, 'message': 'Order created successfully', 'order_id': order.id})
+        except InsufficientStockError as e:
+            db.session.rollback()
+            return jsonify({'error': str(e), 'product_id': e.product_id}), 409
         except Exception as e:
             db.session.rollback()
             return jsonify({'error': str(e)}), 500
 
-@app.route('/api/sales-chart')
-def sales_chart():
+@app.route('/api/orders/batch', methods=['POST'])
+def handle_orders_batch():
+    """Ingest many orders at once (POS offline replay, marketplace imports)"""
     try:
-        # Get sales data for the last 7 days
-        end_date = datetime.now()
-        start_date = end_date - timedelta(days=6)
+        data = request.get_json()
+        orders_data = data.get('orders') if isinstance(data, dict) else data
+        if not isinstance(orders_data, list):
+            return jsonify({'error': 'Expected a list of orders'}), 400
         
-        sales_data = []
-        labels = []
+        results = create_orders_batch(orders_data)
+        prerender_order_qrs([result['order_id'] for result in results if result['success']])
         
-        for i in range(7):
-            current_date = start_date + timedelta(days=i)
-            day_start = current_date.replace(hour=0, minute=0, second=0, microsecond=0)
-            day_end = day_start + timedelta(days=1)
-            
-            daily_sales = db.session.query(db.func.sum(Order.total_amount)).filter(
-                Order.order_type == 'sales',
-                Order.created_at >= day_start,
-                Order.created_at < day_end
-            ).scalar() or 0
-            
-            sales_data.append(float(daily_sales))
-            labels.append(current_date.strftime('%d/%m'))
+        created = sum(1 for result in results if result['success'])
+        return jsonify({
+            'success': True,
+            'created': created,
+            'failed': len(results) - created,
+            'results': results
+        })
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/invoices/bulk')
+@admin_required
+def bulk_invoices():
+    """Stream a zip of invoice HTML + UPI QR PNGs for sales orders: ?start=&end=&status= (admin only)"""
+    try:
+        criteria = {
+            'start': parse_date_arg(request.args.get('start')),
+            'end': parse_date_arg(request.args.get('end'), end_of_day=True),
+            'status': request.args.get('status') or None
+        }
+        total = count_invoices(**criteria)
+        results = render_invoices(iter_invoice_batches(**criteria), business_details(), invoice_workers())
+        
+        return Response(
+            stream_with_context(stream_zip(results, {key: request.args.get(key) for key in ('start', 'end', 'status')})),
+            mimetype='application/zip',
+            headers={
+                'Content-Disposition': f'attachment; filename=invoices-{datetime.now():%Y%m%d-%H%M%S}.zip',
+                'X-Invoice-Count': str(total)
+            }
+        )
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/sales-chart')
+@conditional_get('order', daily=True)
+def sales_chart():
+    try:
+        # Get sales data for the last 7 days in one grouped query
+        today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        series = sales_series(today - timedelta(days=6), today + timedelta(days=1), 'day')
         
         return jsonify({
-            'labels': labels,
-            'data': sales_data
+            'labels': [datetime.strptime(point['bucket'], '%Y-%m-%d').strftime('%d/%m') for point in series],
+            'data': [point['sales'] for point in series]
         })
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/category-chart')
+@conditional_get('product')
 def category_chart():
     try:
         # Get product count by category
@@ -390,29 +606,19 @@ def category_chart():
 
 # Real Analytics API Endpoints
 @app.route('/api/analytics/sales-forecast')
+@conditional_get('order', 'order_item', 'product', 'product_forecast', *ROLLUP_TABLES, daily=True)
+@query_budget(10)
 def sales_forecast_api():
     try:
         # Get historical sales data for last 12 months
         today = datetime.now()
         twelve_months_ago = today - timedelta(days=365)
         
-        # Get monthly sales for the past 12 months
-        monthly_sales = db.session.query(
-            extract('year', Order.created_at).label('year'),
-            extract('month', Order.created_at).label('month'),
-            func.sum(Order.total_amount).label('total_sales'),
-            func.count(Order.id).label('order_count')
-        ).filter(
-            Order.order_type == 'sales',
-            Order.status == 'completed',
-            Order.created_at >= twelve_months_ago
-        ).group_by(
-            extract('year', Order.created_at),
-            extract('month', Order.created_at)
-        ).order_by(
-            extract('year', Order.created_at),
-            extract('month', Order.created_at)
-        ).all()
+        # Get monthly sales for the past 12 months, from the daily rollups when they exist
+        if ensure_fresh_rollups():
+            monthly_sales = rollup_monthly_sales(twelve_months_ago.date())
+        else:
+            monthly_sales = live_monthly_sales(twelve_months_ago)
         
         historical = []
         forecast = []
@@ -427,44 +633,31 @@ def sales_forecast_api():
                 'type': 'historical'
             })
         
-        # Simple forecast: calculate average growth rate and project next 6 months
-        if len(historical) >= 2:
-            # Calculate average monthly growth
-            total_growth = 0
-            growth_periods = 0
-            
-            for i in range(1, len(historical)):
-                if historical[i-1]['sales'] > 0:
-                    growth = (historical[i]['sales'] - historical[i-1]['sales']) / historical[i-1]['sales']
-                    total_growth += growth
-                    growth_periods += 1
-            
-            avg_growth = total_growth / growth_periods if growth_periods > 0 else 0.05  # Default 5%
-            
-            # Cap growth between -20% and +50%
-            avg_growth = max(-0.20, min(0.50, avg_growth))
-            
-            # Generate forecast for next 6 months
-            last_sales = historical[-1]['sales'] if historical else 0
-            current_date = datetime.now()
-            
-            for i in range(6):
-                future_date = current_date + timedelta(days=30 * (i + 1))
-                month_name = calendar.month_abbr[future_date.month]
-                last_sales = last_sales * (1 + avg_growth)
-                
-                forecast.append({
-                    'month': f"{month_name} {future_date.year} (Forecast)",
-                    'sales': last_sales,
-                    'orders': int(last_sales / 2000) if last_sales > 0 else 0,  # Estimate orders
-                    'type': 'forecast'
-                })
+        total_sales = sum(item['sales'] for item in historical)
+        total_orders = sum(item['orders'] for item in historical)
+        average_order_value = total_sales / total_orders if total_orders else 0
         
-        return jsonify({
-            'historical': historical,
-            'forecast': forecast
-        })
+        # Forecasts are refitted in the background, never on a request
+        computed_at = ensure_fresh_forecasts()
+        for month in store_forecast(6):
+            month_name = calendar.month_abbr[int(month['month'][5:])]
+            forecast.append({
+                'month': f"{month_name} {month['month'][:4]} (Forecast)",
+                'sales': month['sales'],
+                'units': month['units'],
+                'orders': int(month['sales'] / average_order_value) if average_order_value else 0,
+                'type': 'forecast'
+            })
         
+        response = {
+            'historical': historical,
+            'forecast': forecast,
+            'computed_at': computed_at.isoformat() if computed_at else None
+        }
+        if computed_at is None:
+            response['hint'] = FORECAST_HINT
+        return jsonify(response)
+    
     except Exception as e:
         return jsonify({
             'historical': [],
@@ -472,73 +665,111 @@ def sales_forecast_api():
             'error': str(e)
         }), 500
 
-@app.route('/api/analytics/abc-analysis')
-def abc_analysis_api():
+@app.route('/api/analytics/product-forecasts')
+@conditional_get('order', 'order_item', 'product', 'product_forecast', daily=True)
+def product_forecasts_api():
+    """Cached per-product demand forecasts: ?product_id=&category=&limit="""
     try:
-        # Get product revenue data
-        product_revenues = db.session.query(
-            Product.id,
-            Product.name,
-            Product.sku,
-            func.sum(OrderItem.total_price).label('total_revenue')
-        ).join(OrderItem).join(Order).filter(
-            Order.order_type == 'sales',
-            Order.status == 'completed'
-        ).group_by(
-            Product.id, Product.name, Product.sku
-        ).order_by(desc('total_revenue')).all()
-        
-        if not product_revenues:
-            return jsonify({
-                'categoryA': {'count': 0, 'percentage': 0, 'value': 0},
-                'categoryB': {'count': 0, 'percentage': 0, 'value': 0},
-                'categoryC': {'count': 0, 'percentage': 0, 'value': 0}
-            })
+        limit = max(1, min(request.args.get('limit', 50, type=int) or 50, 1000))
+        computed_at = ensure_fresh_forecasts()
+        forecasts = product_forecasts(
+            product_id=request.args.get('product_id', type=int),
+            category=request.args.get('category') or None,
+            limit=limit
+        )
+        if computed_at is None:
+            return jsonify({'forecasts': forecasts, 'computed_at': None, 'hint': FORECAST_HINT})
+        return jsonify({'forecasts': forecasts, 'computed_at': computed_at.isoformat()})
+    
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/analytics/sales-series')
+@conditional_get('order', 'order_item', 'product', *ROLLUP_TABLES, daily=True)
+def sales_series_api():
+    """Sales per hour/day/week/month bucket: ?start=&end=&granularity=&category=&product_id=&status="""
+    try:
+        granularity = request.args.get('granularity', 'day')
+        if granularity not in GRANULARITIES:
+            return jsonify({'error': f"granularity must be one of {', '.join(GRANULARITIES)}"}), 400
         
-        total_products = len(product_revenues)
-        total_revenue = sum(float(p.total_revenue) for p in product_revenues)
+        today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        end = parse_date_arg(request.args.get('end'), end_of_day=True) or today + timedelta(days=1)
+        start = parse_date_arg(request.args.get('start')) or end - timedelta(days=30)
+        if start >= end:
+            return jsonify({'error': 'start must be before end'}), 400
         
-        # ABC Classification: A=80% revenue (top 20%), B=15% revenue (next 30%), C=5% revenue (bottom 50%)
-        cumulative_revenue = 0
-        category_a_count = 0
-        category_b_count = 0
-        category_c_count = 0
-        category_a_value = 0
-        category_b_value = 0
-        category_c_value = 0
+        category = request.args.get('category') or None
+        product_id = request.args.get('product_id', type=int)
         
-        for product in product_revenues:
-            cumulative_revenue += float(product.total_revenue)
-            cumulative_percentage = (cumulative_revenue / total_revenue) * 100
-            
-            if cumulative_percentage <= 80:
-                category_a_count += 1
-                category_a_value += float(product.total_revenue)
-            elif cumulative_percentage <= 95:
-                category_b_count += 1
-                category_b_value += float(product.total_revenue)
-            else:
-                category_c_count += 1
-                category_c_value += float(product.total_revenue)
+        # ?source=rollup reads completed sales from the daily rollup tables
+        if request.args.get('source') == 'rollup':
+            if granularity == 'hour':
+                return jsonify({'error': 'Rollups are daily; hour granularity needs the live source'}), 400
+            if not ensure_fresh_rollups():
+                return jsonify({'error': 'Sales rollups have not been built yet (flask rollup-sales --full)'}), 409
+            series = rollup_sales_series(
+                bucket_keys(start, end, granularity), start, end, granularity,
+                category=category, product_id=product_id
+            )
+        else:
+            series = sales_series(
+                start, end, granularity,
+                order_type=request.args.get('type', 'sales'),
+                status=request.args.get('status') or None,
+                category=category,
+                product_id=product_id
+            )
         
         return jsonify({
-            'categoryA': {
-                'count': category_a_count,
-                'percentage': round((category_a_count / total_products) * 100, 1),
-                'value': round((category_a_value / total_revenue) * 100, 1)
-            },
-            'categoryB': {
-                'count': category_b_count,
-                'percentage': round((category_b_count / total_products) * 100, 1),
-                'value': round((category_b_value / total_revenue) * 100, 1)
-            },
-            'categoryC': {
-                'count': category_c_count,
-                'percentage': round((category_c_count / total_products) * 100, 1),
-                'value': round((category_c_value / total_revenue) * 100, 1)
-            }
+            'granularity': granularity,
+            'start': start.isoformat(),
+            'end': end.isoformat(),
+            'labels': [point['bucket'] for point in series],
+            'data': [point['sales'] for point in series],
+            'series': series
         })
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/reports/gst/<summary>')
+@conditional_get('order', 'order_item', 'product', daily=True)
+def gst_summary_api(summary):
+    """GSTR-1 style summaries: /hsn or /state, ?start=&end=&order_type= (defaults to this month's sales)"""
+    try:
+        if summary not in GST_SUMMARIES:
+            return jsonify({'error': f"summary must be one of {', '.join(GST_SUMMARIES)}"}), 404
+        order_type = request.args.get('order_type', 'sales')
+        if order_type not in ('sales', 'purchase'):
+            return jsonify({'error': 'order_type must be sales or purchase'}), 400
+        
+        today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        start = parse_date_arg(request.args.get('start')) or today.replace(day=1)
+        end = parse_date_arg(request.args.get('end'), end_of_day=True) or today + timedelta(days=1)
         
+        result = GST_SUMMARIES[summary](start, end, order_type)
+        result.update({'start': start.isoformat(), 'end': end.isoformat(), 'order_type': order_type})
+        return jsonify(result)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/analytics/abc-analysis')
+@conditional_get('order', 'order_item', 'product', 'product_classification', daily=True)
+@query_budget(6)
+def abc_analysis_api():
+    try:
+        # Classes are recomputed in the background, never on a request
+        computed_at = ensure_fresh_classifications()
+        summary = classification_summary()
+        summary['computed_at'] = computed_at.isoformat() if computed_at else None
+        if computed_at is None:
+            summary['hint'] = CLASSIFICATION_HINT
+        return jsonify(summary)
+    
     except Exception as e:
         return jsonify({
             'categoryA': {'count': 0, 'percentage': 0, 'value': 0},
@@ -548,6 +779,7 @@ def abc_analysis_api():
         }), 500
 
 @app.route('/api/analytics/seasonal-trends')
+@conditional_get('order', *ROLLUP_TABLES, daily=True)
 def seasonal_trends_api():
     try:
         # Get quarterly sales data for the current year
@@ -561,20 +793,16 @@ def seasonal_trends_api():
             ('Q4', [10, 11, 12])
         ]
         
+        # Read the whole year in one query: daily rollups when they exist, else one range scan
+        if ensure_fresh_rollups():
+            monthly_sales = rollup_monthly_sales(date(current_year, 1, 1), date(current_year + 1, 1, 1))
+        else:
+            monthly_sales = live_monthly_sales(datetime(current_year, 1, 1), datetime(current_year + 1, 1, 1))
+        sales_by_month = {sale.month: sale for sale in monthly_sales}
+        
         for quarter_name, months in quarters:
-            quarter_sales = db.session.query(
-                func.sum(Order.total_amount).label('sales'),
-                func.count(Order.id).label('orders')
-            ).filter(
-                Order.order_type == 'sales',
-                Order.status == 'completed',
-                extract('year', Order.created_at) == current_year,
-                extract('month', Order.created_at).in_(months)
-            ).first()
-            
-            # Handle potential None values from database query
-            sales_amount = float(getattr(quarter_sales, 'sales', 0) or 0)
-            order_count = int(getattr(quarter_sales, 'orders', 0) or 0)
+            sales_amount = sum(float(sales_by_month[m].total_sales or 0) for m in months if m in sales_by_month)
+            order_count = sum(int(sales_by_month[m].order_count or 0) for m in months if m in sales_by_month)
             
             # Calculate growth compared to previous quarter
             if quarterly_sales:
@@ -591,51 +819,40 @@ def seasonal_trends_api():
             })
         
         return jsonify(quarterly_sales)
-        
+    
     except Exception as e:
         return jsonify([], 500)
 
+SUGGESTION_LIMIT_DEFAULT = 20
+SUGGESTION_LIMIT_MAX = 500
+
 @app.route('/api/analytics/inventory-optimization')
+@conditional_get('order', 'order_item', 'product', 'stock', 'reorder_rule', 'product_forecast', daily=True)
+@query_budget(6)
 def inventory_optimization_api():
+    """Reorder/overstock counts for every SKU plus the ?limit= most urgent suggestions (default 20, max 500)"""
     try:
-        # Analyze stock levels
-        all_stocks = Stock.query.join(Product).all()
-        
-        overstocked = 0
-        understocked = 0
-        optimal = 0
-        suggestions = []
+        limit = request.args.get('limit', SUGGESTION_LIMIT_DEFAULT, type=int)
+        if limit is None or limit < 1:
+            return jsonify({'error': 'limit must be a whole number of at least 1'}), 400
+        limit = min(limit, SUGGESTION_LIMIT_MAX)
         
-        for stock in all_stocks:
-            if stock.available_qty > stock.min_qty * 2:  # More than 2x minimum = overstocked
-                overstocked += 1
-                suggestions.append({
-                    'product': stock.product.name,
-                    'action': 'reduce',
-                    'quantity': stock.available_qty - (stock.min_qty * 2),
-                    'reason': 'Overstocked - consider promotion'
-                })
-            elif stock.available_qty <= stock.min_qty:  # At or below minimum = understocked
-                understocked += 1
-                suggestions.append({
-                    'product': stock.product.name,
-                    'action': 'increase',
-                    'quantity': stock.min_qty * 2 - stock.available_qty,
-                    'reason': 'Below minimum stock level'
-                })
-            else:
-                optimal += 1
+        # Demand-driven reorder points and EOQ for every SKU, computed as arrays
+        matrix = load_demand_matrix()
+        result = optimize_inventory(matrix, forecast=forecast_daily_demand(matrix.product_ids))
         
-        # Limit suggestions to top 5
-        suggestions = suggestions[:5]
+        understocked = int(result['understocked'].sum())
+        overstocked = int(result['overstocked'].sum())
+        suggestions = rank_suggestions(matrix, result, limit=limit)
         
         return jsonify({
             'overstocked': overstocked,
             'understocked': understocked,
-            'optimal': optimal,
+            'optimal': len(matrix.product_ids) - understocked - overstocked,
+            'total_suggestions': understocked + overstocked,
             'suggestions': suggestions
         })
-        
+    
     except Exception as e:
         return jsonify({
             'overstocked': 0,
@@ -644,3 +861,12 @@ def inventory_optimization_api():
             'suggestions': [],
             'error': str(e)
         }), 500
+
+@app.route('/api/system/db-pool')
+@admin_required
+def db_pool_stats():
+    """Connection pool usage of the worker process that served this request (admin only)"""
+    try:
+        return jsonify(pool_stats(db.engines))
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
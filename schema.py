@@ -0,0 +1,86 @@
+# Schema creation, upkeep and seeding for the database (no migration tool in this project)
+from sqlalchemy import inspect, text
+from extensions import db
+
+
+def add_missing_columns():
+    """Add nullable columns declared on the models but missing from existing tables.
+    
+    db.create_all() only creates missing tables, so a column added to an
+    existing model would otherwise break every query against that table.
+    Returns the list of "table.column" names that were added.
+    """
+    engine = db.engine
+    inspector = inspect(engine)
+    preparer = engine.dialect.identifier_preparer
+    added = []
+    
+    with engine.begin() as conn:
+        for table in db.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {column['name'] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing or not column.nullable:
+                    continue
+                conn.execute(text(
+                    f"ALTER TABLE {preparer.format_table(table)} "
+                    f"ADD COLUMN {preparer.format_column(column)} {column.type.compile(dialect=engine.dialect)}"
+                ))
+                added.append(f"{table.name}.{column.name}")
+    
+    return added
+
+
+def create_missing_indexes():
+    """Create indexes declared on the models but missing from existing tables.
+    
+    Returns the names of the indexes that were created.
+    """
+    engine = db.engine
+    inspector = inspect(engine)
+    created = []
+    
+    for table in db.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {index['name'] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name in existing:
+                continue
+            index.create(bind=engine)
+            created.append(index.name)
+    
+    return created
+
+
+def upgrade_schema():
+    """Bring an existing database up to the models: missing columns, then missing indexes"""
+    return add_missing_columns() + create_missing_indexes()
+
+
+def init_database():
+    """Create missing tables, upgrade existing ones, build the search index and seed reference data.
+    
+    Run once per deploy (`flask --app main init-db`) rather than in every
+    worker at boot. Safe to re-run. Returns a list of what changed.
+    """
+    from models import GSTState
+    from search import init_search_index
+    from stats_cache import seed_data_versions
+    
+    inspector = inspect(db.engine)
+    missing_tables = [table.name for table in db.metadata.sorted_tables if not inspector.has_table(table.name)]
+    db.create_all()
+    changes = [f"created {name}" for name in missing_tables]
+    changes += [f"added {name}" for name in upgrade_schema()]
+    changes += init_search_index()
+    
+    seeded = GSTState.initialize_states()
+    db.session.commit()
+    if seeded:
+        changes.append(f"seeded {seeded} GST state(s)")
+    versions = seed_data_versions(table.name for table in db.metadata.sorted_tables)
+    if versions:
+        changes.append(f"seeded {versions} data version(s)")
+    return changes
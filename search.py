@@ -0,0 +1,244 @@
+# Server-side product search: FTS5 on SQLite, tsvector + GIN on PostgreSQL, kept in sync by triggers
+import re
+from sqlalchemy import inspect, or_, text, func
+from extensions import db
+
+SEARCH_TABLE = 'product_search'
+SEARCH_COLUMNS = ('name', 'sku', 'hsn_code', 'category', 'description', 'barcodes')
+# bm25 weights in SEARCH_COLUMNS order: a name, SKU or barcode hit outranks a description mention
+COLUMN_WEIGHTS = (10.0, 8.0, 2.0, 3.0, 1.0, 8.0)
+MAX_TERMS = 8
+RANK_MAX_MATCHES = 20000
+_TERM = re.compile(r'\w+')
+
+# Triggers rebuild a product's document from the product row and its barcodes, so
+# ORM writes, bulk Core inserts (imports) and raw SQL all keep the index current
+_SQLITE_DOCUMENT = """
+    SELECT p.id, p.name, p.sku, p.hsn_code, p.category, coalesce(p.description, ''),
+           coalesce((SELECT group_concat(b.barcode, ' ') FROM product_barcode b WHERE b.product_id = p.id), '')
+    FROM product p WHERE {where}
+"""
+_SQLITE_DDL = [
+    f"""CREATE VIRTUAL TABLE {SEARCH_TABLE} USING fts5(
+        {', '.join(SEARCH_COLUMNS)}, tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3 4'
+    )""",
+    f"INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}, rank) VALUES ('rank', 'bm25({', '.join(map(str, COLUMN_WEIGHTS))})')",
+]
+_SQLITE_TRIGGERS = [
+    f"""CREATE TRIGGER IF NOT EXISTS product_search_insert AFTER INSERT ON product BEGIN
+        INSERT INTO {SEARCH_TABLE}(rowid, {', '.join(SEARCH_COLUMNS)}) {_SQLITE_DOCUMENT.format(where='p.id = NEW.id')};
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS product_search_update AFTER UPDATE OF name, sku, hsn_code, category, description ON product BEGIN
+        DELETE FROM {SEARCH_TABLE} WHERE rowid = OLD.id;
+        INSERT INTO {SEARCH_TABLE}(rowid, {', '.join(SEARCH_COLUMNS)}) {_SQLITE_DOCUMENT.format(where='p.id = NEW.id')};
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS product_search_delete AFTER DELETE ON product BEGIN
+        DELETE FROM {SEARCH_TABLE} WHERE rowid = OLD.id;
+    END""",
+]
+for _event, _rows in (('INSERT', ('NEW',)), ('UPDATE', ('OLD', 'NEW')), ('DELETE', ('OLD',))):
+    _SQLITE_TRIGGERS.append(
+        f"""CREATE TRIGGER IF NOT EXISTS product_search_barcode_{_event.lower()} AFTER {_event} ON product_barcode BEGIN
+        """ + ''.join(
+            f"""UPDATE {SEARCH_TABLE} SET barcodes = coalesce(
+                (SELECT group_concat(barcode, ' ') FROM product_barcode WHERE product_id = {row}.product_id), ''
+            ) WHERE rowid = {row}.product_id;
+        """ for row in _rows
+        ) + "END"
+    )
+
+_POSTGRES_DDL = [
+    f"""CREATE TABLE IF NOT EXISTS {SEARCH_TABLE} (
+        product_id INTEGER PRIMARY KEY REFERENCES product(id) ON DELETE CASCADE,
+        document TSVECTOR NOT NULL
+    )""",
+    f"CREATE INDEX IF NOT EXISTS ix_{SEARCH_TABLE}_document ON {SEARCH_TABLE} USING GIN (document)",
+    f"""CREATE OR REPLACE FUNCTION product_search_refresh(target INTEGER) RETURNS void AS $$
+    BEGIN
+        DELETE FROM {SEARCH_TABLE} WHERE product_id = target;
+        INSERT INTO {SEARCH_TABLE} (product_id, document)
+        SELECT p.id,
+               setweight(to_tsvector('simple', coalesce(p.name, '')), 'A') ||
+               setweight(to_tsvector('simple', coalesce(p.sku, '')), 'A') ||
+               setweight(to_tsvector('simple', coalesce(
+                   (SELECT string_agg(b.barcode, ' ') FROM product_barcode b WHERE b.product_id = p.id), '')), 'A') ||
+               setweight(to_tsvector('simple', coalesce(p.category, '')), 'B') ||
+               setweight(to_tsvector('simple', coalesce(p.hsn_code, '')), 'C') ||
+               setweight(to_tsvector('simple', coalesce(p.description, '')), 'D')
+        FROM product p WHERE p.id = target;
+    END $$ LANGUAGE plpgsql""",
+    """CREATE OR REPLACE FUNCTION product_search_product_changed() RETURNS trigger AS $$
+    BEGIN
+        PERFORM product_search_refresh(NEW.id);
+        RETURN NULL;
+    END $$ LANGUAGE plpgsql""",
+    """CREATE OR REPLACE FUNCTION product_search_barcode_changed() RETURNS trigger AS $$
+    BEGIN
+        IF TG_OP IN ('UPDATE', 'DELETE') THEN
+            PERFORM product_search_refresh(OLD.product_id);
+        END IF;
+        IF TG_OP IN ('INSERT', 'UPDATE') THEN
+            PERFORM product_search_refresh(NEW.product_id);
+        END IF;
+        RETURN NULL;
+    END $$ LANGUAGE plpgsql""",
+    "DROP TRIGGER IF EXISTS product_search_product ON product",
+    """CREATE TRIGGER product_search_product AFTER INSERT OR UPDATE OF name, sku, hsn_code, category, description
+        ON product FOR EACH ROW EXECUTE FUNCTION product_search_product_changed()""",
+    "DROP TRIGGER IF EXISTS product_search_barcode ON product_barcode",
+    """CREATE TRIGGER product_search_barcode AFTER INSERT OR UPDATE OR DELETE
+        ON product_barcode FOR EACH ROW EXECUTE FUNCTION product_search_barcode_changed()""",
+]
+
+# Engine URL -> 'fts5' or 'postgres', once the index is known to exist
+_backends = {}
+
+
+def search_backend():
+    """'fts5' or 'postgres' when the search index exists, else 'like' (scan fallback until init-db runs)"""
+    engine = db.engine
+    key = str(engine.url)
+    if key not in _backends:
+        if engine.dialect.name not in ('sqlite', 'postgresql') or not inspect(engine).has_table(SEARCH_TABLE):
+            return 'like'
+        _backends[key] = 'fts5' if engine.dialect.name == 'sqlite' else 'postgres'
+    return _backends[key]
+
+
+def rebuild_search_index():
+    """Re-index every product from scratch; returns the number indexed"""
+    dialect = db.engine.dialect.name
+    if dialect == 'sqlite':
+        db.session.execute(text(f"DELETE FROM {SEARCH_TABLE}"))
+        db.session.execute(text(
+            f"INSERT INTO {SEARCH_TABLE}(rowid, {', '.join(SEARCH_COLUMNS)}) {_SQLITE_DOCUMENT.format(where='1 = 1')}"
+        ))
+        db.session.execute(text(f"INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}) VALUES ('optimize')"))
+    elif dialect == 'postgresql':
+        db.session.execute(text("SELECT product_search_refresh(id) FROM product"))
+    else:
+        return 0
+    db.session.commit()
+    return db.session.execute(text(f"SELECT count(*) FROM {SEARCH_TABLE}")).scalar()
+
+
+def init_search_index():
+    """Create the search index and its sync triggers if missing (safe to re-run); returns what changed"""
+    engine = db.engine
+    dialect = engine.dialect.name
+    if dialect not in ('sqlite', 'postgresql'):
+        return []
+    
+    created = not inspect(engine).has_table(SEARCH_TABLE)
+    with engine.begin() as conn:
+        if dialect == 'sqlite':
+            statements = (_SQLITE_DDL if created else []) + _SQLITE_TRIGGERS
+        else:
+            statements = _POSTGRES_DDL
+        for statement in statements:
+            conn.exec_driver_sql(statement)
+    
+    if not created:
+        return []
+    _backends.pop(str(engine.url), None)
+    return [f"created {SEARCH_TABLE} ({rebuild_search_index()} product(s) indexed)"]
+
+
+def query_terms(query):
+    """Lower-cased word tokens of a search box string, at most MAX_TERMS"""
+    return [term.lower() for term in _TERM.findall(query or '')][:MAX_TERMS]
+
+
+def fts5_match(terms):
+    """Every term must match; the last one also matches as a prefix (search as you type)"""
+    return ' '.join(f'"{term}"' for term in terms[:-1]) + f' "{terms[-1]}"*'
+
+
+def tsquery(terms):
+    return ' & '.join(terms[:-1] + [f"{terms[-1]}:*"])
+
+
+def search_products(query, category=None, limit=20, offset=0, facets=True):
+    """Rank products against `query`.
+    
+    Returns (ranked, total, category_facets): [(product_id, score)] best
+    first, then with facets=True the number of matches (within `category`
+    if given) and [(category, count)] over all matches, ignoring the
+    category filter so the other categories stay visible. Without facets
+    total is None and the list is empty, which keeps autocomplete cheap.
+    """
+    terms = query_terms(query)
+    if not terms:
+        return [], 0, []
+    backend = search_backend()
+    if backend == 'like':
+        return search_products_like(terms, category, limit, offset, facets)
+    
+    if backend == 'fts5':
+        params = {'match': fts5_match(terms)}
+        matches = f"SELECT rowid FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH :match"
+        # rank is a negated bm25 (lower is better); scores are higher-is-better on both backends
+        ranking = f"SELECT rowid, -rank AS score FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH :match"
+        order, key = 'rank', 'rowid'
+        category_filter = " AND category = :category"
+        if category and _TERM.search(category):
+            # Narrow through the index first; the equality check alone reads back every match's category
+            params['category_match'] = 'category : "{}"'.format(category.replace('"', '""'))
+            category_filter += f" AND {SEARCH_TABLE} MATCH :category_match"
+    else:
+        params = {'match': tsquery(terms)}
+        matches = f"SELECT product_id FROM {SEARCH_TABLE} WHERE document @@ to_tsquery('simple', :match)"
+        ranking = (
+            f"SELECT product_id, ts_rank_cd(document, to_tsquery('simple', :match)) AS score FROM {SEARCH_TABLE} "
+            f"WHERE document @@ to_tsquery('simple', :match)"
+        )
+        order, key = 'score DESC, product_id', 'product_id'
+        category_filter = " AND product_id IN (SELECT id FROM product WHERE category = :category)"
+    if not category:
+        category_filter = ''
+    
+    # Facets come from the product table: reading category back out of the index is slower
+    category_facets = []
+    if facets:
+        category_facets = sorted(
+            db.session.execute(text(f"SELECT category, count(*) FROM product WHERE id IN ({matches}) GROUP BY category"), params),
+            key=lambda row: (-row[1], row[0] or '')
+        )
+        total = sum(count for name, count in category_facets if not category or name == category)
+        matched = total
+    else:
+        total = None
+        matched = db.session.execute(text(f"SELECT count(*) FROM ({matches}{category_filter}) m"), {**params, 'category': category}).scalar()
+    
+    # Terms found in most of the catalogue carry no ranking signal, and scoring every match would dominate the request
+    if matched > RANK_MAX_MATCHES:
+        order = key
+    ranked = [
+        (product_id, float(score)) for product_id, score in db.session.execute(
+            text(f"{ranking}{category_filter} ORDER BY {order} LIMIT :limit OFFSET :offset"),
+            {**params, 'category': category, 'limit': limit, 'offset': offset}
+        )
+    ]
+    return ranked, total, [(name, count) for name, count in category_facets]
+
+
+def search_products_like(terms, category, limit, offset, facets):
+    """Substring scan used before the index exists; same return shape as search_products"""
+    from models import Product
+    
+    conditions = [
+        or_(*(column.ilike(f"%{term}%") for column in (Product.name, Product.sku, Product.hsn_code, Product.category, Product.description)))
+        for term in terms
+    ]
+    matches = db.session.query(Product.id).filter(*conditions)
+    if category:
+        matches = matches.filter(Product.category == category)
+    ranked = [(product_id, 0.0) for product_id, in matches.order_by(Product.name).limit(limit).offset(offset)]
+    if not facets:
+        return ranked, None, []
+    category_facets = [
+        (name, count) for name, count in db.session.query(Product.category, func.count(Product.id))
+        .filter(*conditions).group_by(Product.category).order_by(func.count(Product.id).desc(), Product.category)
+    ]
+    total = sum(count for name, count in category_facets if not category or name == category)
+    return ranked, total, category_facets
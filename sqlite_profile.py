@@ -0,0 +1,94 @@
+# SQLite settings for several worker processes sharing one database file, plus lock retries
+import os
+import random
+import time
+from functools import wraps
+from flask import current_app
+from sqlalchemy import event
+from sqlalchemy.exc import OperationalError
+from extensions import db
+
+# Config / environment key -> (default, type). SQLITE_PROFILE=default leaves SQLite's own settings alone.
+SQLITE_SETTINGS = {
+    'SQLITE_PROFILE': ('concurrent', str),
+    'SQLITE_JOURNAL_MODE': ('WAL', str),        # Readers no longer block behind a writer
+    'SQLITE_SYNCHRONOUS': ('NORMAL', str),      # Durable in WAL mode except on power loss; skips an fsync per commit
+    'SQLITE_BUSY_TIMEOUT': (5000, int),         # Milliseconds to wait for a lock before "database is locked"
+    'SQLITE_MMAP_SIZE': (256 * 1024 * 1024, int),
+    'SQLITE_CACHE_SIZE': (64 * 1024, int),      # KiB of page cache per connection
+    'SQLITE_LOCK_RETRIES': (3, int),
+}
+LOCK_ERRORS = ('database is locked', 'database table is locked', 'database is busy')
+
+
+def sqlite_config_from_env():
+    """SQLITE_* settings present in the environment, converted to their types"""
+    return {key: cast(os.environ[key]) for key, (_, cast) in SQLITE_SETTINGS.items() if os.environ.get(key)}
+
+
+def sqlite_settings(config):
+    return {key: config.get(key, default) for key, (default, _) in SQLITE_SETTINGS.items()}
+
+
+def pragmas(settings, in_memory=False):
+    """PRAGMA statements run on every new connection"""
+    statements = [
+        f"PRAGMA busy_timeout = {int(settings['SQLITE_BUSY_TIMEOUT'])}",
+        f"PRAGMA synchronous = {settings['SQLITE_SYNCHRONOUS']}",
+        f"PRAGMA cache_size = -{int(settings['SQLITE_CACHE_SIZE'])}",
+        "PRAGMA temp_store = MEMORY",
+    ]
+    if not in_memory:
+        # WAL and mmap need a real file
+        statements.insert(0, f"PRAGMA journal_mode = {settings['SQLITE_JOURNAL_MODE']}")
+        statements.append(f"PRAGMA mmap_size = {int(settings['SQLITE_MMAP_SIZE'])}")
+    return statements
+
+
+def init_sqlite(engines, config):
+    """Apply the SQLite profile to the app's SQLite engines through connect events"""
+    settings = sqlite_settings(config)
+    if settings['SQLITE_PROFILE'] != 'concurrent':
+        return
+    for engine in engines:
+        if engine.dialect.name != 'sqlite':
+            continue
+        statements = pragmas(settings, in_memory=engine.url.database in (None, '', ':memory:'))
+        
+        @event.listens_for(engine, 'connect')
+        def apply_pragmas(dbapi_connection, connection_record, statements=statements):
+            cursor = dbapi_connection.cursor()
+            try:
+                for statement in statements:
+                    cursor.execute(statement)
+            finally:
+                cursor.close()
+
+
+def is_lock_error(error):
+    return isinstance(error, OperationalError) and any(message in str(error.orig).lower() for message in LOCK_ERRORS)
+
+
+def retry_on_lock(func):
+    """Re-run a unit of work that commits its own transaction when SQLite reports a lock.
+    
+    busy_timeout already waits for most locks; this covers the cases SQLite
+    refuses to wait on (a deferred transaction that read before writing
+    while another connection committed). The session is rolled back and
+    the call repeated with jittered backoff, up to SQLITE_LOCK_RETRIES times.
+    Only active with the concurrent profile: in rollback-journal mode a
+    retry re-queues behind the same writer and makes the pile-up worse.
+    """
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        settings = sqlite_settings(current_app.config)
+        retries = settings['SQLITE_LOCK_RETRIES'] if settings['SQLITE_PROFILE'] == 'concurrent' else 0
+        for attempt in range(retries + 1):
+            try:
+                return func(*args, **kwargs)
+            except OperationalError as e:
+                db.session.rollback()
+                if attempt == retries or not is_lock_error(e):
+                    raise
+                time.sleep(0.05 * (2 ** attempt) * (0.5 + random.random()))
+    return wrapper
@@ -0,0 +1,51 @@
+# Worker boot timing: how long each phase of an app factory took
+import logging
+import sys
+import time
+from contextlib import contextmanager
+
+# Imported on first use rather than at boot; the report shows whether boot pulled them in anyway
+DEFERRED_MODULES = ('numpy', 'qrcode', 'PIL')
+
+logger = logging.getLogger(__name__)
+
+
+class StartupTimer:
+    """Collects (phase, seconds) pairs while an app is being created"""
+    
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.phases = []
+        self.total = None
+    
+    @contextmanager
+    def phase(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases.append((name, time.perf_counter() - started))
+    
+    def finish(self, app):
+        self.total = time.perf_counter() - self.started
+        app.extensions['startup_timer'] = self
+        logger.info(self.summary())
+    
+    def summary(self):
+        phases = ', '.join(f"{name} {seconds * 1000:.0f}ms" for name, seconds in self.phases)
+        return f"App ready in {self.total * 1000:.0f}ms ({phases})"
+    
+    def report(self):
+        """Multi-line breakdown for the startup-report command"""
+        lines = [f"{'phase':<20}{'ms':>10}{'share':>9}"]
+        for name, seconds in self.phases:
+            lines.append(f"{name:<20}{seconds * 1000:>10.1f}{seconds / self.total:>9.0%}")
+        other = self.total - sum(seconds for _, seconds in self.phases)
+        lines.append(f"{'other':<20}{other * 1000:>10.1f}{other / self.total:>9.0%}")
+        lines.append(f"{'total':<20}{self.total * 1000:>10.1f}")
+        loaded = [name for name in DEFERRED_MODULES if name in sys.modules]
+        deferred = [name for name in DEFERRED_MODULES if name not in sys.modules]
+        lines.append(f"Deferred until first use: {', '.join(deferred) or 'none'}")
+        if loaded:
+            lines.append(f"Loaded during boot: {', '.join(loaded)}")
+        return '\n'.join(lines)
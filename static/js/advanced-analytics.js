@@ -539,7 +539,7 @@ class AdvancedAnalyticsManager {
     async generateInventoryOptimizationData() {
         try {
             // Get real inventory optimization from API
-            const response = await fetch('/api/analytics/inventory-optimization');
+            const response = await fetch('/api/analytics/inventory-optimization?limit=20');
             if (response.ok) {
                 return await response.json();
             }
@@ -5,7 +5,9 @@ class AdvancedSearchManager {
         this.searchHistory = [];
         this.savedSearches = [];
         this.currentResults = [];
-        this.searchIndex = null;
+        this.currentQuery = null;
+        this.suggestTimer = null;
+        this.suggestSeq = 0;
         this.init();
     }
 
@@ -473,18 +475,37 @@ class AdvancedSearchManager {
     }
 
     showLiveSuggestions(query) {
-        // Simulate search suggestions - in production, this would call an API
-        const suggestions = this.generateSuggestions(query);
+        // Debounce keystrokes, then ask the server index for matching products
+        clearTimeout(this.suggestTimer);
+        this.suggestTimer = setTimeout(async () => {
+            const seq = ++this.suggestSeq;
+            let products = [];
+            try {
+                const response = await fetch(`/api/search?autocomplete=1&q=${encodeURIComponent(query)}`);
+                if (response.ok) {
+                    products = (await response.json()).suggestions || [];
+                }
+            } catch (error) {
+                products = [];
+            }
+            // A newer keystroke has already been answered
+            if (seq !== this.suggestSeq) return;
+            this.renderLiveSuggestions(this.generateSuggestions(query, products));
+        }, 150);
+    }
+
+    renderLiveSuggestions(suggestions) {
         const suggestionContainer = document.getElementById('searchSuggestions');
+        if (!suggestionContainer) return;
         
         let html = '';
         suggestions.forEach(suggestion => {
             html += `
-                <div class="search-suggestion" data-action="search" data-query="${suggestion.query}">
+                <div class="search-suggestion" data-action="search" data-query="${this.escapeHtml(suggestion.query)}">
                     <div class="suggestion-icon"><i class="${suggestion.icon}"></i></div>
                     <div class="suggestion-content">
-                        <div class="suggestion-title">${suggestion.title}</div>
-                        <div class="suggestion-subtitle">${suggestion.subtitle}</div>
+                        <div class="suggestion-title">${this.escapeHtml(suggestion.title)}</div>
+                        <div class="suggestion-subtitle">${this.escapeHtml(suggestion.subtitle)}</div>
                     </div>
                 </div>
             `;
@@ -495,66 +516,24 @@ class AdvancedSearchManager {
         this.bindSuggestionEvents();
     }
 
-    generateSuggestions(query) {
-        const suggestions = [];
-        const lowerQuery = query.toLowerCase();
-
-        // Product suggestions
-        if (lowerQuery.includes('product') || lowerQuery.includes('item')) {
-            suggestions.push({
-                icon: 'fas fa-box',
-                title: `Search products: "${query}"`,
-                subtitle: 'Find products in inventory',
-                query: `products:${query}`,
-                type: 'product'
-            });
-        }
-
-        // Order suggestions
-        if (lowerQuery.includes('order') || lowerQuery.includes('#')) {
-            suggestions.push({
-                icon: 'fas fa-shopping-cart',
-                title: `Search orders: "${query}"`,
-                subtitle: 'Find orders by number or customer',
-                query: `orders:${query}`,
-                type: 'order'
-            });
-        }
-
-        // Customer suggestions
-        if (lowerQuery.includes('customer') || lowerQuery.includes('client')) {
-            suggestions.push({
-                icon: 'fas fa-user',
-                title: `Search customers: "${query}"`,
-                subtitle: 'Find customers by name or details',
-                query: `customers:${query}`,
-                type: 'customer'
-            });
-        }
-
-        // SKU suggestions
-        if (lowerQuery.match(/^[A-Z]{3}\\d{3}$/) || lowerQuery.includes('sku')) {
-            suggestions.push({
-                icon: 'fas fa-barcode',
-                title: `Search by SKU: "${query}"`,
-                subtitle: 'Find product by SKU code',
-                query: `sku:${query}`,
-                type: 'sku'
-            });
-        }
-
-        // Category suggestions
-        const categories = ['Electronics', 'Furniture', 'Beverages', 'Food', 'Clothing'];
-        const matchingCategories = categories.filter(cat => 
-            cat.toLowerCase().includes(lowerQuery)
-        );
-        
-        matchingCategories.forEach(category => {
+    generateSuggestions(query, products = []) {
+        // Matching products from /api/search come first
+        const suggestions = products.map(product => ({
+            icon: 'fas fa-box',
+            title: product.name,
+            subtitle: `${product.category || 'Uncategorized'} • SKU: ${product.sku}`,
+            query: product.sku,
+            type: 'product'
+        }));
+
+        // Category suggestions from the matched products
+        const categories = [...new Set(products.map(product => product.category).filter(Boolean))];
+        categories.slice(0, 2).forEach(category => {
             suggestions.push({
                 icon: 'fas fa-folder',
-                title: `${category} products`,
-                subtitle: `View all products in ${category}`,
-                query: `category:${category}`,
+                title: `"${query}" in ${category}`,
+                subtitle: `Search ${category} products only`,
+                query: `category:${category}:${query}`,
                 type: 'category'
             });
         });
@@ -562,13 +541,13 @@ class AdvancedSearchManager {
         // Generic search
         suggestions.push({
             icon: 'fas fa-search',
-            title: `Search everything for "${query}"`,
-            subtitle: 'Search across all data',
+            title: `Search products for "${query}"`,
+            subtitle: 'Name, SKU, HSN code, category, description or barcode',
             query: query,
             type: 'global'
         });
 
-        return suggestions.slice(0, 6);
+        return suggestions.slice(0, 8);
     }
 
     bindSuggestionEvents() {
@@ -625,51 +604,87 @@ class AdvancedSearchManager {
             type: 'global'
         };
 
-        // Parse special syntax
-        if (query.includes(':')) {
-            const parts = query.split(':');
-            if (parts.length === 2) {
-                parsed.type = parts[0];
-                parsed.text = parts[1];
-            }
+        // Parse special syntax: "sku:LAP001", "category:Electronics" or "category:Electronics:laptop"
+        const parts = query.split(':');
+        if (parts.length === 2) {
+            parsed.type = parts[0];
+            parsed.text = parts[1];
+        } else if (parts.length === 3 && parts[0] === 'category') {
+            parsed.type = 'category';
+            parsed.text = parts[2];
+        }
+        if (parsed.type === 'category') {
+            parsed.filters.category = parts[1];
         }
 
         return parsed;
     }
 
-    executeSearch(parsedQuery) {
-        // This would integrate with your actual search API
-        console.log('Executing search:', parsedQuery);
-        
-        // Simulate search results
-        this.currentResults = this.simulateSearchResults(parsedQuery);
-        
-        // Update UI based on search results
-        this.displaySearchResults();
-    }
+    async executeSearch(parsedQuery) {
+        const params = new URLSearchParams({ q: parsedQuery.text, limit: 50 });
+        if (parsedQuery.filters.category) {
+            params.set('category', parsedQuery.filters.category);
+        }
+        this.currentQuery = parsedQuery;
 
-    simulateSearchResults(query) {
-        // Simulate realistic search results
-        return [
-            {
-                type: 'product',
-                title: 'Premium Laptop',
-                subtitle: 'Electronics • SKU: LAP001',
-                meta: { price: '₹75,000', stock: '25 units' }
-            },
-            {
-                type: 'order',
-                title: 'Order #ORD12345',
-                subtitle: 'Customer: John Doe',
-                meta: { date: '2025-08-30', amount: '₹15,000' }
+        try {
+            const response = await fetch(`/api/search?${params}`);
+            const data = await response.json();
+            if (!response.ok) {
+                throw new Error(data.error || 'Search failed');
             }
-        ];
+            this.currentResults = data;
+            this.displaySearchResults();
+        } catch (error) {
+            showNotification(`Search failed: ${error.message}`, 'error');
+        }
     }
 
     displaySearchResults() {
-        // This would update the main content area with search results
-        const resultsCount = this.currentResults.length;
-        showNotification(`Found ${resultsCount} result${resultsCount !== 1 ? 's' : ''}`, 'success');
+        const { total, results, facets } = this.currentResults;
+        const container = document.getElementById('advancedSearchResults');
+        if (!container) return;
+
+        const activeCategory = this.currentQuery.filters.category;
+        const facetHtml = facets.category.map(facet => `
+            <button class="btn ${facet.value === activeCategory ? 'btn-primary' : 'btn-secondary'}"
+                    data-category="${this.escapeHtml(facet.value || '')}">
+                ${this.escapeHtml(facet.value || 'Uncategorized')} (${facet.count})
+            </button>
+        `).join('');
+
+        const resultHtml = results.map(product => `
+            <div class="search-suggestion">
+                <div class="suggestion-icon"><i class="fas fa-box"></i></div>
+                <div class="suggestion-content">
+                    <div class="suggestion-title">${this.escapeHtml(product.name)}</div>
+                    <div class="suggestion-subtitle">
+                        ${this.escapeHtml(product.category || 'Uncategorized')} • SKU: ${this.escapeHtml(product.sku)} •
+                        ${window.DataStorage.formatCurrency(product.unit_price || 0)} • ${product.available_qty ?? 0} in stock
+                    </div>
+                </div>
+            </div>
+        `).join('');
+
+        container.innerHTML = `
+            <h4>${total} product${total !== 1 ? 's' : ''} matching "${this.escapeHtml(this.currentQuery.text)}"</h4>
+            <div style="display: flex; flex-wrap: wrap; gap: 0.5rem; margin: 0.75rem 0;">${facetHtml}</div>
+            ${resultHtml || '<p>No products found.</p>'}
+        `;
+        container.style.display = 'block';
+
+        // Facet buttons narrow to a category, or clear it when clicked again
+        container.querySelectorAll('[data-category]').forEach(button => {
+            button.addEventListener('click', () => {
+                const category = button.dataset.category;
+                this.executeSearch({
+                    ...this.currentQuery,
+                    filters: category === activeCategory ? {} : { category }
+                });
+            });
+        });
+
+        this.showAdvancedSearch();
     }
 
     createAdvancedSearchModal() {
@@ -913,6 +928,12 @@ class AdvancedSearchManager {
     }
 
     // Utility methods
+    escapeHtml(value) {
+        const div = document.createElement('div');
+        div.textContent = value == null ? '' : String(value);
+        return div.innerHTML.replace(/"/g, '&quot;');
+    }
+
     showSuggestions() {
         const suggestions = document.getElementById('searchSuggestions');
         if (suggestions) {
@@ -64,7 +64,13 @@ class InventoryManager {
     async loadProducts() {
         try {
             this.showTableLoading();
-            this.products = await window.DataStorage.getProducts();
+            this.products = await window.DataStorage.getProducts({
+                onPage: (page, loaded) => {
+                    // Render the first pages while the rest of the catalog streams in
+                    this.products = loaded;
+                    this.applyFilters();
+                }
+            });
             this.applyFilters();
         } catch (error) {
             console.error('Error loading products:', error);
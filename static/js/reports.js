@@ -402,28 +402,35 @@ class ReportsManager {
         }));
     }
 
-    generateGSTReport(startDate, endDate) {
-        const gstOrders = this.orders.filter(order => 
-            new Date(order.created_at) >= startDate &&
-            new Date(order.created_at) <= endDate &&
-            (order.gst_amount || 0) > 0
-        );
+    async generateGSTReport(startDate, endDate) {
+        // Splits are computed per line on the server from each order's place of supply
+        const params = new URLSearchParams({
+            start: document.getElementById('startDate').value,
+            end: document.getElementById('endDate').value,
+            order_type: 'sales'
+        });
+        let hsn, states;
+        try {
+            const [hsnResponse, stateResponse] = await Promise.all([
+                fetch(`/api/reports/gst/hsn?${params}`),
+                fetch(`/api/reports/gst/state?${params}`)
+            ]);
+            if (!hsnResponse.ok || !stateResponse.ok) {
+                throw new Error('GST summary request failed');
+            }
+            hsn = await hsnResponse.json();
+            states = await stateResponse.json();
+        } catch (error) {
+            console.error('Error loading GST summary:', error);
+            showNotification('Failed to load GST summary', 'error');
+            return;
+        }
 
-        // Calculate GST by rate
+        // GST by rate
         const gstByRate = {};
-        let totalCGST = 0, totalSGST = 0, totalIGST = 0;
-
-        gstOrders.forEach(order => {
-            // This is simplified - in real implementation, you'd calculate based on individual items
-            const gstAmount = order.gst_amount || 0;
-            
-            // For demo purposes, assume 18% GST and intra-state
-            const rate = '18%';
-            gstByRate[rate] = (gstByRate[rate] || 0) + gstAmount;
-            
-            // Split between CGST and SGST (simplified)
-            totalCGST += gstAmount / 2;
-            totalSGST += gstAmount / 2;
+        hsn.rows.forEach(row => {
+            const rate = `${row.gst_rate || 0}%`;
+            gstByRate[rate] = (gstByRate[rate] || 0) + row.total_tax;
         });
 
         const chartData = {
@@ -440,38 +447,37 @@ class ReportsManager {
         this.renderChart(chartData);
 
         // Update GST summary
-        document.getElementById('cgst9').textContent = window.DataStorage.formatCurrency(totalCGST);
-        document.getElementById('sgst9').textContent = window.DataStorage.formatCurrency(totalSGST);
-        document.getElementById('igst18').textContent = window.DataStorage.formatCurrency(totalIGST);
-        document.getElementById('totalGST').textContent = window.DataStorage.formatCurrency(totalCGST + totalSGST + totalIGST);
+        const totals = hsn.totals;
+        document.getElementById('cgst9').textContent = window.DataStorage.formatCurrency(totals.cgst);
+        document.getElementById('sgst9').textContent = window.DataStorage.formatCurrency(totals.sgst);
+        document.getElementById('igst18').textContent = window.DataStorage.formatCurrency(totals.igst);
+        document.getElementById('totalGST').textContent = window.DataStorage.formatCurrency(totals.total_tax);
 
         // Generate summary
-        const totalGST = totalCGST + totalSGST + totalIGST;
-        const totalTaxableValue = gstOrders.reduce((sum, order) => sum + (order.total_amount || 0), 0);
+        const interstate = states.rows.filter(row => row.place_of_supply !== states.business_state_code).length;
 
         this.updateReportSummary([
-            { label: 'Total Taxable Value', value: window.DataStorage.formatCurrency(totalTaxableValue) },
-            { label: 'Total GST Collected', value: window.DataStorage.formatCurrency(totalGST) },
-            { label: 'CGST', value: window.DataStorage.formatCurrency(totalCGST) },
-            { label: 'SGST', value: window.DataStorage.formatCurrency(totalSGST) }
+            { label: 'Total Taxable Value', value: window.DataStorage.formatCurrency(totals.taxable_value) },
+            { label: 'Total GST Collected', value: window.DataStorage.formatCurrency(totals.total_tax) },
+            { label: 'CGST + SGST', value: window.DataStorage.formatCurrency(totals.cgst + totals.sgst) },
+            { label: 'IGST', value: window.DataStorage.formatCurrency(totals.igst) },
+            { label: 'Inter-state Rows', value: interstate }
         ]);
 
-        // Generate detailed table
+        // Generate HSN-wise table
         this.renderReportTable([
-            'Date', 'Invoice/Order', 'Customer', 'Taxable Value', 'CGST', 'SGST', 'IGST', 'Total GST'
-        ], gstOrders.map(order => {
-            const gstAmount = order.gst_amount || 0;
-            return [
-                window.DataStorage.formatDate(order.created_at),
-                order.order_number,
-                order.customer_name || 'N/A',
-                window.DataStorage.formatCurrency(order.total_amount || 0),
-                window.DataStorage.formatCurrency(gstAmount / 2),
-                window.DataStorage.formatCurrency(gstAmount / 2),
-                '₹0.00',
-                window.DataStorage.formatCurrency(gstAmount)
-            ];
-        }));
+            'HSN', 'Description', 'GST %', 'Qty', 'Taxable Value', 'CGST', 'SGST', 'IGST', 'Total GST'
+        ], hsn.rows.map(row => [
+            row.hsn_code || 'N/A',
+            row.description || '',
+            `${row.gst_rate || 0}%`,
+            row.quantity,
+            window.DataStorage.formatCurrency(row.taxable_value),
+            window.DataStorage.formatCurrency(row.cgst),
+            window.DataStorage.formatCurrency(row.sgst),
+            window.DataStorage.formatCurrency(row.igst),
+            window.DataStorage.formatCurrency(row.total_tax)
+        ]));
     }
 
     generateProfitReport(startDate, endDate) {
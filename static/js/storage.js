@@ -178,9 +178,22 @@ class DataStorage {
     /**
      * Products Management
      */
-    async getProducts() {
+    async getProducts(options = {}) {
         try {
-            const products = await this.apiRequest('/products');
+            const products = [];
+            let cursor = null;
+            
+            // Walk the catalog page by page using the keyset cursor
+            do {
+                const page = await this.getProductsPage({ ...options, cursor });
+                products.push(...page.products);
+                cursor = page.next_cursor;
+                
+                if (typeof options.onPage === 'function') {
+                    options.onPage(page.products, products);
+                }
+            } while (cursor !== null && cursor !== undefined);
+            
             this.saveProducts(products);
             return products;
         } catch (error) {
@@ -189,6 +202,15 @@ class DataStorage {
         }
     }
 
+    async getProductsPage({ cursor = null, limit = 200, category = '', lowStock = false } = {}) {
+        const params = new URLSearchParams({ limit: String(limit) });
+        if (cursor !== null && cursor !== undefined) params.set('cursor', String(cursor));
+        if (category) params.set('category', category);
+        if (lowStock) params.set('low_stock', '1');
+        
+        return await this.apiRequest(`/products?${params.toString()}`);
+    }
+
     async createProduct(productData) {
         try {
             const result = await this.apiRequest('/products', {
@@ -252,6 +274,25 @@ class DataStorage {
         }
     }
 
+    async importProducts(file) {
+        // Uploaded as multipart so the server can parse the file as a stream
+        const formData = new FormData();
+        formData.append('file', file);
+        
+        const response = await fetch(`${this.baseURL}/products/import`, {
+            method: 'POST',
+            body: formData
+        });
+        if (!response.ok) {
+            throw new Error(`HTTP error! status: ${response.status}`);
+        }
+        return await response.json();
+    }
+
+    getProductsExportURL(format = 'csv') {
+        return `${this.baseURL}/products/export?format=${encodeURIComponent(format)}`;
+    }
+
     getLocalProducts() {
         return JSON.parse(localStorage.getItem(this.storageKeys.products) || '[]');
     }
@@ -275,6 +316,16 @@ class DataStorage {
         }
     }
 
+    async getOrdersPage(orderType = 'sales', { cursor = null, limit = 50, start = '', end = '', status = '' } = {}) {
+        const params = new URLSearchParams({ type: orderType, limit: String(limit) });
+        if (cursor) params.set('cursor', cursor);
+        if (start) params.set('start', start);
+        if (end) params.set('end', end);
+        if (status) params.set('status', status);
+        
+        return await this.apiRequest(`/orders?${params.toString()}`);
+    }
+
     async createOrder(orderData) {
         try {
             const result = await this.apiRequest('/orders', {
@@ -300,6 +351,14 @@ class DataStorage {
         }
     }
 
+    async createOrdersBatch(orders) {
+        // Replays many orders in one request; results are reported per order
+        return await this.apiRequest('/orders/batch', {
+            method: 'POST',
+            body: JSON.stringify({ orders })
+        });
+    }
+
     saveOrders(orders) {
         localStorage.setItem(this.storageKeys.orders, JSON.stringify(orders));
     }
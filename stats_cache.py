@@ -0,0 +1,141 @@
+# Per-table data versions stored in the database and bumped on commit, plus a per-worker cache keyed on them
+import time
+import uuid
+from datetime import datetime, timezone
+from flask import current_app
+from sqlalchemy import event, update
+from sqlalchemy.exc import IntegrityError
+from extensions import db
+from models import Product, Stock, Order, OrderItem
+from models_advanced import ReorderRule, ProductClassification, ProductForecast, SystemSetting
+
+TRACKED_MODELS = (Product, Stock, Order, OrderItem, ReorderRule, ProductClassification, ProductForecast)
+STATS_TABLES = ('product', 'stock', 'order')
+VERSION_KEY_PREFIX = 'data_version.'
+DEFAULT_TTL = 300  # Seconds; bounds staleness for writes made outside the ORM session
+
+_entries = {}
+
+
+def version_key(table):
+    """SystemSetting key holding a table's current data version"""
+    return f"{VERSION_KEY_PREFIX}{table}"
+
+
+def _create_versions(keys):
+    created = 0
+    for key in keys:
+        try:
+            with db.engine.begin() as conn:
+                conn.execute(SystemSetting.__table__.insert().values(
+                    key=key, value=uuid.uuid4().hex, category='cache', data_type='string',
+                    description='Bumped on every commit that writes the table; keys ETags and cached stats',
+                    updated_at=datetime.utcnow()
+                ))
+            created += 1
+        except IntegrityError:
+            # Another worker or host created it first
+            pass
+    return created
+
+
+def seed_data_versions(tables):
+    """Create the version rows still missing for these tables; returns how many were created"""
+    keys = [version_key(table) for table in tables]
+    existing = set(db.session.execute(db.select(SystemSetting.key).where(SystemSetting.key.in_(keys))).scalars())
+    return _create_versions([key for key in keys if key not in existing])
+
+
+def data_version(tables):
+    """Combined version and latest modification timestamp of several tables; missing versions are created.
+    
+    The versions live in the database rather than on the local disk, so a
+    write on one host or one-off job invalidates every other host's ETags
+    and cached entries too.
+    """
+    keys = [version_key(table) for table in tables]
+    query = db.select(SystemSetting.key, SystemSetting.value, SystemSetting.updated_at).where(SystemSetting.key.in_(keys))
+    rows = {row.key: row for row in db.session.execute(query)}
+    if len(rows) < len(set(keys)):
+        _create_versions([key for key in keys if key not in rows])
+        rows = {row.key: row for row in db.session.execute(query)}
+    version = ':'.join(rows[key].value for key in keys)
+    modified = max(rows[key].updated_at for key in keys).replace(tzinfo=timezone.utc).timestamp()
+    return version, modified
+
+
+def _bump(tables):
+    return (
+        update(SystemSetting)
+        .where(SystemSetting.key.in_([version_key(table) for table in tables]))
+        .values(value=uuid.uuid4().hex, updated_at=datetime.utcnow())
+    )
+
+
+def bump_version(*tables):
+    """Publish new versions for tables written outside the ORM session (Core inserts, bulk loads)"""
+    with db.engine.begin() as conn:
+        conn.execute(_bump(tables))
+
+
+def cached(key, compute, tables=STATS_TABLES, ttl=None):
+    """Return compute() from this worker's cache while the tables' versions and TTL allow.
+    
+    The version is read before computing, so a write that commits while
+    the value is being computed still invalidates it on the next call.
+    """
+    if ttl is None:
+        ttl = current_app.config.get('STATS_CACHE_TTL', DEFAULT_TTL)
+    version, _ = data_version(tables)
+    now = time.monotonic()
+    entry = _entries.get(key)
+    if entry and entry[0] == version and entry[1] > now:
+        return entry[2]
+    
+    value = compute()
+    _entries[key] = (version, now + ttl, value)
+    return value
+
+
+def mark_written(session, *tables):
+    """Bump these tables' versions when the session commits, for writes the hooks below do not track"""
+    session.info.setdefault('dirty_tables', set()).update(tables)
+
+
+def _mark(session, objects):
+    for obj in objects:
+        if isinstance(obj, TRACKED_MODELS):
+            mark_written(session, obj.__table__.name)
+
+
+@event.listens_for(db.session, 'after_flush')
+def _mark_flushed_writes(session, flush_context):
+    _mark(session, session.new)
+    _mark(session, session.dirty)
+    _mark(session, session.deleted)
+
+
+@event.listens_for(db.session, 'do_orm_execute')
+def _mark_bulk_writes(orm_execute_state):
+    # insert()/update()/delete() statements bypass the unit of work
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        mapper = orm_execute_state.bind_mapper
+        if mapper is not None and issubclass(mapper.class_, TRACKED_MODELS):
+            mark_written(orm_execute_state.session, mapper.local_table.name)
+
+
+@event.listens_for(db.session, 'before_commit')
+def _publish_writes(session):
+    # Flush first so the last pending writes are marked, then bump their
+    # versions in the same transaction: readers see the new data and the
+    # new version together, on every host. A version row nobody has read
+    # yet does not exist, and there is nothing to invalidate for it.
+    session.flush()
+    tables = session.info.pop('dirty_tables', None)
+    if tables:
+        session.connection().execute(_bump(tables))
+
+
+@event.listens_for(db.session, 'after_rollback')
+def _discard_rolled_back_writes(session):
+    session.info.pop('dirty_tables', None)